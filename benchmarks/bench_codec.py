@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare the JSON backends of `qcloudsms_py.codec` on multi-send bodies.
+
+    python benchmarks/bench_codec.py [-n NUMBER] [--mobiles COUNT ...]
+
+For every installed backend it times building a `SmsMultiSender`
+request (serialization, signature and all) and parsing a multi-send
+response with a `detail` entry per mobile.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qcloudsms_py import codec  # noqa: E402
+from qcloudsms_py.sms import SmsMultiSender  # noqa: E402
+
+
+APPID = 1400000000
+APPKEY = "0123456789abcdef0123456789abcdef"
+
+
+def installed_backends():
+    backends = []
+    for name in ("json", "ujson", "orjson"):
+        try:
+            codec.set_backend(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+def response_body(mobiles):
+    return json.dumps({
+        "result": 0, "errmsg": "OK", "ext": "",
+        "detail": [{
+            "result": 0, "errmsg": "OK", "mobile": mobile,
+            "nationcode": "86", "sid": "2019:{:020d}".format(i), "fee": 1
+        } for i, mobile in enumerate(mobiles)]
+    }).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=100)
+    parser.add_argument("--mobiles", type=int, nargs="+",
+                        default=[200, 1000, 5000])
+    args = parser.parse_args()
+
+    backends = installed_backends()
+    sender = SmsMultiSender(APPID, APPKEY)
+    for count in args.mobiles:
+        mobiles = ["138{:08d}".format(i) for i in range(count)]
+        body = response_body(mobiles)
+        print("{} tel entries, request {} KiB, response {} KiB".format(
+            count, len(codec.dumpb({"tel": [
+                {"nationcode": "86", "mobile": m} for m in mobiles
+            ]})) // 1024, len(body) // 1024))
+        baseline = None
+        for name in backends:
+            codec.set_backend(name)
+            build = min(timeit.repeat(
+                lambda: sender._send_with_param_request(
+                    86, mobiles, 7839, ["5678"]),
+                number=args.number, repeat=3)) / args.number * 1e6
+            parse = min(timeit.repeat(
+                lambda: codec.loads(body),
+                number=args.number, repeat=3)) / args.number * 1e6
+            if baseline is None:
+                baseline = build + parse
+            print("  {:<8} build {:9.1f} us  parse {:9.1f} us  "
+                  "{:5.2f}x".format(name, build, parse,
+                                    baseline / (build + parse)))
+    codec.set_backend("auto")
+
+
+if __name__ == "__main__":
+    main()
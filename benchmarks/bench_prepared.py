@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare `SmsSingleSender.send_with_param` with a prepared sender.
+
+Requests are answered by an in-process client, so only the SDK's own
+request building is measured:
+
+    python benchmarks/bench_prepared.py [-n NUMBER]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qcloudsms_py import SmsSingleSender  # noqa: E402
+from qcloudsms_py.httpclient import (  # noqa: E402
+    HTTPClientInterface, HTTPResponse)
+
+
+class NullClient(HTTPClientInterface):
+    """Answer every request with a canned response, without network."""
+
+    BODY = b'{"result": 0, "errmsg": "OK", "ext": "", "sid": "x", "fee": 1}'
+
+    def fetch(self, req):
+        return HTTPResponse(req, 200, self.BODY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    sender = SmsSingleSender(1400000000, "0123456789abcdef0123456789abcdef",
+                             NullClient())
+    prepared = sender.prepare_with_param(7839, sign="sign", extend="")
+    params = ["5678", "5"]
+
+    cases = [
+        ("send_with_param", lambda: sender.send_with_param(
+            86, "13800000000", 7839, params, sign="sign")),
+        ("prepared.send", lambda: prepared.send(
+            86, "13800000000", params)),
+        ("_send_with_param_request", lambda: sender._send_with_param_request(
+            86, "13800000000", 7839, params, sign="sign")),
+        ("prepared._send_request", lambda: prepared._send_request(
+            86, "13800000000", params)),
+    ]
+    baseline = None
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=args.number, repeat=3))
+        per_call = elapsed / args.number * 1e6
+        if baseline is None or name.startswith("_"):
+            baseline = per_call
+        print("{:<28} {:8.2f} us/call  {:5.2f}x".format(
+            name, per_call, baseline / per_call))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Push status reports to a local `StatusReceiver` and time it.
+
+    python benchmarks/bench_receiver.py [-n PUSHES] [-c CONCURRENCY]
+                                        [--records COUNT] [--slow SECONDS]
+                                        [--max-pending COUNT]
+                                        [--max-wait SECONDS]
+
+Pushes of `records` callback records each are posted by `concurrency`
+clients over kept-alive connections with `AsyncHTTPSimpleClient`.  With
+`slow`, the handler sleeps that long per batch, so backpressure shows
+up as rejected (HTTP 503) pushes.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qcloudsms_py import codec  # noqa: E402
+from qcloudsms_py.aio import AsyncHTTPSimpleClient  # noqa: E402
+from qcloudsms_py.httpclient import HTTPRequest  # noqa: E402
+from qcloudsms_py.receiver import StatusReceiver  # noqa: E402
+
+
+def push_body(records, offset):
+    return codec.dumpb([{
+        "user_receive_time": "2019-01-01 00:00:00", "nationcode": "86",
+        "mobile": "138{:08d}".format(offset + i), "report_status": "SUCCESS",
+        "errmsg": "DELIVRD", "description": "ok",
+        "sid": "2019:{:020d}".format(offset + i)
+    } for i in range(records)])
+
+
+async def run(args):
+    handled = []
+
+    async def handle(records):
+        handled.append(len(records))
+        if args.slow:
+            await asyncio.sleep(args.slow)
+
+    receiver = await StatusReceiver(
+        handle, path="/callback", max_pending=args.max_pending,
+        max_wait=args.max_wait
+    ).start("127.0.0.1", 0)
+    url = "http://127.0.0.1:{}/callback".format(receiver.port)
+    httpclient = AsyncHTTPSimpleClient()
+    codes = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def push(i):
+        async with semaphore:
+            res = await httpclient.fetch(HTTPRequest(
+                url, "POST", {"Content-Type": "application/json"},
+                push_body(args.records, i * args.records)))
+            codes[res.code] = codes.get(res.code, 0) + 1
+
+    start = time.time()
+    await asyncio.gather(*[push(i) for i in range(args.number)])
+    acked = time.time() - start
+    await receiver.close()
+    handled_at = time.time() - start
+    await httpclient.close()
+
+    print("{} pushes of {} records, concurrency {}".format(
+        args.number, args.records, args.concurrency))
+    print("  acked in {:.3f}s, {:.0f} pushes/s, {:.0f} records/s".format(
+        acked, args.number / acked, args.number * args.records / acked))
+    print("  handled {} records in {} batches by {:.3f}s".format(
+        sum(handled), len(handled), handled_at))
+    print("  status codes {}, received {}, rejected {}".format(
+        codes, receiver.received, receiver.rejected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--records", type=int, default=20)
+    parser.add_argument("--max-pending", type=int, default=10000)
+    parser.add_argument("--max-wait", type=float, default=1.0)
+    parser.add_argument("--slow", type=float, default=0.0)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run(args))
+    finally:
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compare `util.calculate_signature` with `util.Signer`.
+
+    python benchmarks/bench_signature.py [-n NUMBER] [--mobiles COUNT]
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qcloudsms_py import util  # noqa: E402
+
+
+APPKEY = "0123456789abcdef0123456789abcdef"
+
+
+def report(title, cases, number):
+    print(title)
+    baseline = None
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=number, repeat=3))
+        per_call = elapsed / number * 1e6
+        if baseline is None:
+            baseline = per_call
+        print("  {:<32} {:9.2f} us/call  {:5.2f}x".format(
+            name, per_call, baseline / per_call))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--number", type=int, default=100000)
+    parser.add_argument("--mobiles", type=int, default=200)
+    args = parser.parse_args()
+
+    signer = util.Signer(APPKEY)
+    single = ["13800000000"]
+    multi = ["138{:08d}".format(i) for i in range(args.mobiles)]
+    encoded = util.encode_mobiles(multi)
+    batch = [(100000 + i, 1500000000 + i, single) for i in range(100)]
+
+    report("single mobile", [
+        ("calculate_signature", lambda: util.calculate_signature(
+            APPKEY, 123456, 1500000000, single)),
+        ("Signer.sign", lambda: signer.sign(123456, 1500000000, single)),
+    ], args.number)
+    report("{} mobiles".format(args.mobiles), [
+        ("calculate_signature", lambda: util.calculate_signature(
+            APPKEY, 123456, 1500000000, multi)),
+        ("Signer.sign", lambda: signer.sign(123456, 1500000000, multi)),
+        ("Signer.sign (pre-encoded)", lambda: signer.sign(
+            123456, 1500000000, encoded)),
+    ], max(args.number // args.mobiles, 100))
+    report("batch of {} requests".format(len(batch)), [
+        ("calculate_signature loop", lambda: [
+            util.calculate_signature(APPKEY, r, t, m) for r, t, m in batch]),
+        ("Signer.sign_many", lambda: signer.sign_many(batch)),
+    ], max(args.number // len(batch), 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Measure the SDK's own overhead against the local API emulator.
+
+Every sender class is run with every HTTP client implementation against
+`benchmarks/emulator.py`, started in a separate process so it doesn't
+compete for the GIL:
+
+    python benchmarks/bench_suite.py [-n CALLS] [-c CONCURRENCY]
+        [--latency SECONDS] [--error-rate RATE] [--filter TEXT]
+
+For each case it reports throughput, p50/p99 latency and the peak
+memory traced by `tracemalloc` during one call, a proxy for the
+allocations a call makes.  Requires Python 3.5+.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qcloudsms_py import aio, sms, voice  # noqa: E402
+from qcloudsms_py.httpclient import (  # noqa: E402
+    HTTPError, HTTPPooledClient, HTTPSimpleClient)
+
+from emulator import Emulator  # noqa: E402
+
+
+APPID = 1400000000
+APPKEY = "0123456789abcdef0123456789abcdef"
+MOBILES = ["138{:08d}".format(i) for i in range(200)]
+VOICE_FILE = b"\0" * 64 * 1024
+
+# (name, sender class name, call(sender, base url))
+CASES = [
+    ("SmsSingleSender.send", "SmsSingleSender",
+     lambda s, u: s.send(0, 86, MOBILES[0], "code 5678",
+                         url=u + "/v5/tlssmssvr/sendsms")),
+    ("SmsSingleSender.send_with_param", "SmsSingleSender",
+     lambda s, u: s.send_with_param(86, MOBILES[0], 7839, ["5678"],
+                                    url=u + "/v5/tlssmssvr/sendsms")),
+    ("SmsMultiSender.send_with_param", "SmsMultiSender",
+     lambda s, u: s.send_with_param(86, MOBILES, 7839, ["5678"],
+                                    url=u + "/v5/tlssmssvr/sendmultisms2")),
+    ("SmsStatusPuller.pull_callback", "SmsStatusPuller",
+     lambda s, u: s.pull_callback(100, url=u + "/v5/tlssmssvr/pullstatus")),
+    ("SmsMobileStatusPuller.pull_callback", "SmsMobileStatusPuller",
+     lambda s, u: s.pull_callback(
+         86, MOBILES[0], 0, 1, 100,
+         url=u + "/v5/tlssmssvr/pullstatus4mobile")),
+    ("PromptVoiceSender.send", "PromptVoiceSender",
+     lambda s, u: s.send(86, MOBILES[0], 2, "prompt",
+                         url=u + "/v5/tlsvoicesvr/sendvoiceprompt")),
+    ("CodeVoiceSender.send", "CodeVoiceSender",
+     lambda s, u: s.send(86, MOBILES[0], "5678",
+                         url=u + "/v5/tlsvoicesvr/sendcvoice")),
+    ("TtsVoiceSender.send", "TtsVoiceSender",
+     lambda s, u: s.send(7839, ["5678"], MOBILES[0],
+                         url=u + "/v5/tlsvoicesvr/sendtvoice")),
+    ("FileVoiceSender.send", "FileVoiceSender",
+     lambda s, u: s.send("fid.mp3", MOBILES[0],
+                         url=u + "/v5/tlsvoicesvr/sendfvoice")),
+    ("VoiceFileUploader.upload", "VoiceFileUploader",
+     lambda s, u: s.upload(VOICE_FILE,
+                           url=u + "/v5/tlsvoicesvr/uploadvoicefile")),
+]
+
+SYNC_CLIENTS = [
+    ("HTTPSimpleClient", HTTPSimpleClient),
+    ("HTTPPooledClient", HTTPPooledClient),
+]
+
+
+def sender_class(name, is_async=False):
+    if is_async:
+        return getattr(aio, "Async" + name)
+    return getattr(sms, name, None) or getattr(voice, name)
+
+
+def percentile(samples, p):
+    return samples[min(int(p * len(samples)), len(samples) - 1)]
+
+
+def run_sync(call, sender, url, calls, concurrency):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_worker = calls // concurrency
+
+    def worker():
+        local = []
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            try:
+                call(sender, url)
+            except (HTTPError, OSError):
+                with lock:
+                    errors[0] += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies), errors[0]
+
+
+def run_async(call, sender, url, calls, concurrency):
+    latencies = []
+    errors = [0]
+
+    async def one(semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(sender, url)
+            except (HTTPError, OSError):
+                errors[0] += 1
+            latencies.append(time.perf_counter() - start)
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*[one(semaphore) for _ in range(calls)])
+        return time.perf_counter() - start
+
+    loop = asyncio.new_event_loop()
+    try:
+        elapsed = loop.run_until_complete(main())
+        loop.run_until_complete(sender._httpclient.close())
+    finally:
+        loop.close()
+    return elapsed, sorted(latencies), errors[0]
+
+
+def peak_per_call(call, sender, url, is_async, samples=20):
+    """Return the mean peak KiB traced by tracemalloc during one call."""
+    loop = asyncio.new_event_loop() if is_async else None
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.clear_traces()
+            baseline = tracemalloc.get_traced_memory()[0]
+            if is_async:
+                loop.run_until_complete(call(sender, url))
+            else:
+                call(sender, url)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+        if loop is not None:
+            loop.run_until_complete(sender._httpclient.close())
+            loop.close()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def start_emulator(latency, error_rate, queue):
+    emulator = Emulator(latency=latency, error_rate=error_rate)
+    queue.put(emulator.url)
+    emulator.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--calls", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--filter", default="",
+                        help="only run cases containing this text")
+    args = parser.parse_args()
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=start_emulator, args=(args.latency, args.error_rate, queue))
+    process.daemon = True
+    process.start()
+    url = queue.get()
+
+    print("{:<38} {:<22} {:>9} {:>8} {:>8} {:>10} {:>6}".format(
+        "case", "client", "calls/s", "p50 ms", "p99 ms", "KiB/call",
+        "errors"))
+    try:
+        for name, cls_name, call in CASES:
+            clients = [(client_name, factory, False)
+                       for client_name, factory in SYNC_CLIENTS]
+            clients.append(("AsyncHTTPSimpleClient",
+                            aio.AsyncHTTPSimpleClient, True))
+            for client_name, factory, is_async in clients:
+                if (args.filter and args.filter not in name and
+                        args.filter not in client_name):
+                    continue
+                cls = sender_class(cls_name, is_async)
+                sender = cls(APPID, APPKEY, factory())
+                kib = peak_per_call(call, sender, url, is_async)
+                sender = cls(APPID, APPKEY, factory())
+                run = run_async if is_async else run_sync
+                elapsed, latencies, errors = run(
+                    call, sender, url, args.calls, args.concurrency)
+                print("{:<38} {:<22} {:>9.0f} {:>8.2f} {:>8.2f} {:>10.1f} "
+                      "{:>6}".format(
+                          name, client_name, len(latencies) / elapsed,
+                          percentile(latencies, 0.5) * 1000,
+                          percentile(latencies, 0.99) * 1000,
+                          kib, errors))
+                sys.stdout.flush()
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
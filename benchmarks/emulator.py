@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local stand-in for the Tencent Cloud SMS and voice APIs.
+
+Answers every endpoint the SDK calls, routed by the last segment of the
+request path, so senders can be pointed at it with their `url=`
+parameter:
+
+    python benchmarks/emulator.py --port 8080 --latency 0.005 --error-rate 0.01
+
+Latency is `latency` seconds plus uniform jitter of `jitter` seconds.
+With `error_rate`, that share of requests fails with HTTP 503, with
+`result_error_rate`, that share is answered with a non-zero `result`.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import socket
+import sys
+import threading
+import time
+
+if sys.version_info >= (3,):
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+else:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+# `result` of injected API errors, "system busy"
+RESULT_ERROR = 1023
+
+_sids = itertools.count(1)
+
+
+def _sid():
+    return "2019:{:020d}".format(next(_sids))
+
+
+def sendsms(data, body):
+    return {"result": 0, "errmsg": "OK", "ext": data.get("ext", ""),
+            "sid": _sid(), "fee": 1}
+
+
+def sendmultisms2(data, body):
+    return {
+        "result": 0, "errmsg": "OK", "ext": data.get("ext", ""),
+        "detail": [{
+            "result": 0, "errmsg": "OK", "mobile": tel.get("mobile"),
+            "nationcode": tel.get("nationcode"), "sid": _sid(), "fee": 1
+        } for tel in data.get("tel") or []]
+    }
+
+
+def pullstatus(data, body):
+    now = int(time.time())
+    if data.get("type") == 1:
+        records = [{
+            "nationcode": "86", "mobile": "138{:08d}".format(i),
+            "text": "reply", "sign": "sign", "time": now, "extend": ""
+        } for i in range(data.get("max", 0))]
+    else:
+        records = [{
+            "user_receive_time": "2019-01-01 00:00:00", "nationcode": "86",
+            "mobile": "138{:08d}".format(i), "report_status": "SUCCESS",
+            "errmsg": "DELIVRD", "description": "ok", "sid": _sid()
+        } for i in range(data.get("max", 0))]
+    return {"result": 0, "errmsg": "ok", "count": len(records),
+            "data": records}
+
+
+def pullstatus4mobile(data, body):
+    response = pullstatus(data, body)
+    for record in response["data"]:
+        record["nationcode"] = data.get("nationcode")
+        record["mobile"] = data.get("mobile")
+    return response
+
+
+def voice(data, body):
+    return {"result": 0, "errmsg": "OK", "ext": data.get("ext", ""),
+            "callid": _sid()}
+
+
+def uploadvoicefile(data, body):
+    return {"result": 0, "errmsg": "OK",
+            "fid": hashlib.sha1(body).hexdigest() + ".mp3"}
+
+
+ROUTES = {
+    "sendsms": sendsms,
+    "sendmultisms2": sendmultisms2,
+    "pullstatus": pullstatus,
+    "pullstatus4mobile": pullstatus4mobile,
+    "sendvoiceprompt": voice,
+    "sendcvoice": voice,
+    "sendtvoice": voice,
+    "sendfvoice": voice,
+    "uploadvoicefile": uploadvoicefile
+}
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    # buffer the response, headers and body go out in one write when
+    # the request is done
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        options = self.server.options
+        delay = options.latency + random.uniform(0, options.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        endpoint = self.path.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        route = ROUTES.get(endpoint)
+        if route is None:
+            return self._reply(404, {"result": 404, "errmsg": "not found"})
+        if random.random() < options.error_rate:
+            return self._reply(503, None)
+        if random.random() < options.result_error_rate:
+            return self._reply(200, {"result": RESULT_ERROR,
+                                     "errmsg": "system busy"})
+        if endpoint == "uploadvoicefile":
+            data = {}
+        else:
+            try:
+                data = json.loads(body.decode("utf-8"))
+            except ValueError:
+                return self._reply(400, {"result": 400,
+                                         "errmsg": "invalid json"})
+        self._reply(200, route(data, body))
+
+    def _reply(self, code, payload):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Emulator(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, result_error_rate=0.0):
+        HTTPServer.__init__(self, (host, port), EmulatorHandler)
+        self.options = argparse.Namespace(
+            latency=latency, jitter=jitter, error_rate=error_rate,
+            result_error_rate=result_error_rate)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        """Serve in a daemon thread."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--result-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    emulator = Emulator(args.host, args.port, args.latency, args.jitter,
+                        args.error_rate, args.result_error_rate)
+    print("listening on {}".format(emulator.url))
+    sys.stdout.flush()
+    try:
+        emulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
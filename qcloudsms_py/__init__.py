@@ -2,11 +2,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
-from qcloudsms_py import sms
-from qcloudsms_py import voice
-from qcloudsms_py import httpclient
-from qcloudsms_py.sms import *
-from qcloudsms_py.voice import *
+import importlib
+import sys
+import threading
 
 
 # human-readable version number
@@ -16,44 +14,156 @@ version = "0.1.3"
 version_info = (0, 1, 3)
 
 
+# public names of submodules, imported on first use
+_SMS_NAMES = (
+    "SmsSingleSender",
+    "SmsMultiSender",
+    "SmsStatusPuller",
+    "SmsMobileStatusPuller"
+)
+
+_VOICE_NAMES = (
+    "SmsVoiceVerifyCodeSender",
+    "SmsVoicePromptSender",
+    "PromptVoiceSender",
+    "CodeVoiceSender",
+    "TtsVoiceSender",
+    "FileVoiceSender",
+    "VoiceFileUploader"
+)
+
+_SUBMODULES = ("sms", "voice", "httpclient")
+
+__all__ = (["QcloudSms", "version", "version_info"] + list(_SUBMODULES) +
+           list(_SMS_NAMES) + list(_VOICE_NAMES))
+
+_LAZY = dict([(name, "sms") for name in _SMS_NAMES] +
+             [(name, "voice") for name in _VOICE_NAMES])
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _SUBMODULES:
+            return importlib.import_module(__name__ + "." + name)
+        if name in _LAZY:
+            module = importlib.import_module(__name__ + "." + _LAZY[name])
+            value = getattr(module, name)
+            globals()[name] = value
+            return value
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            __name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
+else:
+    # no module __getattr__ (PEP 562), import everything up front
+    from qcloudsms_py import sms
+    from qcloudsms_py import voice
+    from qcloudsms_py import httpclient
+    from qcloudsms_py.sms import *
+    from qcloudsms_py.voice import *
+
+
 class QcloudSms(object):
+    """Session sharing one HTTP client, signer and rate limiter between
+    all senders of an appid, e.g.:
+
+        with QcloudSms(appid, appkey) as qcloudsms:
+            ssender = qcloudsms.SmsSingleSender()
+            ssender.send_with_param(86, "13800000000", 7839, ["5678"])
 
-    SMS_CLASSES = set([cls for cls in sms.__all__])
-    VOICE_CLASSESS = set([cls for cls in voice.__all__])
+    `qcloudsms.SmsSingleSender()` returns the same sender every time,
+    senders are thread-safe and can be shared by many threads;
+    `new(name)` creates another one.  Without `httpclient` the session
+    owns a pooled client, closed by `close`.
+    """
+
+    SMS_CLASSES = set(_SMS_NAMES)
+    VOICE_CLASSESS = set(_VOICE_NAMES)
+
+    def __init__(self, appid, appkey, httpclient=None, rate_limiter=None,
+                 max_wait=None, endpoints=None):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: (optional) `HTTPClientInterface` instance,
+                           default is a pooled client owned by the
+                           session
+        :param rate_limiter: (optional) `qcloudsms_py.ratelimit.RateLimiter`
+                             applied to every request of the session
+        :param max_wait: (optional) maximum seconds to wait for the rate
+                         limiter, see `RateLimitedHTTPClient`
+        :param endpoints: (optional) `qcloudsms_py.routing.EndpointSelector`
+                          or its `endpoints`, requests of the session
+                          are routed to the fastest healthy one
+        """
+        from qcloudsms_py import util
 
-    def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._owned = httpclient is None
+        if httpclient is None:
+            from qcloudsms_py.httpclient import HTTPPooledClient
+            from qcloudsms_py.resolver import Resolver
+            httpclient = HTTPPooledClient(resolver=Resolver())
+        if endpoints is not None:
+            from qcloudsms_py.routing import RoutingHTTPClient
+            httpclient = RoutingHTTPClient(endpoints, httpclient)
+        if rate_limiter is not None:
+            from qcloudsms_py.ratelimit import RateLimitedHTTPClient
+            httpclient = RateLimitedHTTPClient(
+                rate_limiter, httpclient, max_wait)
         self._httpclient = httpclient
+        self._signer = util.Signer(appkey)
+        self._lock = threading.Lock()
         self._cache = {}
 
-    def __getattr__(self, name):
+    @property
+    def httpclient(self):
+        return self._httpclient
+
+    def _class(self, name):
         if (name not in self.__class__.SMS_CLASSES and
                 name not in self.__class__.VOICE_CLASSESS):
             raise AttributeError("{} is not in {}".format(
                 name, self.__class__.__name__))
-        if name in self._cache:
-            return lambda: self._cache[name]
-
-        if name in self.__class__.SMS_CLASSES:
-            cls = getattr(sms, name)
-        else:
-            cls = getattr(voice, name)
-        self._cache[name] = obj = cls(
-            self._appid, self._appkey, self._httpclient
-        )
-        return lambda: obj
+        module = "sms" if name in self.__class__.SMS_CLASSES else "voice"
+        return getattr(
+            importlib.import_module(__name__ + "." + module), name)
 
     def new(self, name):
-        if (name not in self.__class__.SMS_CLASSES and
-                name not in self.__class__.VOICE_CLASSESS):
-            raise AttributeError("{} is not in {}".format(
-                name, self.__class__.__name__))
-        if name in self.__class__.SMS_CLASSES:
-            return getattr(sms, name)(
-                self._appid, self._appkey, self._httpclient
-            )
-        else:
-            return getattr(voice, name)(
-                self._appid, self._appkey, self._httpclient
-            )
+        """Create a new sender of class `name` sharing the session's
+        resources."""
+        obj = self._class(name)(self._appid, self._appkey, self._httpclient)
+        if hasattr(obj, "_signer"):
+            obj._signer = self._signer
+        return obj
+
+    def get(self, name):
+        """Return the session's sender of class `name`."""
+        obj = self._cache.get(name)
+        if obj is None:
+            with self._lock:
+                obj = self._cache.get(name)
+                if obj is None:
+                    obj = self._cache[name] = self.new(name)
+        return obj
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        obj = self.get(name)
+        accessor = lambda: obj  # noqa: E731
+        # later lookups find the attribute without calling __getattr__
+        setattr(self, name, accessor)
+        return accessor
+
+    def close(self):
+        """Close the session's HTTP client if the session created it."""
+        if self._owned:
+            self._httpclient.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
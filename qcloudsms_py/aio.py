@@ -0,0 +1,801 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""asyncio support, requires Python 3.5+.
+
+Every sender in `qcloudsms_py.sms` and `qcloudsms_py.voice` has an
+`Async` counterpart here whose methods are coroutines, e.g.:
+
+    sender = AsyncSmsSingleSender(appid, appkey)
+    result = await sender.send_with_param(86, "13800000000", 7839, ["5678"])
+
+Requests go through `AsyncHTTPSimpleClient`, which talks HTTP/1.1 over
+asyncio streams and keeps connections alive, so a single event loop can
+keep many requests in flight at once.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import socket
+import ssl
+import time
+from urllib import parse as urlparse
+
+from qcloudsms_py import consumer
+from qcloudsms_py import ratelimit
+from qcloudsms_py import retry
+from qcloudsms_py import routing
+from qcloudsms_py import sms
+from qcloudsms_py import voice
+from qcloudsms_py.httpclient import (FileBody, HTTPError, HTTPResponse,
+                                     _Instrumented, _body, utf8)
+from qcloudsms_py.metrics import _clock
+from qcloudsms_py.resolver import Resolver
+
+
+__all__ = [
+    "AsyncHTTPClientInterface",
+    "AsyncHTTPSimpleClient",
+    "AsyncRateLimitedHTTPClient",
+    "AsyncRetryingHTTPClient",
+    "AsyncRoutingHTTPClient",
+    "AsyncPreparedSmsSender",
+    "AsyncSmsSingleSender",
+    "AsyncSmsMultiSender",
+    "AsyncSmsStatusPuller",
+    "AsyncSmsMobileStatusPuller",
+    "AsyncSmsVoiceVerifyCodeSender",
+    "AsyncSmsVoicePromptSender",
+    "AsyncPromptVoiceSender",
+    "AsyncCodeVoiceSender",
+    "AsyncTtsVoiceSender",
+    "AsyncFileVoiceSender",
+    "AsyncVoiceFileUploader",
+    "AsyncSmsStatusConsumer"
+]
+
+
+class AsyncHTTPClientInterface(object):
+
+    async def fetch(self, req):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# bytes of a file body read and written at once
+_CHUNK_SIZE = 64 * 1024
+
+
+class _BadStatusLine(Exception):
+    pass
+
+
+# Errors which mean a kept-alive connection has been closed by peer.
+_STALE_ERRORS = (asyncio.IncompleteReadError, ConnectionError,
+                 _BadStatusLine)
+
+
+class _Connection(object):
+
+    __slots__ = ("reader", "writer", "last_used")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.time()
+
+    def close(self):
+        self.writer.close()
+
+
+async def _sock_connect(loop, infos):
+    """Connect a non-blocking socket to the first reachable address of
+    `getaddrinfo` results."""
+    error = None
+    for family, socktype, proto, _, sockaddr in infos:
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, sockaddr)
+            return sock
+        except OSError as e:
+            error = e
+            sock.close()
+        except BaseException:
+            sock.close()
+            raise
+    raise error or OSError("getaddrinfo returns an empty list")
+
+
+class AsyncHTTPSimpleClient(AsyncHTTPClientInterface, _Instrumented):
+    """asyncio HTTP/1.1 client with keep-alive connection pooling.
+
+    Idle connections are pooled per (scheme, host, port) like
+    `qcloudsms_py.httpclient.HTTPPooledClient`, `hooks` and `resolver`
+    work like theirs, a resolver cache miss is resolved in the loop's
+    default executor.  Proxies are not supported.
+    """
+
+    def __init__(self, connect_timeout=60, request_timeout=60,
+                 max_size=100, idle_timeout=30, max_connections=None,
+                 ssl_context=None, hooks=None, resolver=None):
+        """
+        :param connect_timeout: (optional) HTTP connection timeout.
+        :param request_timeout: (optional) HTTP request timeout.
+        :param max_size: (optional) maximum idle connections kept per
+                         (scheme, host, port).
+        :param idle_timeout: (optional) seconds after which an idle
+                             connection is closed instead of reused.
+        :param max_connections: (optional) maximum concurrent connections
+                                per (scheme, host, port), unlimited
+                                by default.
+        :param ssl_context: (optional) `ssl.SSLContext` for HTTPS.
+        :param hooks: (optional) list of functions called with the
+                      `RequestTimings` of every request.
+        :param resolver: (optional) `qcloudsms_py.resolver.Resolver`
+                         caching DNS lookups.
+        """
+        self._hooks = list(hooks or [])
+        self._resolver = resolver
+        self._connect_timeout = connect_timeout
+        self._request_timeout = request_timeout
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._max_connections = max_connections
+        self._ssl_context = ssl_context
+        self._loop = None
+        self._pools = {}
+        self._semaphores = {}
+
+    @staticmethod
+    def _pool_key(result):
+        port = result.port
+        if port is None:
+            port = 443 if result.scheme == "https" else 80
+        return (result.scheme, result.hostname, port)
+
+    def _check_loop(self):
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            # connections are bound to the loop which created them
+            self._loop = loop
+            self._pools = {}
+            self._semaphores = {}
+
+    def _acquire(self, key):
+        deadline = time.time() - self._idle_timeout
+        pool = self._pools.get(key)
+        while pool:
+            conn = pool.pop()
+            if (conn.last_used < deadline or
+                    conn.reader.at_eof() or
+                    conn.writer.transport.is_closing()):
+                conn.close()
+                continue
+            return conn
+        return None
+
+    def _release(self, key, conn):
+        pool = self._pools.setdefault(key, [])
+        if len(pool) < self._max_size:
+            conn.last_used = time.time()
+            pool.append(conn)
+        else:
+            conn.close()
+
+    async def _resolve(self, loop, host, port):
+        if self._resolver is None:
+            return await loop.getaddrinfo(
+                host, port, type=socket.SOCK_STREAM)
+        infos = self._resolver.cached(host, port)
+        if infos is None:
+            infos = await loop.run_in_executor(
+                None, self._resolver.resolve, host, port)
+        return infos
+
+    async def _connect(self, key, timings=None):
+        scheme, host, port = key
+        context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            context = self._ssl_context
+        if timings is None and self._resolver is None:
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=context)
+            return _Connection(reader, writer)
+
+        loop = asyncio.get_event_loop()
+        start = _clock()
+        infos = await self._resolve(loop, host, port)
+        resolved = _clock()
+        sock = await _sock_connect(loop, infos)
+        connected = _clock()
+        if timings is not None:
+            timings.dns = resolved - start
+            timings.connect = connected - resolved
+        try:
+            reader, writer = await asyncio.open_connection(
+                sock=sock, ssl=context,
+                server_hostname=host if context else None)
+        except BaseException:
+            sock.close()
+            raise
+        if timings is not None and context is not None:
+            timings.tls = _clock() - connected
+            ssl_object = writer.get_extra_info("ssl_object")
+            timings.resumed = getattr(ssl_object, "session_reused", None)
+        return _Connection(reader, writer)
+
+    async def _send(self, conn, req, result, timings=None):
+        """Send request through `conn` and read the whole response.
+
+        Return the `HTTPResponse` and whether `conn` can be reused.
+        """
+        body = _body(req.body) or b""
+        headers = dict(req.headers or {})
+        headers.setdefault("Host", result.netloc)
+        headers["Content-Length"] = str(len(body))
+        lines = ["{} {}?{} HTTP/1.1".format(
+            req.method, result.path, result.query)]
+        for name, value in headers.items():
+            lines.append("{}: {}".format(name, value))
+        lines.append("\r\n")
+        if timings is not None:
+            start = _clock()
+        if isinstance(body, FileBody):
+            conn.writer.write(utf8("\r\n".join(lines)))
+            while True:
+                chunk = body.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                conn.writer.write(chunk)
+                await conn.writer.drain()
+        else:
+            conn.writer.write(utf8("\r\n".join(lines)) + body)
+        await conn.writer.drain()
+
+        reader = conn.reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise _BadStatusLine("connection closed by peer")
+        try:
+            version, status, reason = (
+                status_line.decode("latin-1").rstrip("\r\n") + " "
+            ).split(" ", 2)
+            code = int(status)
+        except ValueError:
+            raise _BadStatusLine(status_line)
+
+        res_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            res_headers[name.strip()] = value.strip()
+        lowered = dict((k.lower(), v.lower()) for k, v in res_headers.items())
+        if timings is not None:
+            headers_read = _clock()
+            timings.ttfb = headers_read - start
+
+        keep_alive = (version == "HTTP/1.1" and
+                      lowered.get("connection") != "close")
+        if "chunked" in lowered.get("transfer-encoding", ""):
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            res_body = b"".join(chunks)
+        elif "content-length" in lowered:
+            res_body = await reader.readexactly(
+                int(lowered["content-length"]))
+        else:
+            res_body = await reader.read()
+            keep_alive = False
+        if timings is not None:
+            timings.body = _clock() - headers_read
+
+        res = HTTPResponse(
+            request=req,
+            code=code,
+            body=res_body,
+            headers=res_headers,
+            reason=reason.strip() or None
+        )
+        return res, keep_alive
+
+    async def _fetch(self, req, result, key, timings):
+        conn = self._acquire(key)
+        reused = conn is not None
+        while True:
+            if timings is not None:
+                timings.reused = reused
+            if conn is None:
+                conn = await asyncio.wait_for(
+                    self._connect(key, timings), self._connect_timeout)
+            try:
+                res, keep_alive = await asyncio.wait_for(
+                    self._send(conn, req, result, timings),
+                    self._request_timeout)
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # the pooled connection was closed by peer, retry once
+                # with a new connection.
+                conn, reused = None, False
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        if keep_alive:
+            self._release(key, conn)
+        else:
+            conn.close()
+        return res
+
+    async def fetch(self, req):
+        self._check_loop()
+        result = urlparse.urlparse(req.url)
+        timings = self._timings(req, result)
+        key = self._pool_key(result)
+        try:
+            if self._max_connections is None:
+                res = await self._fetch(req, result, key, timings)
+            else:
+                semaphore = self._semaphores.get(key)
+                if semaphore is None:
+                    semaphore = self._semaphores[key] = asyncio.Semaphore(
+                        self._max_connections)
+                async with semaphore:
+                    res = await self._fetch(req, result, key, timings)
+        except Exception as e:
+            self._report(timings, error=e)
+            raise
+        self._report(timings, res)
+        return res
+
+    async def close(self):
+        """Close all idle connections."""
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for conn in pool:
+                conn.close()
+
+
+_http_simple_client = AsyncHTTPSimpleClient(resolver=Resolver())
+
+
+class AsyncRateLimitedHTTPClient(AsyncHTTPClientInterface):
+    """Async version of `qcloudsms_py.ratelimit.RateLimitedHTTPClient`,
+    awaits instead of blocking when the limiter has no token.
+    """
+
+    def __init__(self, limiter, httpclient=None, max_wait=None):
+        """
+        :param limiter: `qcloudsms_py.ratelimit.RateLimiter` instance
+        :param httpclient: (optional) wrapped `AsyncHTTPClientInterface`
+        :param max_wait: (optional) maximum seconds to wait for a token,
+                         unlimited by default; 0 fails fast with
+                         `RateLimitExceeded`
+        """
+        self._limiter = limiter
+        self._httpclient = httpclient
+        self._max_wait = max_wait
+
+    async def fetch(self, req):
+        appid, endpoint = ratelimit.request_key(req)
+        wait = self._limiter.reserve(appid, endpoint, self._max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return await (self._httpclient or _http_simple_client).fetch(req)
+
+    async def close(self):
+        if self._httpclient:
+            await self._httpclient.close()
+
+
+class AsyncRetryingHTTPClient(AsyncHTTPClientInterface, retry._Retrier):
+    """Async version of `qcloudsms_py.retry.RetryingHTTPClient`."""
+
+    def __init__(self, policy, httpclient=None):
+        """
+        :param policy: `qcloudsms_py.retry.RetryPolicy` instance
+        :param httpclient: (optional) wrapped `AsyncHTTPClientInterface`
+        """
+        retry._Retrier.__init__(self, policy)
+        self._httpclient = httpclient
+
+    async def _fetch(self, req):
+        start = retry._clock()
+        try:
+            res = await (self._httpclient or _http_simple_client).fetch(req)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return None, e
+        self.record(req, retry._clock() - start)
+        return res, None
+
+    async def _attempt(self, req):
+        delay = self.hedge_delay(req)
+        if delay is None:
+            return await self._fetch(req)
+
+        first = asyncio.ensure_future(self._fetch(req))
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            return first.result()
+        # no response within `delay`, send a hedged request
+        pending = set([first, asyncio.ensure_future(
+            self._fetch(req.rebuild()))])
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if not self.retryable(outcome):
+                        return outcome
+            # both requests failed
+            return outcome
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch(self, req):
+        req = self._policy.prepare(req)
+        start = retry._clock()
+        attempt = 1
+        while True:
+            outcome = await self._attempt(req)
+            if not self.retryable(outcome):
+                break
+            delay = self.backoff(attempt, start)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+            if req.rebuild is not None:
+                req = req.rebuild()
+        res, error = outcome
+        if error is not None:
+            raise error
+        return res
+
+    async def close(self):
+        if self._httpclient:
+            await self._httpclient.close()
+
+
+class AsyncRoutingHTTPClient(AsyncHTTPClientInterface):
+    """Async version of `qcloudsms_py.routing.RoutingHTTPClient`."""
+
+    def __init__(self, selector, httpclient=None):
+        """
+        :param selector: `qcloudsms_py.routing.EndpointSelector` instance,
+                         or its `endpoints`
+        :param httpclient: (optional) wrapped `AsyncHTTPClientInterface`
+        """
+        if not isinstance(selector, routing.EndpointSelector):
+            selector = routing.EndpointSelector(selector)
+        self._selector = selector
+        self._httpclient = httpclient
+
+    @property
+    def selector(self):
+        return self._selector
+
+    async def fetch(self, req):
+        req, endpoint = self._selector.route(req)
+        httpclient = self._httpclient or _http_simple_client
+        if endpoint is None:
+            return await httpclient.fetch(req)
+        start = routing._clock()
+        try:
+            res = await httpclient.fetch(req)
+        except BaseException as e:
+            self._selector.record(endpoint, routing._clock() - start,
+                                  routing.EndpointSelector.outcome(error=e))
+            raise
+        self._selector.record(endpoint, routing._clock() - start,
+                              routing.EndpointSelector.outcome(res))
+        return res
+
+    async def close(self):
+        if self._httpclient:
+            await self._httpclient.close()
+
+
+async def api_request(req, httpclient=None):
+    """Make a API request and return response, see `util.api_request`.
+
+    :param req: `qcloudsms_py.httpclient.HTTPRequest` instance
+    :param httpclient: `AsyncHTTPClientInterface` instance
+    """
+    if httpclient:
+        res = await httpclient.fetch(req)
+    else:
+        res = await _http_simple_client.fetch(req)
+    if not res.ok():
+        raise HTTPError(res.code, res.reason)
+    return res.json()
+
+
+class AsyncPreparedSmsSender(sms.PreparedSmsSender):
+
+    async def send(self, nationcode, phone_number, value, ext=""):
+        """Send single SMS message, see `PreparedSmsSender.send`."""
+        return await api_request(
+            self._send_request(nationcode, phone_number, value, ext),
+            self._httpclient
+        )
+
+
+class AsyncSmsSingleSender(sms.SmsSingleSender):
+
+    _prepared_class = AsyncPreparedSmsSender
+
+    async def send(self, sms_type, nationcode, phone_number, msg,
+                   extend="", ext="", url=None):
+        """Send single SMS message, see `SmsSingleSender.send`."""
+        return await api_request(
+            self._send_request(sms_type, nationcode, phone_number, msg,
+                               extend, ext, url),
+            self._httpclient
+        )
+
+    async def send_with_param(self, nationcode, phone_number, template_id,
+                              params, sign="", extend="", ext="", url=None):
+        """Send single SMS message with template paramters, see
+        `SmsSingleSender.send_with_param`.
+        """
+        return await api_request(
+            self._send_with_param_request(nationcode, phone_number,
+                                          template_id, params, sign, extend,
+                                          ext, url),
+            self._httpclient
+        )
+
+
+class AsyncSmsMultiSender(sms.SmsMultiSender):
+
+    async def send(self, sms_type, nationcode, phone_numbers, msg,
+                   extend="", ext="", url=None):
+        """Send a SMS messages to multiple phones at once, see
+        `SmsMultiSender.send`.
+        """
+        return await api_request(
+            self._send_request(sms_type, nationcode, phone_numbers, msg,
+                               extend, ext, url),
+            self._httpclient
+        )
+
+    async def send_with_param(self, nationcode, phone_numbers, template_id,
+                              params, sign="", extend="", ext="", url=None):
+        """Send a SMS messages with template parameters to multiple
+        phones at once, see `SmsMultiSender.send_with_param`.
+        """
+        return await api_request(
+            self._send_with_param_request(nationcode, phone_numbers,
+                                          template_id, params, sign, extend,
+                                          ext, url),
+            self._httpclient
+        )
+
+
+class AsyncSmsStatusPuller(sms.SmsStatusPuller):
+
+    async def _pull(self, sms_type, max_num, url=None):
+        return await api_request(
+            self._pull_request(sms_type, max_num, url),
+            self._httpclient
+        )
+
+    async def pull_callback(self, max_num, url=None):
+        """Pull callback SMS messages status, see
+        `SmsStatusPuller.pull_callback`.
+        """
+        return await self._pull(0, max_num, url)
+
+    async def pull_reply(self, max_num, url=None):
+        """Pull reply SMS messages status, see `SmsStatusPuller.pull_reply`.
+        """
+        return await self._pull(1, max_num, url)
+
+
+class AsyncSmsMobileStatusPuller(sms.SmsMobileStatusPuller):
+
+    async def _pull(self, msg_type, nationcode, mobile,
+                    begin_time, end_time, max_num, url=None):
+        return await api_request(
+            self._pull_request(msg_type, nationcode, mobile, begin_time,
+                               end_time, max_num, url),
+            self._httpclient
+        )
+
+    async def pull_callback(self, nationcode, mobile, begin_time,
+                            end_time, max_num, url=None):
+        """Pull callback SMS message status for single mobile, see
+        `SmsMobileStatusPuller.pull_callback`.
+        """
+        return await self._pull(0, nationcode, mobile,
+                                begin_time, end_time, max_num, url)
+
+    async def pull_reply(self, nationcode, mobile, begin_time,
+                         end_time, max_num, url=None):
+        """Pull reply SMS message status for single mobile, see
+        `SmsMobileStatusPuller.pull_reply`.
+        """
+        return await self._pull(1, nationcode, mobile,
+                                begin_time, end_time, max_num, url)
+
+
+class AsyncPromptVoiceSender(voice.PromptVoiceSender):
+
+    async def send(self, nationcode, phone_number, prompttype,
+                   msg, playtimes=2, ext="", url=None):
+        """Send a voice prompt message, see `PromptVoiceSender.send`."""
+        return await api_request(
+            self._send_request(nationcode, phone_number, prompttype, msg,
+                               playtimes, ext, url),
+            self._httpclient
+        )
+
+
+# For compatibility with old API
+AsyncSmsVoicePromptSender = AsyncPromptVoiceSender
+
+
+class AsyncCodeVoiceSender(voice.CodeVoiceSender):
+
+    async def send(self, nationcode, phone_number, msg,
+                   playtimes=2, ext="", url=None):
+        """Send code voice, see `CodeVoiceSender.send`."""
+        return await api_request(
+            self._send_request(nationcode, phone_number, msg, playtimes, ext,
+                               url),
+            self._httpclient
+        )
+
+
+# For compatibility with old API
+AsyncSmsVoiceVerifyCodeSender = AsyncCodeVoiceSender
+
+
+class AsyncTtsVoiceSender(voice.TtsVoiceSender):
+
+    async def send(self, template_id, params, phone_number,
+                   nationcode="86", playtimes=2, ext="", url=None):
+        """Send tts voice, see `TtsVoiceSender.send`."""
+        return await api_request(
+            self._send_request(template_id, params, phone_number, nationcode,
+                               playtimes, ext, url),
+            self._httpclient
+        )
+
+
+class AsyncFileVoiceSender(voice.FileVoiceSender):
+
+    async def send(self, fid, phone_number, nationcode="86",
+                   playtimes=2, ext="", url=None):
+        """Send file voice, see `FileVoiceSender.send`."""
+        return await api_request(
+            self._send_request(fid, phone_number, nationcode, playtimes, ext,
+                               url),
+            self._httpclient
+        )
+
+
+class AsyncVoiceFileUploader(voice.VoiceFileUploader):
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncVoiceFileUploader, self).__init__(*args, **kwargs)
+        self._flights = {}
+
+    async def upload(self, file_content, content_type="mp3", url=None):
+        """Upload voice file, see `VoiceFileUploader.upload`.
+
+        With a cache, concurrent uploads of the same content by this
+        uploader are collapsed into one request.  Hashing the content and
+        the cache lookups run in the loop's default executor.
+        """
+        loop = asyncio.get_event_loop()
+        body = self._body(file_content)
+        file_sha1sum = await loop.run_in_executor(None, self._sha1sum, body)
+        if self._cache is None:
+            return await api_request(
+                self._upload_request(body, content_type, url,
+                                     file_sha1sum),
+                self._httpclient
+            )
+        fid = await loop.run_in_executor(
+            None, self._cache.get, self._appid, file_sha1sum)
+        if fid is not None:
+            return self._cache.hit(fid)
+        while True:
+            flight = self._flights.get(file_sha1sum)
+            if flight is None:
+                break
+            try:
+                return dict(await asyncio.shield(flight))
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # the leading upload was cancelled, upload again
+
+        flight = loop.create_future()
+        self._flights[file_sha1sum] = flight
+        try:
+            res = await api_request(
+                self._upload_request(body, content_type, url,
+                                     file_sha1sum),
+                self._httpclient
+            )
+            await loop.run_in_executor(
+                None, self._cache.store, self._appid, file_sha1sum, res)
+            flight.set_result(res)
+            return res
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # retrieved, even if no other upload waits for it
+            flight.exception()
+            raise
+        except BaseException:
+            flight.cancel()
+            raise
+        finally:
+            del self._flights[file_sha1sum]
+
+    async def upload_file(self, path, content_type=None, url=None):
+        """Upload voice file from `path`, see
+        `VoiceFileUploader.upload_file`."""
+        with open(path, "rb") as f:
+            return await self.upload(
+                f, self._content_type(path, content_type), url)
+
+
+class AsyncSmsStatusConsumer(consumer.SmsStatusConsumer):
+    """Async iterator version of `qcloudsms_py.consumer.SmsStatusConsumer`,
+    `puller` must be an `AsyncSmsStatusPuller`:
+
+        async for record in AsyncSmsStatusConsumer(puller):
+            ...
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncSmsStatusConsumer, self).__init__(*args, **kwargs)
+        self._yielded = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._yielded:
+            self._yielded = False
+            self._ack()
+        while not self._pending:
+            if self._stopped.is_set():
+                raise StopAsyncIteration
+            try:
+                delay = self._adapt(self._accept(await self._pull()))
+            except Exception as e:
+                delay = self._fail(e)
+            if delay:
+                await asyncio.sleep(delay)
+        self._yielded = True
+        return self._pending[0]
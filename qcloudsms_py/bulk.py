@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import csv
+import io
+import sys
+
+from qcloudsms_py import util
+from qcloudsms_py.consumer import PullError
+from qcloudsms_py.sms import SmsMultiSender, SmsMobileStatusPuller
+
+
+__all__ = [
+    "SmsBulkSender",
+    "SmsBulkMobileStatusPuller",
+    "BulkSendResult",
+    "TruncatedPull",
+    "iter_lines",
+    "iter_csv"
+]
+
+
+# Maximum phone numbers accepted by one sendmultisms2 request.
+MULTI_SEND_MAX = 200
+
+# `result` recorded for mobiles whose chunk failed without a response.
+RESULT_CLIENT_ERROR = -1
+
+
+def chunked(iterable, size):
+    """Split `iterable` into lists of at most `size` items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _open_text(path_or_file, encoding):
+    if hasattr(path_or_file, "read"):
+        return path_or_file, False
+    if sys.version_info >= (3,):
+        return io.open(path_or_file, encoding=encoding, newline=""), True
+    return open(path_or_file, "rb"), True
+
+
+def iter_lines(path_or_file, encoding="utf-8"):
+    """Read phone numbers from a file with one number per line.
+
+    Blank lines are skipped, the file is read lazily.
+
+    :param path_or_file: file path or file object
+    :param encoding: (optional) file encoding
+    """
+    f, owned = _open_text(path_or_file, encoding)
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if owned:
+            f.close()
+
+
+def iter_csv(path_or_file, column=0, header=False, encoding="utf-8",
+             **kwargs):
+    """Read phone numbers from one column of a CSV file.
+
+    Rows without the column or with an empty value are skipped, the
+    file is read lazily.
+
+    :param path_or_file: file path or file object
+    :param column: (optional) column index, or column name if `header`
+    :param header: (optional) whether the first row is a header
+    :param encoding: (optional) file encoding
+    :param kwargs: (optional) extra arguments for `csv.reader`
+    """
+    f, owned = _open_text(path_or_file, encoding)
+    try:
+        reader = csv.reader(f, **kwargs)
+        if header:
+            names = next(reader, [])
+            if not isinstance(column, int):
+                column = names.index(column)
+        for row in reader:
+            if len(row) > column:
+                value = row[column].strip()
+                if value:
+                    yield value
+    finally:
+        if owned:
+            f.close()
+
+
+class BulkSendResult(object):
+    """Merged result of a bulk send, keyed by mobile.
+
+    Every mobile maps to the `detail` entry returned by the server, e.g.
+    `{"result": 0, "errmsg": "OK", "mobile": ..., "sid": ..., "fee": 1}`.
+    Mobiles of a chunk which failed as a whole get an entry with the
+    chunk's `result` code, or `RESULT_CLIENT_ERROR` when the request
+    raised.
+    """
+
+    def __init__(self):
+        self.details = {}
+        self.errors = []
+
+    def add(self, phone_numbers, response=None, error=None):
+        """Merge the outcome of one chunk.
+
+        :param phone_numbers: phone numbers of the chunk
+        :param response: parsed response of the chunk
+        :param error: exception raised by the chunk request
+        """
+        if error is not None:
+            self.errors.append((phone_numbers, error))
+            for pn in phone_numbers:
+                self.details[str(pn)] = {
+                    "result": RESULT_CLIENT_ERROR,
+                    "errmsg": str(error),
+                    "mobile": str(pn)
+                }
+            return
+        detail = response.get("detail") or []
+        for entry in detail:
+            self.details[str(entry.get("mobile"))] = entry
+        if len(detail) < len(phone_numbers):
+            for pn in phone_numbers:
+                self.details.setdefault(str(pn), {
+                    "result": response.get("result", RESULT_CLIENT_ERROR),
+                    "errmsg": response.get("errmsg", ""),
+                    "mobile": str(pn)
+                })
+
+    def __len__(self):
+        return len(self.details)
+
+    def __iter__(self):
+        return iter(self.details)
+
+    def __contains__(self, mobile):
+        return str(mobile) in self.details
+
+    def __getitem__(self, mobile):
+        return self.details[str(mobile)]
+
+    def result(self, mobile):
+        """Return `result` code of `mobile`, 0 means success."""
+        return self.details[str(mobile)]["result"]
+
+    def sid(self, mobile):
+        """Return sid of `mobile`, None if sending failed."""
+        return self.details[str(mobile)].get("sid") or None
+
+    @property
+    def succeeded(self):
+        return [mobile for mobile, entry in self.details.items()
+                if entry["result"] == 0]
+
+    @property
+    def failed(self):
+        return [mobile for mobile, entry in self.details.items()
+                if entry["result"] != 0]
+
+
+class SmsBulkSender(object):
+    """Send to recipient lists of any size.
+
+    Phone numbers are split into chunks the server accepts in one
+    sendmultisms2 request and the chunks are sent concurrently by
+    `max_workers` threads.  `send` and `send_with_param` merge all
+    results into one `BulkSendResult`, `iter_send` and
+    `iter_send_with_param` stream results back instead and read phone
+    numbers lazily with backpressure.
+    """
+
+    def __init__(self, appid, appkey, httpclient=None,
+                 chunk_size=MULTI_SEND_MAX, max_workers=8, max_pending=None,
+                 result_class=BulkSendResult):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: (optional) `HTTPClientInterface` instance
+        :param chunk_size: (optional) phone numbers per request, at most
+                           `MULTI_SEND_MAX`
+        :param max_workers: (optional) number of concurrent requests
+        :param max_pending: (optional) maximum chunks read ahead of the
+                            consumer, default is 2 * max_workers
+        :param result_class: (optional) class of the results returned
+                             by `send` and `send_with_param`, e.g.
+                             `qcloudsms_py.results.ResultStore`
+        """
+        if not 0 < chunk_size <= MULTI_SEND_MAX:
+            raise ValueError("chunk_size must be in [1, {}]".format(
+                MULTI_SEND_MAX))
+        self._sender = SmsMultiSender(appid, appkey, httpclient)
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._result_class = result_class
+
+    def _iter_dispatch(self, func, phone_numbers):
+        return util.imap_unordered(
+            func, chunked(phone_numbers, self._chunk_size),
+            self._max_workers, self._max_pending)
+
+    def iter_send(self, sms_type, nationcode, phone_numbers, msg,
+                  extend="", ext="", url=None):
+        """Stream a SMS message to phone numbers read from an iterator.
+
+        Yield `(chunk, response, error)` for every request as soon as it
+        completes.  Phone numbers are only read as fast as results are
+        consumed, so memory stays bounded however long `phone_numbers`
+        is, see `iter_lines` and `iter_csv`.  Parameters are the same
+        as `send`.
+        """
+        return self._iter_dispatch(
+            lambda chunk: self._sender.send(
+                sms_type, nationcode, chunk, msg, extend, ext, url),
+            phone_numbers
+        )
+
+    def iter_send_with_param(self, nationcode, phone_numbers, template_id,
+                             params, sign="", extend="", ext="", url=None):
+        """Stream a SMS message with template parameters to phone
+        numbers read from an iterator, see `iter_send`.  Parameters are
+        the same as `send_with_param`.
+        """
+        return self._iter_dispatch(
+            lambda chunk: self._sender.send_with_param(
+                nationcode, chunk, template_id, params,
+                sign, extend, ext, url),
+            phone_numbers
+        )
+
+    def send(self, sms_type, nationcode, phone_numbers, msg,
+             extend="", ext="", url=None):
+        """Send a SMS message to any number of phones.
+
+        :param sms_type: SMS message type, Enum{0: normal SMS, 1: marketing SMS}
+        :param nationcode: nation dialing code, e.g. China is 86, USA is 1
+        :param phone_numbers: phone number array
+        :param msg: SMS message content
+        :param extend: extend field, default is empty string
+        :param ext: ext field, content will be returned by server as it is
+        :param url: custom url
+        """
+        result = self._result_class()
+        for chunk, response, error in self.iter_send(
+                sms_type, nationcode, phone_numbers, msg, extend, ext, url):
+            result.add(chunk, response, error)
+        return result
+
+    def send_with_param(self, nationcode, phone_numbers, template_id,
+                        params, sign="", extend="", ext="", url=None):
+        """Send a SMS message with template parameters to any number
+        of phones.
+
+        :param nationcode: nation dialing code, e.g. China is 86, USA is 1
+        :param phone_numbers: multiple phone numbers
+        :param template_id: template id
+        :param params: template parameters
+        :param sign: Sms user sign
+        :param extend: extend field, default is empty string
+        :param ext: ext field, content will be returned by server as it is
+        :param url: custom url
+        """
+        result = self._result_class()
+        for chunk, response, error in self.iter_send_with_param(
+                nationcode, phone_numbers, template_id, params,
+                sign, extend, ext, url):
+            result.add(chunk, response, error)
+        return result
+
+
+class TruncatedPull(Exception):
+    """Some windows of a mobile still returned a full page at
+    `min_window` seconds, records after the page may be missing."""
+
+    def __init__(self, windows):
+        self.windows = windows
+        super(TruncatedPull, self).__init__(windows)
+
+    def __str__(self):
+        return "{} windows returned a full page: {}".format(
+            len(self.windows), ", ".join(
+                "{}-{}".format(begin, end) for begin, end in self.windows))
+    __repr__ = __str__
+
+
+class SmsBulkMobileStatusPuller(object):
+    """Pull status of many mobiles over one time range concurrently.
+
+    Every (nationcode, mobile) pair is pulled by one of `max_workers`
+    threads.  A time window whose pull returns a full page of `max_num`
+    records is split in halves, down to `min_window` seconds, so no
+    record is cut off by the page size.  A window that still returns a
+    full page at `min_window` seconds is reported by a `TruncatedPull`
+    error.  Results are streamed back per mobile, merged over all
+    windows.
+    """
+
+    def __init__(self, appid, appkey, httpclient=None, max_workers=8,
+                 max_num=100, min_window=60, max_pending=None):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: (optional) `HTTPClientInterface` instance
+        :param max_workers: (optional) number of concurrent requests
+        :param max_num: (optional) maximum records of one pull
+        :param min_window: (optional) windows shorter than this many
+                           seconds are not split further
+        :param max_pending: (optional) maximum mobiles read ahead of the
+                            consumer, default is 2 * max_workers
+        """
+        self._puller = SmsMobileStatusPuller(appid, appkey, httpclient)
+        self._max_workers = max_workers
+        self._max_num = max_num
+        self._min_window = min_window
+        self._max_pending = max_pending
+
+    def _pull_window(self, msg_type, nationcode, mobile,
+                     begin_time, end_time, url, truncated):
+        response = self._puller._pull(msg_type, nationcode, mobile,
+                                      begin_time, end_time, self._max_num,
+                                      url)
+        if response.get("result", 0) != 0:
+            raise PullError(response.get("result"), response.get("errmsg"))
+        records = response.get("data") or []
+        if len(records) < self._max_num:
+            return records
+        if end_time - begin_time <= self._min_window:
+            truncated.append((begin_time, end_time))
+            return records
+        middle = (begin_time + end_time) // 2
+        return (
+            self._pull_window(msg_type, nationcode, mobile,
+                              begin_time, middle, url, truncated) +
+            self._pull_window(msg_type, nationcode, mobile,
+                              middle + 1, end_time, url, truncated)
+        )
+
+    def _iter_pull(self, msg_type, mobiles, begin_time, end_time, url):
+        def pull(pair):
+            nationcode, mobile = pair
+            truncated = []
+            records = self._pull_window(msg_type, nationcode, mobile,
+                                        begin_time, end_time, url,
+                                        truncated)
+            return records, truncated
+
+        for pair, result, error in util.imap_unordered(
+                pull, mobiles, self._max_workers, self._max_pending):
+            records, truncated = result or ([], None)
+            if error is None and truncated:
+                error = TruncatedPull(truncated)
+            yield pair[0], pair[1], records, error
+
+    def iter_pull_callback(self, mobiles, begin_time, end_time, url=None):
+        """Pull callback SMS message status for many mobiles.
+
+        Yield `(nationcode, mobile, records, error)` for every mobile as
+        soon as all its windows are pulled, `error` is the exception of
+        a failed pull, a `TruncatedPull` if some records may be missing
+        (`records` then has the pulled ones), or None.
+
+        :param mobiles: iterable of (nationcode, mobile) pairs
+        :param begin_time: begin time, unix timestamp
+        :param end_time: end time, unix timestamp
+        :param url: custom url
+        """
+        return self._iter_pull(0, mobiles, begin_time, end_time, url)
+
+    def iter_pull_reply(self, mobiles, begin_time, end_time, url=None):
+        """Pull reply SMS message status for many mobiles, see
+        `iter_pull_callback`.
+
+        :param mobiles: iterable of (nationcode, mobile) pairs
+        :param begin_time: begin time, unix timestamp
+        :param end_time: end time, unix timestamp
+        :param url: custom url
+        """
+        return self._iter_pull(1, mobiles, begin_time, end_time, url)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+
+from qcloudsms_py import util
+from qcloudsms_py.bulk import MULTI_SEND_MAX, BulkSendResult, chunked
+from qcloudsms_py.httpclient import HTTPPooledClient
+from qcloudsms_py.resolver import Resolver
+from qcloudsms_py.sms import SmsMultiSender
+
+if sys.version_info >= (3,):
+    import queue
+else:
+    import Queue as queue
+
+
+__all__ = [
+    "CampaignDispatcher"
+]
+
+
+# (sender, threads) of a worker process, set by `_init_worker`
+_worker = None
+
+# Seconds between checks that no worker process died
+_WATCH_INTERVAL = 1.0
+
+
+def _default_httpclient(threads):
+    return HTTPPooledClient(max_size=threads, resolver=Resolver())
+
+
+def _init_worker(appid, appkey, threads, httpclient_factory, pids):
+    global _worker
+    if httpclient_factory is None:
+        httpclient = _default_httpclient(threads)
+    else:
+        httpclient = httpclient_factory()
+    _worker = (SmsMultiSender(appid, appkey, httpclient), threads)
+    # tell the parent which processes are the workers of its pool
+    pids.put(os.getpid())
+
+
+def _portable(error):
+    """Return `error`, or a RuntimeError describing it if it cannot be
+    sent back to the parent process."""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError("{}: {}".format(type(error).__name__, error))
+    return error
+
+
+def _send_chunks(task):
+    """Send the chunks of one task concurrently in a worker process,
+    return a list of `(chunk, response, error)`."""
+    method, args, chunks = task
+    sender, threads = _worker
+    if method == "send":
+        sms_type, nationcode, msg, extend, ext, url = args
+
+        def func(chunk):
+            return sender.send(
+                sms_type, nationcode, chunk, msg, extend, ext, url)
+    else:
+        nationcode, template_id, params, sign, extend, ext, url = args
+
+        def func(chunk):
+            return sender.send_with_param(
+                nationcode, chunk, template_id, params,
+                sign, extend, ext, url)
+
+    results = []
+    for chunk, response, error in util.imap_unordered(
+            func, chunks, min(threads, len(chunks))):
+        if error is not None:
+            error = _portable(error)
+        results.append((chunk, response, error))
+    return results
+
+
+def _run_task(task):
+    """Run a pickled `_send_chunks` task, return pickled `(results,
+    None)` or `(None, error)`.  The parent gets an outcome of every task
+    this way, also on Python 2 whose pool has no error callback."""
+    try:
+        outcome = (_send_chunks(pickle.loads(task)), None)
+    except BaseException as e:
+        outcome = (None, _portable(e))
+    try:
+        return pickle.dumps(outcome, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        return pickle.dumps((None, _portable(e)), pickle.HIGHEST_PROTOCOL)
+
+
+class CampaignDispatcher(object):
+    """Send to recipient lists of any size from a pool of processes.
+
+    Like `SmsBulkSender`, but requests are built, signed and sent by
+    `processes` worker processes, so serialization, signatures and TLS
+    are not bound to one core.  Every worker process has its own pooled
+    HTTP client and `SmsMultiSender` and sends the chunks of a task
+    with `threads` threads.  Phone numbers are read lazily by the
+    parent, results are streamed back to it in completion order and
+    `send` and `send_with_param` merge them into one `BulkSendResult`,
+    e.g.:
+
+        with CampaignDispatcher(appid, appkey, processes=4) as dispatcher:
+            result = dispatcher.send_with_param(
+                86, iter_lines("recipients.txt"), 7839, ["5678"])
+
+    Worker processes are started on first use and kept until `close`.
+    If a worker process dies, its task is lost: the pool is terminated
+    and the iteration raises `RuntimeError`.
+    """
+
+    def __init__(self, appid, appkey, processes=None,
+                 chunk_size=MULTI_SEND_MAX, threads=8, chunks_per_task=None,
+                 max_pending=None, httpclient_factory=None,
+                 result_class=BulkSendResult):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param processes: (optional) number of worker processes, default
+                          is the number of CPUs
+        :param chunk_size: (optional) phone numbers per request, at most
+                           `MULTI_SEND_MAX`
+        :param threads: (optional) concurrent requests per process
+        :param chunks_per_task: (optional) chunks handed to a worker
+                                process at once, default is `threads`
+        :param max_pending: (optional) maximum tasks read ahead of the
+                            consumer, default is 2 * processes
+        :param httpclient_factory: (optional) picklable function called
+                                   without arguments in every worker
+                                   process to create its HTTP client,
+                                   default is a pooled client
+        :param result_class: (optional) class of the results returned
+                             by `send` and `send_with_param`, e.g.
+                             `qcloudsms_py.results.ResultStore`
+        """
+        if not 0 < chunk_size <= MULTI_SEND_MAX:
+            raise ValueError("chunk_size must be in [1, {}]".format(
+                MULTI_SEND_MAX))
+        self._appid = appid
+        self._appkey = appkey
+        self._processes = processes or multiprocessing.cpu_count()
+        self._chunk_size = chunk_size
+        self._threads = max(threads, 1)
+        self._chunks_per_task = chunks_per_task or self._threads
+        self._max_pending = max(max_pending or 2 * self._processes, 1)
+        self._httpclient_factory = httpclient_factory
+        self._result_class = result_class
+        self._pool = None
+        # pids reported by the worker processes of the pool
+        self._pid_queue = None
+        self._pids = set()
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pid_queue = multiprocessing.Queue()
+            self._pids = set()
+            self._pool = multiprocessing.Pool(
+                self._processes, _init_worker,
+                (self._appid, self._appkey, self._threads,
+                 self._httpclient_factory, self._pid_queue))
+        return self._pool
+
+    def _worker_pids(self):
+        """Return the pids of all worker processes the pool started."""
+        while True:
+            try:
+                self._pids.add(self._pid_queue.get_nowait())
+            except queue.Empty:
+                return self._pids
+
+    def _abandon(self, pool):
+        """Terminate `pool` after a worker process died.  Python 2's
+        `terminate` can block forever on a queue lock the dead worker
+        held, so it runs in a daemon thread and the remaining workers
+        are killed directly if it doesn't finish soon."""
+        thread = threading.Thread(target=pool.terminate)
+        thread.daemon = True
+        thread.start()
+        thread.join(_WATCH_INTERVAL)
+        if thread.is_alive():
+            pids = self._worker_pids()
+            for process in multiprocessing.active_children():
+                if process.pid in pids:
+                    process.terminate()
+        self._pid_queue.close()
+
+    def _wait(self, pool, done):
+        """Return the next task outcome, raise `RuntimeError` if a worker
+        process died instead, e.g. killed by the OOM killer."""
+        while True:
+            # the pool replaces a dead worker, whose task never ends, by
+            # a new one, which reports one pid more than `processes`
+            if len(self._worker_pids()) > self._processes:
+                self._pool = None
+                self._abandon(pool)
+                raise RuntimeError("a worker process died, its task is lost")
+            try:
+                return done.get(timeout=_WATCH_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _iter_dispatch(self, method, args, phone_numbers):
+        pool = self._get_pool()
+        done = queue.Queue()
+        tasks = chunked(chunked(phone_numbers, self._chunk_size),
+                        self._chunks_per_task)
+        kwargs = {"callback": done.put}
+        if sys.version_info >= (3,):
+            # the pool failed to run a task
+            kwargs["error_callback"] = lambda e: done.put((None, e))
+        pending = 0
+        exhausted = False
+        while True:
+            while not exhausted and pending < self._max_pending:
+                try:
+                    chunks = next(tasks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # pickled here, so an unpicklable argument raises here
+                # instead of in the pool's task thread
+                task = pickle.dumps((method, args, chunks),
+                                    pickle.HIGHEST_PROTOCOL)
+                pool.apply_async(_run_task, (task,), **kwargs)
+                pending += 1
+            if pending == 0:
+                return
+            outcome = self._wait(pool, done)
+            pending -= 1
+            if isinstance(outcome, bytes):
+                outcome = pickle.loads(outcome)
+            results, error = outcome
+            if error is not None:
+                # a task failed, or its results could not be sent back
+                raise error
+            for item in results:
+                yield item
+
+    def iter_send(self, sms_type, nationcode, phone_numbers, msg,
+                  extend="", ext="", url=None):
+        """Stream a SMS message to phone numbers read from an iterator.
+
+        Yield `(chunk, response, error)` for every request as soon as
+        its task completes, see `SmsBulkSender.iter_send`.  Parameters
+        are the same as `send`.
+        """
+        return self._iter_dispatch(
+            "send", (sms_type, nationcode, msg, extend, ext, url),
+            phone_numbers)
+
+    def iter_send_with_param(self, nationcode, phone_numbers, template_id,
+                             params, sign="", extend="", ext="", url=None):
+        """Stream a SMS message with template parameters to phone
+        numbers read from an iterator, see `iter_send`.  Parameters are
+        the same as `send_with_param`.
+        """
+        return self._iter_dispatch(
+            "send_with_param",
+            (nationcode, template_id, params, sign, extend, ext, url),
+            phone_numbers)
+
+    def send(self, sms_type, nationcode, phone_numbers, msg,
+             extend="", ext="", url=None):
+        """Send a SMS message to any number of phones.
+
+        :param sms_type: SMS message type, Enum{0: normal SMS, 1: marketing SMS}
+        :param nationcode: nation dialing code, e.g. China is 86, USA is 1
+        :param phone_numbers: phone numbers, can be an iterator
+        :param msg: SMS message content
+        :param extend: extend field, default is empty string
+        :param ext: ext field, content will be returned by server as it is
+        :param url: custom url
+        """
+        result = self._result_class()
+        for chunk, response, error in self.iter_send(
+                sms_type, nationcode, phone_numbers, msg, extend, ext, url):
+            result.add(chunk, response, error)
+        return result
+
+    def send_with_param(self, nationcode, phone_numbers, template_id,
+                        params, sign="", extend="", ext="", url=None):
+        """Send a SMS message with template parameters to any number
+        of phones.
+
+        :param nationcode: nation dialing code, e.g. China is 86, USA is 1
+        :param phone_numbers: phone numbers, can be an iterator
+        :param template_id: template id
+        :param params: template parameters
+        :param sign: Sms user sign
+        :param extend: extend field, default is empty string
+        :param ext: ext field, content will be returned by server as it is
+        :param url: custom url
+        """
+        result = self._result_class()
+        for chunk, response, error in self.iter_send_with_param(
+                nationcode, phone_numbers, template_id, params,
+                sign, extend, ext, url):
+            result.add(chunk, response, error)
+        return result
+
+    def close(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+            self._pid_queue.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
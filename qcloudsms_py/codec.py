@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""JSON codec of request and response bodies.
+
+The fastest installed backend is used, `orjson`, then `ujson`, then the
+standard library `json`.  Another backend can be selected with
+`set_backend`, by name or as an object with `dumps` and `loads`
+functions:
+
+    from qcloudsms_py import codec
+    codec.set_backend("json")
+
+- `dumps(obj)` returns a str, for splicing into prepared bodies
+- `dumpb(obj)` returns UTF-8 bytes, ready to be sent as a body
+- `loads(data)` parses str or bytes, bytes are parsed without decoding
+  them first where the backend can
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import sys
+
+
+__all__ = [
+    "dumps",
+    "dumpb",
+    "loads",
+    "set_backend",
+    "backend"
+]
+
+
+def _json_backend():
+    def dumpb(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    if sys.version_info >= (3, 6):
+        loads = json.loads
+    elif sys.version_info >= (3,):
+        def loads(data):
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            return json.loads(data)
+    else:
+        def loads(data):
+            return json.loads(data, encoding="utf-8")
+    return json.dumps, dumpb, loads
+
+
+def _orjson_backend():
+    import orjson
+
+    # orjson rejects what stdlib json accepts, e.g. non-str keys or
+    # integers above 64 bits, those fall back to stdlib
+    def dumpb(obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            return json.dumps(obj).encode("utf-8")
+
+    def dumps(obj):
+        return dumpb(obj).decode("utf-8")
+
+    return dumps, dumpb, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumpb(obj):
+        return ujson.dumps(obj).encode("utf-8")
+
+    return ujson.dumps, dumpb, ujson.loads
+
+
+_BACKENDS = {
+    "orjson": _orjson_backend,
+    "ujson": _ujson_backend,
+    "json": _json_backend
+}
+
+
+# name of the backend in use
+backend = None
+
+dumps = dumpb = loads = None
+
+
+def set_backend(name):
+    """Select the JSON backend.
+
+    :param name: "orjson", "ujson", "json", "auto" for the fastest
+                 installed one, or an object with `dumps(obj)` and
+                 `loads(data)` functions
+    """
+    global backend, dumps, dumpb, loads
+    if name == "auto":
+        for candidate in ("orjson", "ujson"):
+            try:
+                return set_backend(candidate)
+            except ImportError:
+                pass
+        return set_backend("json")
+
+    if name in _BACKENDS:
+        dumps, dumpb, loads = _BACKENDS[name]()
+        backend = name
+        return
+
+    if not (hasattr(name, "dumps") and hasattr(name, "loads")):
+        raise ValueError("unknown JSON backend {!r}".format(name))
+    custom = name
+
+    def custom_dumpb(obj):
+        data = custom.dumps(obj)
+        if isinstance(data, bytes):
+            return data
+        return data.encode("utf-8")
+
+    def custom_dumps(obj):
+        data = custom.dumps(obj)
+        if isinstance(data, bytes):
+            return data.decode("utf-8")
+        return data
+
+    dumps, dumpb, loads = custom_dumps, custom_dumpb, custom.loads
+    backend = getattr(custom, "__name__", repr(custom))
+
+
+set_backend("auto")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import json
+import os
+import threading
+
+
+__all__ = [
+    "SmsStatusConsumer",
+    "PullError"
+]
+
+
+class PullError(Exception):
+
+    def __init__(self, result, errmsg=None):
+        self.result = result
+        self.errmsg = errmsg
+        super(PullError, self).__init__(result, errmsg)
+
+    def __str__(self):
+        return "pull failed {}: {}".format(self.result, self.errmsg)
+    __repr__ = __str__
+
+
+def _callback_key(record):
+    return "|".join((
+        str(record.get("sid", "")),
+        str(record.get("report_status", "")),
+        str(record.get("user_receive_time", ""))
+    ))
+
+
+def _reply_key(record):
+    return "|".join((
+        str(record.get("nationcode", "")),
+        str(record.get("mobile", "")),
+        str(record.get("time", "")),
+        str(record.get("text", ""))
+    ))
+
+
+class SmsStatusConsumer(object):
+    """Continuously pull status reports with `SmsStatusPuller`.
+
+    Iterating the consumer yields callback (or reply) records forever,
+    until `stop` is called.  The polling interval adapts to how full the
+    pulled batches are: a full batch is followed by another pull right
+    away, an empty one doubles the interval up to `max_interval`.
+
+    Records are deduplicated over the last `dedupe_size` keys.  With a
+    `checkpoint` path, pulled records are saved before they are yielded
+    and acknowledged once the caller asks for the next record, so a
+    restarted consumer yields unacknowledged records again instead of
+    losing them, and never yields acknowledged ones twice.
+
+    The checkpoint is a log of JSON lines: a pull appends its new
+    records, an acknowledgement appends the count of acknowledged
+    records, and once the log is about twice the size of the state it
+    is rewritten as a snapshot of the remembered keys and the pending
+    records.
+    """
+
+    KINDS = {
+        "callback": (0, _callback_key),
+        "reply": (1, _reply_key)
+    }
+
+    def __init__(self, puller, kind="callback", max_num=100,
+                 min_interval=1, max_interval=60, checkpoint=None,
+                 dedupe_size=100000, on_error=None, url=None):
+        """
+        :param puller: `qcloudsms_py.SmsStatusPuller` instance
+        :param kind: (optional) "callback" or "reply"
+        :param max_num: (optional) maximum records of one pull
+        :param min_interval: (optional) minimum seconds between two pulls
+                             which didn't return a full batch
+        :param max_interval: (optional) maximum seconds between two pulls
+        :param checkpoint: (optional) checkpoint file path
+        :param dedupe_size: (optional) number of record keys remembered
+                            for deduplication
+        :param on_error: (optional) function called with the exception
+                         when a pull fails, the consumer then backs off
+                         and continues; without it the exception is
+                         raised
+        :param url: (optional) custom url
+        """
+        if kind not in self.__class__.KINDS:
+            raise ValueError("invalid kind")
+        self._puller = puller
+        self._type, self._key = self.__class__.KINDS[kind]
+        self._max_num = max_num
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = min_interval
+        self._checkpoint = checkpoint
+        self._dedupe_size = dedupe_size
+        self._on_error = on_error
+        self._url = url
+        self._stopped = threading.Event()
+        self._seen = collections.OrderedDict()
+        self._pending = collections.deque()
+        # records acknowledged and entries logged since the snapshot
+        self._acked = 0
+        self._logged = 0
+        self._load()
+
+    def stop(self):
+        """Stop iteration before the next pull."""
+        self._stopped.set()
+
+    def _remember(self, key):
+        self._seen[key] = None
+        if len(self._seen) > self._dedupe_size:
+            self._seen.popitem(last=False)
+
+    def _load(self):
+        if not self._checkpoint or not os.path.exists(self._checkpoint):
+            return
+        acked = 0
+        with open(self._checkpoint) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # torn last line of a crashed process
+                    break
+                for key in entry.get("seen", []):
+                    self._remember(key)
+                self._pending.extend(entry.get("pending", []))
+                for record in entry.get("pulled", []):
+                    self._remember(self._key(record))
+                    self._pending.append(record)
+                acked = entry.get("acked", acked)
+                self._logged += 1
+        for _ in range(min(acked, len(self._pending))):
+            self._pending.popleft()
+        self._compact()
+
+    def _compact(self):
+        """Rewrite the checkpoint as a snapshot of the state."""
+        tmp = self._checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "seen": list(self._seen),
+                "pending": list(self._pending)
+            }, f)
+            f.write("\n")
+        if hasattr(os, "replace"):
+            os.replace(tmp, self._checkpoint)
+        else:
+            if os.path.exists(self._checkpoint):
+                os.remove(self._checkpoint)
+            os.rename(tmp, self._checkpoint)
+        self._acked = 0
+        self._logged = 0
+
+    def _append(self, entry, size):
+        """Append `entry` of `size` records or keys to the checkpoint."""
+        if not self._checkpoint:
+            return
+        self._logged += size
+        if self._logged > 2 * (len(self._seen) + len(self._pending)) + \
+                self._max_num:
+            self._compact()
+            return
+        with open(self._checkpoint, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _accept(self, response):
+        """Queue new records of a pull response, return batch size."""
+        if response.get("result", 0) != 0:
+            raise PullError(response.get("result"), response.get("errmsg"))
+        records = response.get("data") or []
+        pulled = []
+        for record in records:
+            key = self._key(record)
+            if key in self._seen:
+                continue
+            self._remember(key)
+            pulled.append(record)
+        if pulled:
+            self._pending.extend(pulled)
+            self._append({"pulled": pulled}, len(pulled))
+        return len(records)
+
+    def _ack(self):
+        self._pending.popleft()
+        self._acked += 1
+        self._append({"acked": self._acked}, 1)
+
+    def _adapt(self, count):
+        """Return seconds to wait before the next pull."""
+        if count >= self._max_num:
+            self._interval = self._min_interval
+            return 0
+        if count == 0:
+            self._interval = self._interval * 2 or self._min_interval
+        else:
+            # aim at half full batches
+            self._interval *= 0.5 * self._max_num / count
+        self._interval = min(max(self._interval, self._min_interval),
+                             self._max_interval)
+        return self._interval
+
+    def _fail(self, error):
+        if self._on_error is None:
+            raise error
+        self._on_error(error)
+        self._interval = min(max(self._interval * 2, self._min_interval),
+                             self._max_interval)
+        return self._interval
+
+    def _pull(self):
+        return self._puller._pull(self._type, self._max_num, self._url)
+
+    def __iter__(self):
+        while True:
+            while self._pending:
+                yield self._pending[0]
+                self._ack()
+            if self._stopped.is_set():
+                return
+            try:
+                delay = self._adapt(self._accept(self._pull()))
+            except Exception as e:
+                delay = self._fail(e)
+            if delay:
+                self._stopped.wait(delay)
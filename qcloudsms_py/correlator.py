@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import calendar
+import collections
+import threading
+import time
+
+from qcloudsms_py.metrics import Histogram, _labels
+
+
+__all__ = [
+    "Delivery",
+    "DeliveryCorrelator"
+]
+
+
+# Histogram bucket upper bounds of send to delivery latency, in seconds
+LATENCY_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0,
+                   600.0, 1800.0, 3600.0, 21600.0, 86400.0)
+
+# Endpoints whose responses carry the sids of sent messages
+SEND_ENDPOINTS = ("sendsms", "sendmultisms2")
+
+
+def _parse_time(value, tz_offset):
+    """Parse "YYYY-MM-DD HH:MM:SS" at UTC offset `tz_offset` seconds into
+    a unix time, None if it is not in that format."""
+    try:
+        return calendar.timegm((
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19])
+        )) - tz_offset
+    except (TypeError, ValueError):
+        return None
+
+
+class Delivery(object):
+    """A status report matched with its send."""
+
+    __slots__ = ("sid", "status", "sent", "delivered", "latency", "record")
+
+    def __init__(self, sid, status, sent, delivered, record):
+        self.sid = sid
+        self.status = status
+        self.sent = sent
+        self.delivered = delivered
+        self.latency = max(delivered - sent, 0.0)
+        self.record = record
+
+    def __repr__(self):
+        return "Delivery(sid={!r}, status={!r}, latency={!r})".format(
+            self.sid, self.status, self.latency)
+
+
+class DeliveryCorrelator(object):
+    """Join the sids of sent messages with their status reports.
+
+    Sids are tracked with their send time, by `track_response` or
+    automatically as a hook of an instrumented HTTP client, and status
+    report records, e.g. from `SmsStatusPuller.pull_callback` or a
+    `SmsStatusConsumer`, are matched against them by sid, e.g.:
+
+        correlator = DeliveryCorrelator()
+        httpclient = HTTPPooledClient(hooks=[correlator])
+        ssender = SmsSingleSender(appid, appkey, httpclient)
+        ...
+        for record in SmsStatusConsumer(SmsStatusPuller(appid, appkey)):
+            delivery = correlator.match(record)
+
+    Send to delivery latencies are recorded in histograms per
+    `report_status`.  At most `max_entries` sids are outstanding, about
+    200 bytes each; the oldest are evicted beyond that, and sids without
+    a report after `ttl` seconds expire.
+    """
+
+    def __init__(self, max_entries=1000000, ttl=72 * 3600,
+                 buckets=LATENCY_BUCKETS, tz_offset=8 * 3600,
+                 prefix="qcloudsms"):
+        """
+        :param max_entries: (optional) maximum outstanding sids
+        :param ttl: (optional) seconds an unmatched sid is kept for
+        :param buckets: (optional) latency histogram bucket upper bounds
+        :param tz_offset: (optional) UTC offset in seconds of the
+                          `user_receive_time` of reports, China time by
+                          default
+        :param prefix: (optional) metric name prefix of `render`
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._buckets = buckets
+        self._tz_offset = tz_offset
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        # sid -> send time, in send order
+        self._outstanding = collections.OrderedDict()
+        self._histograms = {}
+        self._counts = {
+            "tracked": 0,
+            "matched": 0,
+            "unmatched": 0,
+            "expired": 0,
+            "evicted": 0
+        }
+
+    def __call__(self, timings):
+        if timings.endpoint not in SEND_ENDPOINTS or \
+                timings.response is None or not timings.response.ok():
+            return
+        try:
+            response = timings.response.json()
+        except ValueError:
+            return
+        if isinstance(response, dict):
+            self.track_response(response, time.time() - timings.total)
+
+    def track(self, sid, sent=None):
+        """Track a sid sent at unix time `sent`, default now."""
+        self.track_many([sid], sent)
+
+    def track_many(self, sids, sent=None):
+        """Track sids sent at unix time `sent`, default now."""
+        if sent is None:
+            sent = time.time()
+        outstanding = self._outstanding
+        with self._lock:
+            count = 0
+            for sid in sids:
+                outstanding[sid] = sent
+                count += 1
+            self._counts["tracked"] += count
+            evicted = len(outstanding) - self._max_entries
+            for _ in range(max(evicted, 0)):
+                outstanding.popitem(last=False)
+                self._counts["evicted"] += 1
+            self._expire(sent - self._ttl)
+
+    def track_response(self, response, sent=None):
+        """Track the sids of a successful single or multi send response,
+        return how many."""
+        if "detail" in response:
+            sids = [entry["sid"] for entry in response["detail"] or []
+                    if entry.get("result") == 0 and entry.get("sid")]
+        elif response.get("result") == 0 and response.get("sid"):
+            sids = [response["sid"]]
+        else:
+            return 0
+        self.track_many(sids, sent)
+        return len(sids)
+
+    def match(self, record):
+        """Match a status report record, return its `Delivery`, None if
+        its sid is not outstanding."""
+        sid = record.get("sid")
+        with self._lock:
+            sent = self._outstanding.pop(sid, None)
+            self._counts["unmatched" if sent is None else "matched"] += 1
+        if sent is None:
+            return None
+        delivered = _parse_time(record.get("user_receive_time"),
+                                self._tz_offset)
+        if delivered is None:
+            delivered = time.time()
+        status = record.get("report_status", "")
+        delivery = Delivery(sid, status, sent, delivered, record)
+        self.histogram(status).observe(delivery.latency)
+        return delivery
+
+    def match_many(self, records):
+        """Match status report records, return the list of their
+        `Delivery`, unmatched records are left out."""
+        deliveries = []
+        for record in records:
+            delivery = self.match(record)
+            if delivery is not None:
+                deliveries.append(delivery)
+        return deliveries
+
+    def _expire(self, deadline):
+        # sids are in send order, the expired ones are at the front
+        outstanding = self._outstanding
+        count = 0
+        while outstanding:
+            sid = next(iter(outstanding))
+            if outstanding[sid] > deadline:
+                break
+            del outstanding[sid]
+            count += 1
+        self._counts["expired"] += count
+        return count
+
+    def expire(self, now=None):
+        """Drop sids tracked more than `ttl` seconds ago, return how
+        many.  Tracking sids expires old ones too."""
+        deadline = (time.time() if now is None else now) - self._ttl
+        with self._lock:
+            return self._expire(deadline)
+
+    def __len__(self):
+        return len(self._outstanding)
+
+    def __contains__(self, sid):
+        return sid in self._outstanding
+
+    def histogram(self, status="SUCCESS"):
+        """Return the latency histogram of reports with `status`."""
+        histogram = self._histograms.get(status)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(
+                    status, Histogram(self._buckets))
+        return histogram
+
+    def counts(self):
+        """Return counts of tracked, matched, unmatched, expired and
+        evicted sids, and of outstanding ones."""
+        with self._lock:
+            counts = dict(self._counts)
+            counts["outstanding"] = len(self._outstanding)
+        return counts
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        self.expire()
+        prefix = self._prefix
+        lines = []
+        name = prefix + "_delivery_latency_seconds"
+        lines.append("# TYPE {} histogram".format(name))
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        for status, histogram in histograms:
+            cumulative, total, count = histogram.snapshot()
+            bounds = [repr(float(b)) for b in histogram.buckets] + ["+Inf"]
+            for bound, n in zip(bounds, cumulative):
+                lines.append("{}_bucket{{{}}} {}".format(name, _labels(
+                    status=status, le=bound), n))
+            labels = _labels(status=status)
+            lines.append("{}_sum{{{}}} {!r}".format(name, labels, total))
+            lines.append("{}_count{{{}}} {}".format(name, labels, count))
+
+        counts = self.counts()
+        name = prefix + "_delivery_sids_total"
+        lines.append("# TYPE {} counter".format(name))
+        for outcome in ("tracked", "matched", "unmatched", "expired",
+                        "evicted"):
+            lines.append("{}{{{}}} {}".format(name, _labels(
+                outcome=outcome), counts[outcome]))
+        name = prefix + "_delivery_sids_outstanding"
+        lines.append("# TYPE {} gauge".format(name))
+        lines.append("{} {}".format(name, counts["outstanding"]))
+        return "\n".join(lines) + "\n"
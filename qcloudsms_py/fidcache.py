@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import sqlite3
+import threading
+import time
+
+
+__all__ = [
+    "FidCache"
+]
+
+
+class _Flight(object):
+
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class FidCache(object):
+    """Persistent cache of uploaded voice files, from content SHA-1 to
+    `fid`, stored in SQLite, e.g.:
+
+        cache = FidCache("/var/cache/qcloudsms/fids.db")
+        uploader = VoiceFileUploader(appid, appkey, cache=cache)
+
+    An upload of content which has been uploaded by the same appid in
+    the last `ttl` seconds returns the cached fid without a request,
+    and concurrent uploads of the same content from the threads of a
+    process are collapsed into one request.  The database can be shared
+    between processes.
+    """
+
+    def __init__(self, path=":memory:", ttl=7 * 86400):
+        """
+        :param path: (optional) SQLite database path, in memory by default
+        :param ttl: (optional) seconds a fid is used for, None for ever
+        """
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._db = sqlite3.connect(path, timeout=30,
+                                   check_same_thread=False)
+        with self._lock:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fids ("
+                "appid TEXT NOT NULL, sha1 TEXT NOT NULL, "
+                "fid TEXT NOT NULL, uploaded REAL NOT NULL, "
+                "PRIMARY KEY (appid, sha1))")
+            self._db.commit()
+
+    def get(self, appid, sha1):
+        """Return the cached fid of content `sha1`, None if there is no
+        unexpired one."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fid, uploaded FROM fids WHERE appid = ? AND sha1 = ?",
+                (str(appid), sha1)).fetchone()
+        if row is None:
+            return None
+        fid, uploaded = row
+        if self._ttl is not None and uploaded + self._ttl <= time.time():
+            return None
+        return fid
+
+    def put(self, appid, sha1, fid):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fids (appid, sha1, fid, uploaded) "
+                "VALUES (?, ?, ?, ?)", (str(appid), sha1, fid, time.time()))
+            self._db.commit()
+
+    def purge(self):
+        """Delete expired fids, return how many were deleted."""
+        if self._ttl is None:
+            return 0
+        with self._lock:
+            count = self._db.execute(
+                "DELETE FROM fids WHERE uploaded <= ?",
+                (time.time() - self._ttl,)).rowcount
+            self._db.commit()
+        return count
+
+    @staticmethod
+    def hit(fid):
+        """Return the response of an upload served from the cache."""
+        return {"result": 0, "errmsg": "OK", "fid": fid, "cached": True}
+
+    def store(self, appid, sha1, response):
+        """Cache the fid of a successful upload `response`."""
+        if response.get("result") == 0 and response.get("fid"):
+            try:
+                self.put(appid, sha1, response["fid"])
+            except sqlite3.Error:
+                # the upload succeeded, a cache failure must not lose it
+                pass
+
+    def fetch(self, appid, sha1, upload):
+        """Return the upload response of content `sha1`, from the cache,
+        from a concurrent upload of the same content, or by calling
+        `upload`.
+
+        :param appid: sdk appid
+        :param sha1: hex SHA-1 of the content
+        :param upload: function uploading the content and returning the
+                       response
+        """
+        fid = self.get(appid, sha1)
+        if fid is not None:
+            return self.hit(fid)
+
+        key = (str(appid), sha1)
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            if leader:
+                break
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.response is not None:
+                return dict(flight.response)
+            # the leader was interrupted, e.g. by KeyboardInterrupt,
+            # upload again
+
+        try:
+            # another flight may have finished since the lookup
+            fid = self.get(appid, sha1)
+            if fid is not None:
+                flight.response = self.hit(fid)
+                return flight.response
+            flight.response = upload()
+            self.store(appid, sha1, flight.response)
+            return flight.response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
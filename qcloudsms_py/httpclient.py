@@ -3,10 +3,18 @@
 
 from __future__ import absolute_import, division, print_function
 
+import errno
 import re
-import json
+import io
+import logging
 import sys
+import time
 import socket
+import ssl
+import threading
+
+from qcloudsms_py import codec
+from qcloudsms_py.metrics import RequestTimings, _clock
 
 if sys.version_info >= (3,):
     from http import client as httplib
@@ -31,6 +39,9 @@ class HTTPRequest(object):
          self.method = method
          self.headers = headers
          self.body = body
+         # set by `util.request_builder`, builds a fresh equivalent
+         # request for retries
+         self.rebuild = None
 
 
 class HTTPResponse(object):
@@ -56,10 +67,7 @@ class HTTPResponse(object):
         return False
 
     def json(self):
-        if sys.version_info >= (3, ) and sys.version_info < (3, 6):
-            return json.loads(self.body.decode("utf-8"),
-                              encoding="utf=8")
-        return json.loads(self.body, encoding="utf-8")
+        return codec.loads(self.body)
 
 
 class HTTPError(Exception):
@@ -99,18 +107,176 @@ def utf8(value):
     return value.encode("utf-8")
 
 
+class FileBody(object):
+    """Request body streamed from a file object, from its current
+    position to its end, so it never has to be held in memory.
+
+    The body is rewound before every send, so a request with it can be
+    sent again, e.g. when a kept-alive connection turns out stale.
+    """
+
+    def __init__(self, fileobj):
+        """
+        :param fileobj: seekable file object opened in binary mode
+        """
+        self.fileobj = fileobj
+        self.offset = fileobj.tell()
+        fileobj.seek(0, io.SEEK_END)
+        self.length = fileobj.tell() - self.offset
+        fileobj.seek(self.offset)
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.fileobj.read(size)
+
+    def rewind(self):
+        self.fileobj.seek(self.offset)
+        return self
+
+
+def _body(body):
+    """Return request `body` ready to be sent."""
+    if isinstance(body, FileBody):
+        return body.rewind()
+    return utf8(body)
+
+
 class HTTPClientInterface(object):
 
     def fetch(self, req):
         raise NotImplementedError
 
+    def close(self):
+        pass
+
+
+_logger = logging.getLogger(__name__)
+
 
-class HTTPSimpleClient(HTTPClientInterface):
+class _Instrumented(object):
+    """Request hooks shared by sync and async clients."""
+
+    def add_hook(self, hook):
+        """Call `hook` with the `RequestTimings` of every request."""
+        self._hooks.append(hook)
+
+    def _timings(self, req, result):
+        """Return a new `RequestTimings`, None if there are no hooks."""
+        if not self._hooks:
+            return None
+        return RequestTimings(req, result.path)
+
+    def _report(self, timings, res=None, error=None):
+        if timings is None:
+            return
+        timings.finish(res, error)
+        for hook in self._hooks:
+            try:
+                hook(timings)
+            except Exception:
+                # a broken hook must not fail a request which was sent
+                _logger.exception("request hook %r failed", hook)
+
+
+def _connect_addrinfo(infos, timeout, source_address=None):
+    """Connect to the first reachable address of `getaddrinfo` results,
+    like `socket.create_connection`."""
+    error = None
+    for family, socktype, proto, _, sockaddr in infos:
+        sock = None
+        try:
+            sock = socket.socket(family, socktype, proto)
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except socket.error as e:
+            error = e
+            if sock is not None:
+                sock.close()
+    if error is not None:
+        raise error
+    raise socket.error("getaddrinfo returns an empty list")
+
+
+# `ssl.SSLSocket.session` exists since Python 3.6
+_HAS_SESSIONS = hasattr(ssl.SSLSocket, "session")
+
+
+class _HTTPConnection(httplib.HTTPConnection):
+    """`HTTPConnection` which connects through `_create_connection`, a
+    replacement of `socket.create_connection`, on Python 2 too."""
+
+    if sys.version_info < (3,):
+        _create_connection = staticmethod(socket.create_connection)
+
+        def connect(self):
+            # Python 2's httplib calls socket.create_connection directly
+            self.sock = self._create_connection(
+                (self.host, self.port), self.timeout, self.source_address)
+            if self._tunnel_host:
+                self._tunnel()
+
+
+class _HTTPSConnection(_HTTPConnection, httplib.HTTPSConnection):
+    """`HTTPSConnection` which resumes the TLS `session`, if any."""
+
+    session = None
+
+    def connect(self):
+        if self.session is None and sys.version_info >= (3,):
+            return httplib.HTTPSConnection.connect(self)
+        # Python 2's HTTPSConnection.connect skips _HTTPConnection's
+        _HTTPConnection.connect(self)
+        kwargs = {}
+        if self.session is not None:
+            kwargs["session"] = self.session
+        self.sock = self._context.wrap_socket(
+            self.sock,
+            server_hostname=self._tunnel_host or self.host,
+            **kwargs
+        )
+
+
+class HTTPSimpleClient(HTTPClientInterface, _Instrumented):
+    """HTTP client which opens a new connection for every request.
+
+    Clients are instrumented with `hooks`: functions called with a
+    `qcloudsms_py.metrics.RequestTimings` after every request, e.g. a
+    `qcloudsms_py.metrics.MetricsRegistry`.  Without hooks nothing is
+    timed.
+
+    With a `qcloudsms_py.resolver.Resolver`, host names are resolved
+    through its cache instead of on every connect.
+
+    All HTTPS connections of a client share one `ssl.SSLContext`, and
+    on Python 3.6+ the last TLS session of every host is cached, so new
+    connections resume it with an abbreviated handshake.
+    """
 
     PATTERN = "(?:http.*://)?(?P<host>[^:/ ]+).?(?P<port>[0-9]*).*"
 
     def __init__(self, connect_timeout=60, request_timeout=60,
-                 proxy=None):
+                 proxy=None, hooks=None, resolver=None, ssl_context=None):
+        """
+        :param connect_timeout: (optional) HTTP connection timeout.
+        :param request_timeout: (optional) HTTP request timeout.
+        :param proxy: (optional) HTTP proxy, "host:port" or (host, port).
+        :param hooks: (optional) list of functions called with the
+                      `RequestTimings` of every request.
+        :param resolver: (optional) `qcloudsms_py.resolver.Resolver`
+                         caching DNS lookups.
+        :param ssl_context: (optional) `ssl.SSLContext` for HTTPS,
+                            default is `ssl.create_default_context()`.
+        """
+        self._hooks = list(hooks or [])
+        self._resolver = resolver
+        self._ssl_context = ssl_context
+        self._sessions = {}
         self._connect_timeout = connect_timeout
         self._request_timeout = request_timeout
         if isinstance(proxy, (list, tuple)):
@@ -128,21 +294,83 @@ class HTTPSimpleClient(HTTPClientInterface):
         else:
             raise ValueError("invalid proxy")
 
-    def fetch(self, req):
-        result = urlparse.urlparse(req.url)
+    def _resolve(self, host, port):
+        if self._resolver is not None:
+            return self._resolver.resolve(host, port)
+        return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+    def _create_connection(self, timings=None):
+        """Return a `socket.create_connection` replacement which resolves
+        through the resolver and records resolve and connect times into
+        `timings`."""
+        def create_connection(address,
+                              timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                              source_address=None):
+            host, port = address[:2]
+            if timings is None:
+                return _connect_addrinfo(self._resolve(host, port),
+                                         timeout, source_address)
+            start = _clock()
+            infos = self._resolve(host, port)
+            timings.dns = _clock() - start
+            start = _clock()
+            sock = _connect_addrinfo(infos, timeout, source_address)
+            timings.connect = _clock() - start
+            return sock
+        return create_connection
+
+    def _connect(self, conn, result, timings=None):
+        """Connect `conn`, recording phase times into `timings`."""
+        if timings is None and self._resolver is None:
+            conn.connect()
+            return
+        conn._create_connection = self._create_connection(timings)
+        if timings is None:
+            conn.connect()
+            return
+        start = _clock()
+        conn.connect()
+        if result.scheme == "https" or self._proxy:
+            timings.tls = (_clock() - start - (timings.dns or 0) -
+                           (timings.connect or 0))
+        if result.scheme == "https":
+            timings.resumed = getattr(conn.sock, "session_reused", None)
+
+    def _get_ssl_context(self):
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    @staticmethod
+    def _session_key(result):
+        return (result.hostname, result.port or 443)
+
+    def _save_session(self, conn, result):
+        """Cache the TLS session of `conn` for new connections to the same
+        host.  TLS 1.3 sends session tickets after the handshake, so this
+        is done once a response has been read."""
+        if _HAS_SESSIONS and result.scheme == "https":
+            session = getattr(conn.sock, "session", None)
+            if session is not None:
+                self._sessions[self._session_key(result)] = session
+
+    def _connection(self, result):
+        """Create a new connection for parsed request URL."""
         if self._proxy:
             host, port = self._proxy
         else:
             host, port = (result.hostname, result.port)
 
         if result.scheme == "https":
-            conn = httplib.HTTPSConnection(
+            conn = _HTTPSConnection(
                 host,
                 port=port,
-                timeout=self._connect_timeout
+                timeout=self._connect_timeout,
+                context=self._get_ssl_context()
             )
+            conn.session = self._sessions.get(self._session_key(result))
         else:
-            conn = httplib.HTTPConnection(
+            conn = _HTTPConnection(
                 host,
                 port=port,
                 timeout=self._connect_timeout
@@ -150,29 +378,208 @@ class HTTPSimpleClient(HTTPClientInterface):
 
         if self._proxy:
             conn.set_tunnel(result.hostname, result.port)
+        return conn
+
+    def _send(self, conn, req, result, timings=None):
+        """Send request through `conn` and read the whole response."""
+        start = self._write(conn, req, result)
+        return self._read(conn, req, timings, start)
+
+    def _write(self, conn, req, result):
+        """Send request through `conn`, return the time it was started."""
+        start = _clock()
+        conn.request(
+            req.method,
+            "{}?{}".format(result.path, result.query),
+            body=_body(req.body),
+            headers=req.headers
+        )
+        return start
+
+    def _read(self, conn, req, timings, start):
+        """Read the whole response of the request sent at `start`."""
+        response = conn.getresponse()
+        if timings is not None:
+            headers_read = _clock()
+            timings.ttfb = headers_read - start
+        body = response.read()
+        if timings is not None:
+            timings.body = _clock() - headers_read
+        res = HTTPResponse(
+            request=req,
+            code=response.status,
+            body=body,
+            headers=dict(response.getheaders()),
+            reason=response.reason
+        )
+        return res, response
+
+    def fetch(self, req):
+        result = urlparse.urlparse(req.url)
+        timings = self._timings(req, result)
+        conn = self._connection(result)
 
         # Send request
         try:
-            conn.request(
-                req.method,
-                "{}?{}".format(result.path, result.query),
-                body=utf8(req.body),
-                headers=req.headers
-            )
-            response = conn.getresponse()
-            res = HTTPResponse(
-                request=req,
-                code=response.status,
-                body=response.read(),
-                headers=dict(response.getheaders()),
-                reason=response.reason
-            )
-        except socket.gaierror:
-            # client network error, raise
-            raise
-        except OSError:
+            self._connect(conn, result, timings)
+            res, _ = self._send(conn, req, result, timings)
+            self._save_session(conn, result)
+        except Exception as e:
             # client network error, raise
+            self._report(timings, error=e)
             raise
         finally:
             conn.close()
+        self._report(timings, res)
+        return res
+
+
+# Errors writing a request which mean a kept-alive connection has been
+# closed by peer.
+if sys.version_info >= (3,):
+    _STALE_ERRORS = (httplib.CannotSendRequest, ConnectionError)
+else:
+    _STALE_ERRORS = (httplib.CannotSendRequest,)
+    # socket.error also covers socket.timeout on Python 2
+    _STALE_ERRNOS = frozenset([errno.EPIPE, errno.ECONNRESET,
+                               errno.ECONNABORTED, errno.ECONNREFUSED])
+
+
+def _stale(error, written):
+    """Return whether `error` means a kept-alive connection had been
+    closed by peer before the request was handled, so the request can be
+    sent again: a connection error while writing it, or no status line
+    at all.  Anything else may have reached the server, e.g. a timeout or
+    reset after the request was written, and is never sent again."""
+    if isinstance(error, httplib.BadStatusLine):
+        return True
+    if written:
+        return False
+    if isinstance(error, _STALE_ERRORS):
+        return True
+    return (sys.version_info < (3,) and
+            isinstance(error, socket.error) and
+            not isinstance(error, socket.timeout) and
+            error.errno in _STALE_ERRNOS)
+
+
+class HTTPPooledClient(HTTPSimpleClient):
+    """HTTP client which keeps connections alive between requests.
+
+    Idle connections are pooled per (scheme, host, port), so requests to
+    `yun.tim.qq.com` and `cloud.tim.qq.com` skip the TCP and TLS
+    handshake once a connection has been established.  The client is
+    thread-safe, a connection is only used by one request at a time.
+    """
+
+    def __init__(self, connect_timeout=60, request_timeout=60,
+                 proxy=None, max_size=10, idle_timeout=30, hooks=None,
+                 resolver=None, ssl_context=None):
+        """
+        :param connect_timeout: (optional) HTTP connection timeout.
+        :param request_timeout: (optional) HTTP request timeout.
+        :param proxy: (optional) HTTP proxy, "host:port" or (host, port).
+        :param max_size: (optional) maximum idle connections kept per
+                         (scheme, host, port).
+        :param idle_timeout: (optional) seconds after which an idle
+                             connection is closed instead of reused.
+        :param hooks: (optional) list of functions called with the
+                      `RequestTimings` of every request.
+        :param resolver: (optional) `qcloudsms_py.resolver.Resolver`
+                         caching DNS lookups.
+        :param ssl_context: (optional) `ssl.SSLContext` for HTTPS,
+                            default is `ssl.create_default_context()`.
+        """
+        super(HTTPPooledClient, self).__init__(
+            connect_timeout, request_timeout, proxy, hooks, resolver,
+            ssl_context)
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    @staticmethod
+    def _pool_key(result):
+        port = result.port
+        if port is None:
+            port = 443 if result.scheme == "https" else 80
+        return (result.scheme, result.hostname, port)
+
+    def _acquire(self, key):
+        """Pop a live idle connection for `key`, or return None."""
+        deadline = time.time() - self._idle_timeout
+        expired = []
+        conn = None
+        with self._lock:
+            pool = self._pools.get(key)
+            while pool:
+                candidate, last_used = pool.pop()
+                if last_used < deadline:
+                    expired.append(candidate)
+                    continue
+                conn = candidate
+                break
+            # idle connections at the bottom of pool are the oldest ones
+            if pool:
+                while pool and pool[0][1] < deadline:
+                    expired.append(pool.pop(0)[0])
+        for candidate in expired:
+            candidate.close()
+        return conn
+
+    def _release(self, key, conn):
+        """Put `conn` back into the pool of `key`."""
+        with self._lock:
+            pool = self._pools.setdefault(key, [])
+            if len(pool) < self._max_size:
+                pool.append((conn, time.time()))
+                return
+        conn.close()
+
+    def fetch(self, req):
+        result = urlparse.urlparse(req.url)
+        timings = self._timings(req, result)
+        key = self._pool_key(result)
+        conn = self._acquire(key)
+        reused = conn is not None
+        while True:
+            if timings is not None:
+                timings.reused = reused
+            written = False
+            try:
+                if conn is None:
+                    conn = self._connection(result)
+                    self._connect(conn, result, timings)
+                    if conn.sock is not None:
+                        conn.sock.settimeout(self._request_timeout)
+                start = self._write(conn, req, result)
+                written = True
+                res, response = self._read(conn, req, timings, start)
+            except Exception as e:
+                if conn is not None:
+                    conn.close()
+                if reused and _stale(e, written):
+                    # the pooled connection was closed by peer, retry
+                    # once with a new connection.
+                    conn, reused = None, False
+                    continue
+                self._report(timings, error=e)
+                raise
+            break
+
+        if not reused:
+            self._save_session(conn, result)
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(key, conn)
+        self._report(timings, res)
         return res
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for conn, _ in pool:
+                conn.close()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import bisect
+import threading
+import time
+
+
+__all__ = [
+    "RequestTimings",
+    "Histogram",
+    "MetricsRegistry"
+]
+
+
+_clock = getattr(time, "perf_counter", time.time)
+
+
+class RequestTimings(object):
+    """Phase timings of one HTTP request, in seconds.
+
+    Passed to the hooks of an instrumented HTTP client after every
+    request.  Phases which didn't happen are None, e.g. `dns`, `connect`
+    and `tls` of a request sent over a kept-alive connection.
+
+    - dns: name resolution
+    - connect: TCP connect
+    - tls: TLS handshake, including the CONNECT of a proxy tunnel
+    - ttfb: from sending the request until the response headers were
+      read, i.e. upload and server time
+    - body: reading the response body
+    - total: the whole request
+
+    `resumed` is whether the TLS handshake resumed a cached session,
+    None if there was no handshake or it isn't known.
+    """
+
+    __slots__ = ("request", "endpoint", "start", "dns", "connect", "tls",
+                 "ttfb", "body", "total", "reused", "resumed", "response",
+                 "error", "_result")
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "body", "total")
+
+    def __init__(self, request, path):
+        """
+        :param request: `HTTPRequest` instance
+        :param path: request URL path
+        """
+        self.request = request
+        self.endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+        self.start = _clock()
+        self.dns = self.connect = self.tls = None
+        self.ttfb = self.body = self.total = None
+        self.reused = False
+        self.resumed = None
+        self.response = None
+        self.error = None
+        self._result = False
+
+    @property
+    def code(self):
+        """HTTP status code, None if the request failed."""
+        return self.response.code if self.response is not None else None
+
+    @property
+    def result(self):
+        """API `result` code of the response, None if there is none.
+
+        The response body is parsed on first access only.
+        """
+        if self._result is False:
+            self._result = None
+            if self.response is not None and self.response.ok():
+                try:
+                    body = self.response.json()
+                    if isinstance(body, dict):
+                        self._result = body.get("result")
+                except ValueError:
+                    pass
+        return self._result
+
+    def finish(self, response=None, error=None):
+        self.total = _clock() - self.start
+        self.response = response
+        self.error = error
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram(object):
+    """Thread-safe histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: (optional) ascending bucket upper bounds in
+                        seconds, values above the last one are counted
+                        in an implicit +Inf bucket
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count), the last bucket
+        count is the +Inf one."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative = []
+        n = 0
+        for count in counts:
+            n += count
+            cumulative.append(n)
+        return cumulative, total, n
+
+    @property
+    def count(self):
+        return self.snapshot()[2]
+
+    def quantile(self, q):
+        """Estimate quantile `q` in [0, 1] by interpolating within the
+        bucket it falls into, None if nothing was observed."""
+        cumulative, _, n = self.snapshot()
+        if n == 0:
+            return None
+        rank = q * n
+        i = bisect.bisect_left(cumulative, rank)
+        if i >= len(self.buckets):
+            return self.buckets[-1]
+        lower = self.buckets[i - 1] if i > 0 else 0.0
+        below = cumulative[i - 1] if i > 0 else 0
+        in_bucket = cumulative[i] - below
+        if in_bucket == 0:
+            return self.buckets[i]
+        return lower + (self.buckets[i] - lower) * (rank - below) / in_bucket
+
+
+def _labels(**labels):
+    return ",".join('{}="{}"'.format(k, str(v).replace('"', '\\"'))
+                    for k, v in sorted(labels.items()))
+
+
+class MetricsRegistry(object):
+    """Histograms of request phase timings per endpoint and counters of
+    requests per endpoint, status code and API `result` code.
+
+    The registry is a hook for instrumented HTTP clients, e.g.:
+
+        registry = MetricsRegistry()
+        httpclient = HTTPPooledClient(hooks=[registry])
+        ...
+        print(registry.render())
+
+    `render` returns the Prometheus text format, so it can be served as
+    is on a scrape endpoint.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix="qcloudsms"):
+        """
+        :param buckets: (optional) histogram bucket upper bounds
+        :param prefix: (optional) metric name prefix of `render`
+        """
+        self._buckets = buckets
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._requests = {}
+        self._errors = {}
+        self._handshakes = {}
+
+    def __call__(self, timings):
+        self.observe(timings)
+
+    def histogram(self, phase, endpoint):
+        """Return the histogram of `phase` for `endpoint`."""
+        key = (phase, endpoint)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(
+                    key, Histogram(self._buckets))
+        return histogram
+
+    def observe(self, timings):
+        """Record a `RequestTimings`."""
+        for phase in RequestTimings.PHASES:
+            value = getattr(timings, phase)
+            if value is not None:
+                self.histogram(phase, timings.endpoint).observe(value)
+        if timings.error is not None:
+            key = (timings.endpoint, type(timings.error).__name__)
+            counters = self._errors
+        else:
+            key = (timings.endpoint, timings.code, timings.result)
+            counters = self._requests
+        with self._lock:
+            counters[key] = counters.get(key, 0) + 1
+            if timings.resumed is not None:
+                key = (timings.endpoint, timings.resumed)
+                self._handshakes[key] = self._handshakes.get(key, 0) + 1
+
+    def requests(self):
+        """Return {(endpoint, code, result): count} of completed
+        requests."""
+        with self._lock:
+            return dict(self._requests)
+
+    def errors(self):
+        """Return {(endpoint, exception class name): count} of failed
+        requests."""
+        with self._lock:
+            return dict(self._errors)
+
+    def handshakes(self):
+        """Return {(endpoint, resumed): count} of TLS handshakes."""
+        with self._lock:
+            return dict(self._handshakes)
+
+    def render(self):
+        """Return all metrics in the Prometheus text format."""
+        prefix = self._prefix
+        lines = []
+        name = prefix + "_request_duration_seconds"
+        lines.append("# TYPE {} histogram".format(name))
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        for (phase, endpoint), histogram in histograms:
+            cumulative, total, count = histogram.snapshot()
+            bounds = [repr(float(b)) for b in histogram.buckets] + ["+Inf"]
+            for bound, n in zip(bounds, cumulative):
+                lines.append("{}_bucket{{{}}} {}".format(name, _labels(
+                    endpoint=endpoint, phase=phase, le=bound), n))
+            labels = _labels(endpoint=endpoint, phase=phase)
+            lines.append("{}_sum{{{}}} {!r}".format(name, labels, total))
+            lines.append("{}_count{{{}}} {}".format(name, labels, count))
+
+        name = prefix + "_requests_total"
+        lines.append("# TYPE {} counter".format(name))
+        for (endpoint, code, result), n in sorted(
+                self.requests().items(), key=lambda item: str(item[0])):
+            lines.append("{}{{{}}} {}".format(name, _labels(
+                endpoint=endpoint, code=code,
+                result="" if result is None else result), n))
+
+        name = prefix + "_request_errors_total"
+        lines.append("# TYPE {} counter".format(name))
+        for (endpoint, error), n in sorted(self.errors().items()):
+            lines.append("{}{{{}}} {}".format(name, _labels(
+                endpoint=endpoint, error=error), n))
+
+        name = prefix + "_tls_handshakes_total"
+        lines.append("# TYPE {} counter".format(name))
+        for (endpoint, resumed), n in sorted(self.handshakes().items()):
+            lines.append("{}{{{}}} {}".format(name, _labels(
+                endpoint=endpoint, resumed=str(resumed).lower()), n))
+        return "\n".join(lines) + "\n"
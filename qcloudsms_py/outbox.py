@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from qcloudsms_py import sms
+from qcloudsms_py.httpclient import HTTPError
+from qcloudsms_py.retry import _NETWORK_ERRORS
+
+
+__all__ = [
+    "Outbox",
+    "OutboxWorker"
+]
+
+
+_logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    method TEXT NOT NULL,
+    args TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    claim TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (state, available);
+"""
+
+
+class Outbox(object):
+    """Durable queue of SMS sends in a SQLite database (WAL mode).
+
+    Sends are enqueued locally, in batches, and drained by an
+    `OutboxWorker`.  A claimed send is leased to a worker; if the
+    process dies before its result is recorded, the lease expires and
+    the send is claimed again, so every send is delivered at least once.
+    Every claim has a token, a worker renews the lease of a send right
+    before sending it and records its outcome only while it still holds
+    the claim, so a send re-claimed by another worker is neither sent
+    again nor overwritten by the worker which lost it.
+    Each send gets an `ext` value when it is enqueued (unless one is
+    given) which is kept for every attempt, so duplicates can be
+    recognized by it.
+
+    States of a send: `PENDING`, `SENDING` (leased), `DONE` (a response
+    was received, whatever its `result`) and `FAILED` (gave up).
+    """
+
+    PENDING, SENDING, DONE, FAILED = 0, 1, 2, 3
+
+    STATES = {
+        PENDING: "pending",
+        SENDING: "sending",
+        DONE: "done",
+        FAILED: "failed"
+    }
+
+    METHODS = {
+        "SmsSingleSender.send": sms.SmsSingleSender,
+        "SmsSingleSender.send_with_param": sms.SmsSingleSender,
+        "SmsMultiSender.send": sms.SmsMultiSender,
+        "SmsMultiSender.send_with_param": sms.SmsMultiSender
+    }
+
+    def __init__(self, path):
+        """
+        :param path: SQLite database path
+        """
+        self._path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        db = self._db()
+        db.executescript(_SCHEMA)
+
+    def _db(self):
+        """Return the connection of the current thread."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._path, timeout=60,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def _row(self, method, kwargs, now):
+        if method not in self.__class__.METHODS:
+            raise ValueError("invalid method {!r}".format(method))
+        kwargs = dict(kwargs)
+        ext = kwargs.pop("ext", None) or uuid.uuid4().hex
+        return (method, json.dumps(kwargs), str(ext), self.PENDING, now,
+                now)
+
+    def enqueue(self, method, **kwargs):
+        """Enqueue one send, return its id.
+
+        :param method: sender method, e.g. "SmsMultiSender.send_with_param"
+        :param kwargs: keyword arguments of the method
+        """
+        now = time.time()
+        cursor = self._db().execute(
+            "INSERT INTO outbox (method, args, ext, state, available, "
+            "updated) VALUES (?, ?, ?, ?, ?, ?)",
+            self._row(method, kwargs, now))
+        return cursor.lastrowid
+
+    def enqueue_many(self, method, items, batch_size=1000):
+        """Enqueue many sends, `batch_size` per transaction, return how
+        many were enqueued.
+
+        :param method: sender method, e.g. "SmsSingleSender.send"
+        :param items: iterable of keyword argument dictionaries
+        :param batch_size: (optional) sends per transaction
+        """
+        db = self._db()
+        count = 0
+        batch = []
+        now = time.time()
+        for kwargs in items:
+            batch.append(self._row(method, kwargs, now))
+            if len(batch) >= batch_size:
+                count += self._insert(db, batch)
+                batch = []
+                now = time.time()
+        if batch:
+            count += self._insert(db, batch)
+        return count
+
+    @staticmethod
+    def _insert(db, rows):
+        db.execute("BEGIN")
+        try:
+            db.executemany(
+                "INSERT INTO outbox (method, args, ext, state, available, "
+                "updated) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return len(rows)
+
+    def claim(self, limit, lease):
+        """Lease up to `limit` ready sends for `lease` seconds.
+
+        Return a list of `(id, method, kwargs, ext, attempts, claim)`
+        tuples, `attempts` counts this one and `claim` is the token to
+        pass to `renew`, `complete` and `fail`.
+        """
+        db = self._db()
+        now = time.time()
+        claim = uuid.uuid4().hex
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = db.execute(
+                "SELECT id, method, args, ext, attempts FROM outbox "
+                "WHERE state IN (?, ?) AND available <= ? "
+                "ORDER BY id LIMIT ?",
+                (self.PENDING, self.SENDING, now, limit)).fetchall()
+            db.executemany(
+                "UPDATE outbox SET state = ?, attempts = attempts + 1, "
+                "available = ?, updated = ?, claim = ? WHERE id = ?",
+                [(self.SENDING, now + lease, now, claim, row[0])
+                 for row in rows])
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return [(id_, method, json.loads(args), ext, attempts + 1, claim)
+                for id_, method, args, ext, attempts in rows]
+
+    def _update(self, id_, claim, assignments, values):
+        """Update a send if it is still leased by `claim`, or in any
+        state if `claim` is None; return whether it was updated."""
+        sql = "UPDATE outbox SET {} WHERE id = ?".format(assignments)
+        values = tuple(values) + (id_,)
+        if claim is not None:
+            sql += " AND state = ? AND claim = ?"
+            values += (self.SENDING, claim)
+        return self._db().execute(sql, values).rowcount > 0
+
+    def renew(self, id_, claim, lease):
+        """Extend the lease of a claimed send to `lease` seconds from
+        now, return False if it was lost to another claim."""
+        now = time.time()
+        return self._update(id_, claim, "available = ?, updated = ?",
+                            (now + lease, now))
+
+    def complete(self, id_, result, claim=None):
+        """Record the response of a send, return False if its lease was
+        lost to another claim and nothing was recorded."""
+        return self._update(
+            id_, claim, "state = ?, result = ?, error = NULL, updated = ?",
+            (self.DONE, json.dumps(result), time.time()))
+
+    def fail(self, id_, error, retry_at=None, claim=None):
+        """Record a failed attempt; the send is retried after `retry_at`
+        (a unix time), or given up if it is None.  Return False if its
+        lease was lost to another claim and nothing was recorded."""
+        now = time.time()
+        if retry_at is None:
+            state, available = self.FAILED, now
+        else:
+            state, available = self.PENDING, retry_at
+        return self._update(
+            id_, claim, "state = ?, available = ?, error = ?, updated = ?",
+            (state, available, str(error), now))
+
+    def counts(self):
+        """Return {state name: number of sends}."""
+        counts = dict((name, 0) for name in self.STATES.values())
+        for state, count in self._db().execute(
+                "SELECT state, COUNT(*) FROM outbox GROUP BY state"):
+            counts[self.STATES[state]] = count
+        return counts
+
+    def unfinished(self):
+        """Return the number of pending and leased sends."""
+        return self._db().execute(
+            "SELECT COUNT(*) FROM outbox WHERE state IN (?, ?)",
+            (self.PENDING, self.SENDING)).fetchone()[0]
+
+    def results(self, state=DONE):
+        """Iterate `(id, method, kwargs, ext, result, error)` of the
+        sends in `state`, `result` is the parsed response."""
+        for id_, method, args, ext, result, error in self._db().execute(
+                "SELECT id, method, args, ext, result, error FROM outbox "
+                "WHERE state = ? ORDER BY id", (state,)):
+            yield (id_, method, json.loads(args), ext,
+                   json.loads(result) if result else None, error)
+
+    def retry_failed(self):
+        """Queue all failed sends again, return how many."""
+        now = time.time()
+        return self._db().execute(
+            "UPDATE outbox SET state = ?, attempts = 0, available = ?, "
+            "updated = ? WHERE state = ?",
+            (self.PENDING, now, now, self.FAILED)).rowcount
+
+    def purge(self, state=DONE):
+        """Delete the sends in `state`, return how many."""
+        return self._db().execute(
+            "DELETE FROM outbox WHERE state = ?", (state,)).rowcount
+
+    def release(self):
+        """Close the connection of the current thread."""
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            self._local.db = None
+            with self._lock:
+                self._connections.remove(db)
+            db.close()
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+
+class OutboxWorker(object):
+    """Pool of threads draining an `Outbox` through `SmsSingleSender`
+    and `SmsMultiSender`, e.g.:
+
+        outbox = Outbox("/var/lib/qcloudsms/outbox.db")
+        outbox.enqueue_many("SmsMultiSender.send_with_param", (
+            {"nationcode": 86, "phone_numbers": chunk,
+             "template_id": 7839, "params": ["5678"]}
+            for chunk in chunks))
+        OutboxWorker(outbox, appid, appkey, workers=8).run()
+
+    Network errors, HTTP 429 and HTTP 5xx are retried with exponential
+    backoff and jitter up to `max_attempts` attempts, other errors, e.g.
+    HTTP 400, fail a send right away.  Sends whose lease was lost to another worker, e.g.
+    because a slow batch outlasted it, are counted in `lost_leases` and
+    logged.
+    """
+
+    RETRY_EXCEPTIONS = _NETWORK_ERRORS
+
+    def __init__(self, outbox, appid, appkey, httpclient=None, workers=8,
+                 batch_size=10, lease=60, max_attempts=5, backoff=1.0,
+                 max_backoff=60.0, poll_interval=1.0):
+        """
+        :param outbox: `Outbox` instance
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: (optional) `HTTPClientInterface` instance
+        :param workers: (optional) number of worker threads
+        :param batch_size: (optional) sends claimed by a worker at once
+        :param lease: (optional) seconds a claimed send is reserved for
+                      a worker, renewed right before it is sent, so it
+                      must exceed the time of one send
+        :param max_attempts: (optional) attempts before a send fails
+        :param backoff: (optional) base retry backoff in seconds
+        :param max_backoff: (optional) maximum retry backoff in seconds
+        :param poll_interval: (optional) seconds between polls of an
+                              empty outbox
+        """
+        self._outbox = outbox
+        self._senders = {}
+        for method, cls in Outbox.METHODS.items():
+            name = method.split(".")[0]
+            if name not in self._senders:
+                self._senders[name] = cls(appid, appkey, httpclient)
+        self._workers = workers
+        self._batch_size = batch_size
+        self._lease = lease
+        self._max_attempts = max_attempts
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        # sends whose lease was lost to another worker
+        self.lost_leases = 0
+
+    def stop(self):
+        """Stop workers after their current batch."""
+        self._stopped.set()
+
+    def _send(self, method, kwargs, ext):
+        cls_name, name = method.split(".")
+        return getattr(self._senders[cls_name], name)(ext=ext, **kwargs)
+
+    def _retryable(self, error):
+        if isinstance(error, HTTPError):
+            return error.code == 429 or error.code >= 500
+        return isinstance(error, self.RETRY_EXCEPTIONS)
+
+    def _lost(self, id_, sent):
+        with self._lock:
+            self.lost_leases += 1
+        if sent:
+            _logger.warning("lease of send %d expired while it was sent, "
+                            "another worker may send it again", id_)
+        else:
+            _logger.warning("lease of send %d was lost before it was "
+                            "sent, skipped", id_)
+
+    def _process(self, id_, method, kwargs, ext, attempts, claim):
+        outbox = self._outbox
+        if not outbox.renew(id_, claim, self._lease):
+            self._lost(id_, False)
+            return
+        try:
+            result = self._send(method, kwargs, ext)
+        except Exception as e:
+            if self._retryable(e) and attempts < self._max_attempts:
+                delay = random.uniform(0, min(
+                    self._max_backoff, self._backoff * 2 ** (attempts - 1)))
+                recorded = outbox.fail(id_, e, time.time() + delay, claim)
+            else:
+                recorded = outbox.fail(id_, e, claim=claim)
+        else:
+            recorded = outbox.complete(id_, result, claim)
+        if not recorded:
+            self._lost(id_, True)
+
+    def _work(self, forever):
+        outbox = self._outbox
+        try:
+            while not self._stopped.is_set():
+                batch = outbox.claim(self._batch_size, self._lease)
+                if not batch:
+                    if not forever and outbox.unfinished() == 0:
+                        return
+                    self._stopped.wait(self._poll_interval)
+                    continue
+                for item in batch:
+                    self._process(*item)
+        finally:
+            outbox.release()
+
+    def run(self, forever=False):
+        """Drain the outbox with `workers` threads, return its counts.
+
+        :param forever: (optional) keep polling for new sends until
+                        `stop` is called, instead of returning when no
+                        send is pending or leased
+        """
+        self._stopped.clear()
+        threads = [threading.Thread(target=self._work, args=(forever,))
+                   for _ in range(self._workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._outbox.counts()
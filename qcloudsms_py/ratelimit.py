@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import threading
+import time
+
+from qcloudsms_py import util
+from qcloudsms_py.httpclient import HTTPClientInterface
+
+if sys.version_info >= (3,):
+    from urllib import parse as urlparse
+else:
+    import urlparse
+
+
+__all__ = [
+    "RateLimiter",
+    "RateLimitedHTTPClient",
+    "RateLimitExceeded"
+]
+
+
+_clock = getattr(time, "monotonic", time.time)
+
+
+class RateLimitExceeded(Exception):
+
+    def __init__(self, key, wait):
+        self.key = key
+        self.wait = wait
+        super(RateLimitExceeded, self).__init__(key, wait)
+
+    def __str__(self):
+        return "rate limit of {} exceeded, retry in {:.3f}s".format(
+            self.key, self.wait)
+    __repr__ = __str__
+
+
+class _TokenBucket(object):
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.updated = _clock()
+
+    def wait(self, now):
+        """Refill and return seconds until one token is available."""
+        if now > self.updated:
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _parse_rate(spec):
+    """Return (rate, burst) of `spec`, a rate or a (rate, burst) tuple."""
+    if isinstance(spec, (list, tuple)):
+        rate, burst = spec
+    else:
+        rate, burst = spec, max(spec, 1)
+    if rate <= 0 or burst < 1:
+        raise ValueError("invalid rate {!r}".format(spec))
+    return rate, burst
+
+
+class RateLimiter(object):
+    """Token bucket rate limiter per appid and per endpoint.
+
+    Rates are requests per second, given either as a number, which also
+    allows bursts of that many requests, or as a `(rate, burst)` tuple.
+    Endpoints are named by the last segment of the request path, e.g.
+    "sendsms", "sendmultisms2" or "sendtvoice".  A request takes one
+    token of its appid bucket and one of its endpoint bucket, the
+    limiter is thread-safe.
+    """
+
+    def __init__(self, appid_rate=None, endpoint_rates=None,
+                 appid_rates=None):
+        """
+        :param appid_rate: (optional) rate applied to every appid
+        :param endpoint_rates: (optional) dictionary of endpoint name to
+                               rate, "*" applies to every other endpoint
+        :param appid_rates: (optional) dictionary of appid to rate,
+                            overrides `appid_rate`
+        """
+        self._appid_rate = (_parse_rate(appid_rate)
+                            if appid_rate is not None else None)
+        self._appid_rates = dict(
+            (str(k), _parse_rate(v)) for k, v in (appid_rates or {}).items())
+        self._endpoint_rates = dict(
+            (k, _parse_rate(v)) for k, v in (endpoint_rates or {}).items())
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _bucket(self, key, spec):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _TokenBucket(*spec)
+        return bucket
+
+    def _buckets_of(self, appid, endpoint):
+        buckets = []
+        spec = self._appid_rates.get(str(appid), self._appid_rate)
+        if spec is not None:
+            buckets.append((
+                "appid " + str(appid),
+                self._bucket(("appid", str(appid)), spec)
+            ))
+        spec = self._endpoint_rates.get(
+            endpoint, self._endpoint_rates.get("*"))
+        if spec is not None:
+            buckets.append((
+                "endpoint " + endpoint,
+                self._bucket(("endpoint", endpoint), spec)
+            ))
+        return buckets
+
+    def reserve(self, appid, endpoint, max_wait=None):
+        """Reserve a token for one request.
+
+        Return the seconds the caller has to wait before sending.  If
+        that is more than `max_wait`, nothing is reserved and
+        `RateLimitExceeded` is raised.
+
+        :param appid: sdk appid
+        :param endpoint: endpoint name, e.g. "sendsms"
+        :param max_wait: (optional) maximum seconds to wait, unlimited
+                         by default
+        """
+        with self._lock:
+            now = _clock()
+            key, wait = None, 0.0
+            buckets = self._buckets_of(appid, endpoint)
+            for name, bucket in buckets:
+                bucket_wait = bucket.wait(now)
+                if bucket_wait > wait:
+                    key, wait = name, bucket_wait
+            if max_wait is not None and wait > max_wait:
+                raise RateLimitExceeded(key, wait)
+            for _, bucket in buckets:
+                bucket.tokens -= 1
+            return wait
+
+    def acquire(self, appid, endpoint, max_wait=None):
+        """Block until one request may be sent, see `reserve`.
+
+        `max_wait=0` fails fast instead of blocking.
+        """
+        wait = self.reserve(appid, endpoint, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def request_key(req):
+    """Return the (appid, endpoint) a request is rate limited by."""
+    result = urlparse.urlparse(req.url)
+    appid = urlparse.parse_qs(result.query).get("sdkappid", [""])[0]
+    return appid, result.path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class RateLimitedHTTPClient(HTTPClientInterface):
+    """`HTTPClientInterface` which applies a `RateLimiter` before every
+    request, e.g.:
+
+        limiter = RateLimiter(appid_rate=100,
+                              endpoint_rates={"sendmultisms2": 10})
+        httpclient = RateLimitedHTTPClient(limiter)
+        sender = SmsSingleSender(appid, appkey, httpclient=httpclient)
+    """
+
+    def __init__(self, limiter, httpclient=None, max_wait=None):
+        """
+        :param limiter: `RateLimiter` instance, can be shared between
+                        clients
+        :param httpclient: (optional) wrapped `HTTPClientInterface`,
+                           default is the SDK's shared pooled client
+        :param max_wait: (optional) maximum seconds to block for a
+                         token, unlimited by default; 0 fails fast with
+                         `RateLimitExceeded`
+        """
+        self._limiter = limiter
+        self._httpclient = httpclient
+        self._max_wait = max_wait
+
+    def fetch(self, req):
+        appid, endpoint = request_key(req)
+        self._limiter.acquire(appid, endpoint, self._max_wait)
+        return (self._httpclient or util._http_simple_client).fetch(req)
+
+    def close(self):
+        if self._httpclient:
+            self._httpclient.close()
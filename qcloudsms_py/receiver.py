@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""asyncio receiver of pushed status reports, requires Python 3.5+.
+
+The service can push delivery reports (a JSON array of callback
+records) and replies (one JSON object) to a URL instead of having them
+pulled.  `StatusReceiver` is a small HTTP/1.1 server taking these
+pushes, it acknowledges a push as soon as its records are buffered and
+hands them to a handler, or a queue, in batches:
+
+    async def handle(records):
+        for record in records:
+            ...
+
+    receiver = StatusReceiver(handle, path="/qcloudsms/callback")
+    await receiver.start("0.0.0.0", 8080)
+
+Callback records have a `report_status`, reply records a `text`.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import collections
+import logging
+
+from qcloudsms_py import codec
+
+
+__all__ = [
+    "StatusReceiver"
+]
+
+
+_logger = logging.getLogger(__name__)
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable"
+}
+
+_OK = codec.dumpb({"result": 0, "errmsg": "OK"})
+
+_BUSY = codec.dumpb({"result": 503, "errmsg": "busy, retry later"})
+
+
+_current_task = getattr(asyncio, "current_task", None) or \
+    asyncio.Task.current_task
+
+
+class _BadRequest(Exception):
+
+    def __init__(self, code):
+        self.code = code
+        super(_BadRequest, self).__init__(code)
+
+
+def _error_body(code):
+    return codec.dumpb({"result": code, "errmsg": _REASONS[code]})
+
+
+class StatusReceiver(object):
+    """HTTP server receiving pushed status reports.
+
+    Records of all pushes are buffered and delivered in batches of up to
+    `max_batch` records, a batch is delivered as soon as it is full or
+    `max_delay` seconds after its first record arrived.  `handler` is
+    called with every batch, it may be a coroutine function; with
+    `queue` instead, batches are put into it.  Batches are delivered one
+    at a time, so a slow handler or a full queue fills the buffer: once
+    it holds `max_pending` records, pushes wait up to `max_wait` seconds
+    for room and are then answered with HTTP 503 so the service pushes
+    them again later.
+
+    Pushes are acknowledged once buffered, records in the buffer or of
+    a failing handler are lost if the process dies or the handler
+    raises.
+    """
+
+    def __init__(self, handler=None, queue=None, path=None, max_batch=100,
+                 max_delay=0.05, max_pending=10000, max_wait=1.0,
+                 max_body=1 << 20, idle_timeout=60):
+        """
+        :param handler: (optional) function called with a list of
+                        records, may be a coroutine function
+        :param queue: (optional) `asyncio.Queue` batches are put into,
+                      instead of `handler`
+        :param path: (optional) URL path pushes are accepted at, any
+                     path by default
+        :param max_batch: (optional) maximum records of a batch
+        :param max_delay: (optional) maximum seconds a record waits for
+                          its batch to fill
+        :param max_pending: (optional) maximum buffered records
+        :param max_wait: (optional) maximum seconds a push waits for room
+                         in the buffer
+        :param max_body: (optional) maximum bytes of a push body
+        :param idle_timeout: (optional) seconds an idle kept-alive
+                             connection is kept open
+        """
+        if (handler is None) == (queue is None):
+            raise ValueError("exactly one of handler and queue is required")
+        self._handler = handler
+        self._queue = queue
+        self._path = path
+        self._max_batch = max(max_batch, 1)
+        self._max_delay = max_delay
+        self._max_pending = max_pending
+        self._max_wait = max_wait
+        self._max_body = max_body
+        self._idle_timeout = idle_timeout
+        self._pending = collections.deque()
+        self._cond = None
+        self._server = None
+        self._dispatcher = None
+        self._connections = {}
+        self._closing = False
+        # counters of received and rejected records and delivered batches
+        self.received = 0
+        self.rejected = 0
+        self.batches = 0
+
+    @property
+    def port(self):
+        """Port the receiver listens on, e.g. after starting it on port
+        0."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="0.0.0.0", port=8080, **kwargs):
+        """Start listening, return the receiver.
+
+        :param host: (optional) address to listen on
+        :param port: (optional) port to listen on, 0 for any free port
+        :param kwargs: (optional) more arguments of
+                       `asyncio.start_server`, e.g. `ssl`
+        """
+        self._cond = asyncio.Condition()
+        self._closing = False
+        self._server = await asyncio.start_server(
+            self._serve, host, port, **kwargs)
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        return self
+
+    async def close(self):
+        """Stop listening and deliver the buffered records."""
+        self._server.close()
+        tasks = []
+        for task, writer in list(self._connections.items()):
+            writer.close()
+            tasks.append(task)
+        if tasks:
+            await asyncio.wait(tasks)
+        await self._server.wait_closed()
+        async with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        await self._dispatcher
+
+    async def _offer(self, records):
+        """Buffer `records`, return False if there was no room."""
+        cond = self._cond
+        async with cond:
+            if self._closing:
+                return False
+
+            def room():
+                return (not self._pending or len(self._pending) +
+                        len(records) <= self._max_pending)
+
+            if not room():
+                try:
+                    await asyncio.wait_for(cond.wait_for(room),
+                                           self._max_wait)
+                except asyncio.TimeoutError:
+                    return False
+            self._pending.extend(records)
+            cond.notify_all()
+        return True
+
+    async def _dispatch(self):
+        cond = self._cond
+        pending = self._pending
+        while True:
+            async with cond:
+                await cond.wait_for(lambda: pending or self._closing)
+                if len(pending) < self._max_batch and not self._closing:
+                    try:
+                        await asyncio.wait_for(cond.wait_for(
+                            lambda: len(pending) >= self._max_batch or
+                            self._closing), self._max_delay)
+                    except asyncio.TimeoutError:
+                        pass
+                if not pending:
+                    return
+                batch = [pending.popleft() for _ in range(
+                    min(len(pending), self._max_batch))]
+                cond.notify_all()
+            await self._deliver(batch)
+
+    async def _deliver(self, batch):
+        self.batches += 1
+        if self._queue is not None:
+            await self._queue.put(batch)
+            return
+        try:
+            result = self._handler(batch)
+            if asyncio.iscoroutine(result) or isinstance(
+                    result, asyncio.Future):
+                await result
+        except Exception:
+            _logger.exception("status handler %r failed", self._handler)
+
+    @staticmethod
+    async def _readline(reader):
+        """Return the next line, raise `_BadRequest` if it is longer than
+        the stream limit."""
+        try:
+            return await reader.readline()
+        except ValueError:
+            raise _BadRequest(400)
+
+    async def _read_body(self, reader, headers):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks = []
+            length = 0
+            while True:
+                try:
+                    size = int((await self._readline(reader)).split(b";")[0],
+                               16)
+                except ValueError:
+                    raise _BadRequest(400)
+                if size == 0:
+                    # skip trailers
+                    while (await self._readline(reader)) not in (
+                            b"\r\n", b"\n", b""):
+                        pass
+                    return b"".join(chunks)
+                length += size
+                if length > self._max_body:
+                    raise _BadRequest(413)
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise _BadRequest(400)
+        if length > self._max_body:
+            raise _BadRequest(413)
+        return await reader.readexactly(length)
+
+    async def _handle(self, method, target, body):
+        """Return (status code, response body) of a push."""
+        if self._path is not None and \
+                target.split("?", 1)[0] != self._path:
+            return 404, _error_body(404)
+        if method != "POST":
+            return 405, _error_body(405)
+        try:
+            data = codec.loads(body)
+        except ValueError:
+            return 400, _error_body(400)
+        records = data if isinstance(data, list) else [data]
+        if not all(isinstance(record, dict) for record in records):
+            return 400, _error_body(400)
+        if not await self._offer(records):
+            self.rejected += len(records)
+            return 503, _BUSY
+        self.received += len(records)
+        return 200, _OK
+
+    async def _serve(self, reader, writer):
+        task = _current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(self._readline(reader),
+                                                  self._idle_timeout)
+                    if not line:
+                        return
+                    method, target, version = line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        header = await self._readline(reader)
+                        if header in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = \
+                            header.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except asyncio.TimeoutError:
+                    return
+                except (ValueError, _BadRequest):
+                    # a malformed or too long request line or header, the
+                    # rest of the request can't be found, drop the
+                    # connection
+                    await self._respond(writer, 400, _error_body(400), False)
+                    return
+                keep_alive = (version == "HTTP/1.1" and
+                              headers.get("connection", "").lower() !=
+                              "close")
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                try:
+                    body = await self._read_body(reader, headers)
+                except _BadRequest as e:
+                    # the rest of the body is unread, drop the connection
+                    await self._respond(writer, e.code, _error_body(e.code),
+                                        False)
+                    return
+                code, res_body = await self._handle(method, target, body)
+                await self._respond(writer, code, res_body, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, code, body, keep_alive):
+        writer.write((
+            "HTTP/1.1 {} {}\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "Connection: {}\r\n\r\n"
+        ).format(code, _REASONS[code], len(body),
+                 "keep-alive" if keep_alive else "close"
+                 ).encode("latin-1") + body)
+        await writer.drain()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import array
+import re
+import sys
+
+
+__all__ = [
+    "InvalidNumber",
+    "NumberSet",
+    "RecipientFilter",
+    "normalize",
+    "encode",
+    "decode"
+]
+
+
+# Assigned country calling codes.  They are prefix free, so the
+# nationcode of an international number is its only prefix in the set.
+NATIONCODES = frozenset("""
+    1 7 20 27 30 31 32 33 34 36 39 40 41 43 44 45 46 47 48 49 51 52 53
+    54 55 56 57 58 60 61 62 63 64 65 66 81 82 84 86 90 91 92 93 94 95 98
+    211 212 213 216 218 220 221 222 223 224 225 226 227 228 229 230 231
+    232 233 234 235 236 237 238 239 240 241 242 243 244 245 246 247 248
+    249 250 251 252 253 254 255 256 257 258 260 261 262 263 264 265 266
+    267 268 269 290 291 297 298 299 350 351 352 353 354 355 356 357 358
+    359 370 371 372 373 374 375 376 377 378 379 380 381 382 383 385 386
+    387 389 420 421 423 500 501 502 503 504 505 506 507 508 509 590 591
+    592 593 594 595 596 597 598 599 670 672 673 674 675 676 677 678 679
+    680 681 682 683 685 686 687 688 689 690 691 692 850 852 853 855 856
+    880 886 960 961 962 963 964 965 966 967 968 970 971 972 973 974 975
+    976 977 992 993 994 995 996 998
+""".split())
+
+# Maximum digits of an international number, nationcode included.
+E164_MAX = 15
+
+# Reasons of `InvalidNumber`
+INVALID_CHARS = "invalid characters"
+UNKNOWN_NATIONCODE = "unknown nationcode"
+INVALID_NUMBER = "invalid number"
+
+_SEPARATORS = " \t-.()/"
+
+_DIGITS = re.compile(r"[0-9]+\Z")
+
+if sys.version_info >= (3,):
+    _TRANSLATE = (str.maketrans("", "", _SEPARATORS),)
+    _TYPECODE = "q"
+else:
+    _TRANSLATE = (None, _SEPARATORS)
+    # 64 bits on the platforms "q" is missing from
+    _TYPECODE = "l"
+
+
+class InvalidNumber(ValueError):
+
+    def __init__(self, phone_number, reason):
+        self.phone_number = phone_number
+        self.reason = reason
+        super(InvalidNumber, self).__init__(phone_number, reason)
+
+    def __str__(self):
+        return "{!r}: {}".format(self.phone_number, self.reason)
+    __repr__ = __str__
+
+
+def _clean(value):
+    try:
+        value = str(value).strip().translate(*_TRANSLATE)
+    except UnicodeError:
+        raise InvalidNumber(value, INVALID_CHARS)
+    if value.startswith("+"):
+        return value[1:], True
+    if value.startswith("00"):
+        return value[2:], True
+    return value, False
+
+
+def _nationcode(value):
+    value, _ = _clean(value)
+    if value not in NATIONCODES:
+        raise InvalidNumber(value, UNKNOWN_NATIONCODE)
+    return value
+
+
+def normalize(phone_number, nationcode=86):
+    """Normalize a phone number, return `(nationcode, mobile)` strings.
+
+    Separators (spaces, "-", ".", "()", "/") are removed.  A number
+    starting with "+" or "00" is international and its nationcode is
+    taken from it, otherwise it belongs to `nationcode`.  Chinese
+    mobiles must be 11 digits starting with 1, NANP numbers 10 digits,
+    other numbers lose a leading trunk prefix "0" and must fit E.164.
+    A nationcode repeated in front of a Chinese or NANP national number
+    ("86138...") is dropped.  Raise `InvalidNumber` if the number is
+    not valid.
+
+    :param phone_number: phone number, national or international
+    :param nationcode: (optional) nationcode of national numbers
+    """
+    digits, international = _clean(phone_number)
+    if not _DIGITS.match(digits):
+        raise InvalidNumber(phone_number, INVALID_CHARS)
+    if international:
+        for i in (1, 2, 3):
+            if digits[:i] in NATIONCODES:
+                nationcode, mobile = digits[:i], digits[i:]
+                break
+        else:
+            raise InvalidNumber(phone_number, UNKNOWN_NATIONCODE)
+    else:
+        nationcode, mobile = _nationcode(nationcode), digits
+
+    if nationcode == "86":
+        if len(mobile) == 13 and mobile.startswith("86"):
+            mobile = mobile[2:]
+        valid = len(mobile) == 11 and mobile[0] == "1" and mobile[1] > "2"
+    elif nationcode == "1":
+        if len(mobile) == 11 and mobile[0] == "1":
+            mobile = mobile[1:]
+        valid = len(mobile) == 10 and mobile[0] > "1"
+    else:
+        if mobile.startswith("0"):
+            mobile = mobile[1:]
+        valid = (4 <= len(mobile) <= E164_MAX - len(nationcode) and
+                 mobile[0] != "0")
+    if not valid:
+        raise InvalidNumber(phone_number, INVALID_NUMBER)
+    return nationcode, mobile
+
+
+def encode(nationcode, mobile):
+    """Encode a normalized number as a positive int below 2 ** 63."""
+    return int(nationcode + mobile) << 4 | len(mobile)
+
+
+def decode(key):
+    """Return the `(nationcode, mobile)` of an `encode`d number."""
+    length = key & 15
+    digits = str(key >> 4)
+    return digits[:-length], digits[-length:]
+
+
+# 2 ** 64 / golden ratio, for Fibonacci hashing
+_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class NumberSet(object):
+    """Set of positive ints below 2 ** 63, e.g. `encode`d numbers.
+
+    Keys are kept in one open addressing table of machine words, 8
+    bytes per slot at a load factor between 1/3 and 2/3, instead of an
+    int object and a hash entry each as in a `set`.
+    """
+
+    __slots__ = ("_table", "_mask", "_shift", "_size")
+
+    def __init__(self, capacity=0):
+        """
+        :param capacity: (optional) expected number of keys
+        """
+        bits = max(4, (capacity * 3 // 2).bit_length())
+        self._alloc(bits)
+
+    def _alloc(self, bits):
+        self._table = array.array(_TYPECODE, [0]) * (1 << bits)
+        self._mask = (1 << bits) - 1
+        self._shift = 64 - bits
+        self._size = 0
+
+    def _grow(self):
+        old, size = self._table, self._size
+        self._alloc(64 - self._shift + 1)
+        table, mask, shift = self._table, self._mask, self._shift
+        for key in old:
+            if key:
+                i = (key * _MULTIPLIER & _MASK64) >> shift
+                while table[i]:
+                    i = (i + 1) & mask
+                table[i] = key
+        self._size = size
+
+    def add(self, key):
+        """Add `key`, return False if it was in the set already."""
+        if key <= 0:
+            raise ValueError("key must be positive")
+        table, mask = self._table, self._mask
+        i = (key * _MULTIPLIER & _MASK64) >> self._shift
+        while True:
+            slot = table[i]
+            if slot == key:
+                return False
+            if not slot:
+                break
+            i = (i + 1) & mask
+        table[i] = key
+        self._size += 1
+        if self._size * 3 > len(table) * 2:
+            self._grow()
+        return True
+
+    def __contains__(self, key):
+        if key <= 0:
+            return False
+        table, mask = self._table, self._mask
+        i = (key * _MULTIPLIER & _MASK64) >> self._shift
+        while True:
+            slot = table[i]
+            if slot == key:
+                return True
+            if not slot:
+                return False
+            i = (i + 1) & mask
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (key for key in self._table if key)
+
+    @property
+    def nbytes(self):
+        """Memory used by the table."""
+        return len(self._table) * self._table.itemsize
+
+
+class RecipientFilter(object):
+    """Normalize, validate and dedupe recipients before sending, e.g.:
+
+        recipients = RecipientFilter(nationcode=86)
+        mobiles = (mobile for nationcode, mobile in
+                   recipients.filter(iter_lines("recipients.txt"))
+                   if nationcode == "86")
+        result = SmsBulkSender(appid, appkey).send(0, 86, mobiles, msg)
+        print(recipients.report())
+
+    Invalid numbers and duplicates are dropped locally and counted, the
+    first `max_rejected` of them are kept with their reason.  Numbers
+    seen are remembered `encode`d in a `NumberSet`, so a filter can be
+    reused to dedupe across several lists.
+    """
+
+    def __init__(self, nationcode=86, capacity=0, max_rejected=100):
+        """
+        :param nationcode: (optional) nationcode of national numbers
+        :param capacity: (optional) expected number of recipients
+        :param max_rejected: (optional) rejected numbers kept for the
+                             report
+        """
+        self._nationcode = _nationcode(nationcode)
+        self._seen = NumberSet(capacity)
+        self._max_rejected = max_rejected
+        self.accepted = 0
+        self.duplicates = 0
+        self.invalid = {}
+        self.rejected = []
+
+    def _reject(self, phone_number, reason):
+        if len(self.rejected) < self._max_rejected:
+            self.rejected.append((phone_number, reason))
+
+    def filter(self, recipients):
+        """Yield `(nationcode, mobile)` of the first occurrence of every
+        valid recipient.
+
+        :param recipients: iterable of phone numbers, or of
+                           `(nationcode, phone_number)` pairs
+        """
+        seen = self._seen
+        for recipient in recipients:
+            try:
+                if isinstance(recipient, (tuple, list)):
+                    nationcode, mobile = normalize(
+                        recipient[1], _nationcode(recipient[0]))
+                else:
+                    nationcode, mobile = normalize(
+                        recipient, self._nationcode)
+            except InvalidNumber as e:
+                self.invalid[e.reason] = self.invalid.get(e.reason, 0) + 1
+                self._reject(recipient, e.reason)
+                continue
+            if not seen.add(encode(nationcode, mobile)):
+                self.duplicates += 1
+                self._reject(recipient, "duplicate")
+                continue
+            self.accepted += 1
+            yield nationcode, mobile
+
+    def __contains__(self, recipient):
+        try:
+            return encode(*normalize(recipient, self._nationcode)) in \
+                self._seen
+        except InvalidNumber:
+            return False
+
+    def report(self):
+        """Return counts of accepted, duplicate and invalid recipients."""
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "invalid": dict(self.invalid),
+            "rejected": list(self.rejected),
+            "memory": self._seen.nbytes
+        }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import socket
+import threading
+import time
+
+
+__all__ = [
+    "Resolver"
+]
+
+
+_clock = getattr(time, "monotonic", time.time)
+
+
+class _Entry(object):
+
+    __slots__ = ("infos", "resolved", "next", "refreshing")
+
+    def __init__(self, infos, resolved):
+        self.infos = infos
+        self.resolved = resolved
+        self.next = 0
+        self.refreshing = False
+
+
+class Resolver(object):
+    """In-process DNS cache for HTTP clients, e.g.:
+
+        httpclient = HTTPPooledClient(resolver=Resolver(ttl=60))
+
+    Resolved addresses are cached for `ttl` seconds.  After that the
+    cached addresses are still returned while they are refreshed in a
+    background thread, and if the refresh fails they are kept, up to
+    `stale_ttl` seconds after they were resolved.  Every lookup returns
+    the addresses rotated by one, so new connections are spread over
+    all addresses of a host, and the next ones are tried if one is
+    unreachable.  The resolver is thread-safe and can be shared.
+    """
+
+    def __init__(self, ttl=60, stale_ttl=3600, family=0):
+        """
+        :param ttl: (optional) seconds addresses are used without
+                    refreshing them
+        :param stale_ttl: (optional) seconds after resolving during which
+                          stale addresses are used when the resolver
+                          fails
+        :param family: (optional) address family, e.g. `socket.AF_INET`,
+                       both IPv4 and IPv6 by default
+        """
+        self._ttl = ttl
+        self._stale_ttl = max(stale_ttl, ttl)
+        self._family = family
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _getaddrinfo(self, host, port):
+        return socket.getaddrinfo(host, port, self._family,
+                                  socket.SOCK_STREAM)
+
+    def _rotate(self, entry):
+        """Return the addresses of `entry`, rotated by one per call."""
+        infos = entry.infos
+        if not infos:
+            return infos
+        i = entry.next % len(infos)
+        entry.next = i + 1
+        return infos[i:] + infos[:i]
+
+    def _store(self, key, infos):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = entry = _Entry(infos, _clock())
+            else:
+                entry.infos, entry.resolved = infos, _clock()
+            entry.refreshing = False
+            return self._rotate(entry)
+
+    def _refresh(self, key):
+        try:
+            self._store(key, self._getaddrinfo(*key))
+        except Exception:
+            # keep serving the stale addresses, e.g. on socket.gaierror
+            # or a UnicodeError of an invalid host name
+            pass
+        finally:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def cached(self, host, port):
+        """Return cached addresses of (host, port) without blocking, None
+        if a blocking lookup is needed.
+
+        Expired addresses are returned while they are refreshed in the
+        background.
+        """
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = _clock() - entry.resolved
+            if age >= self._stale_ttl:
+                return None
+            infos = self._rotate(entry)
+            if age < self._ttl or entry.refreshing:
+                return infos
+            entry.refreshing = True
+        thread = threading.Thread(target=self._refresh, args=(key,))
+        thread.daemon = True
+        thread.start()
+        return infos
+
+    def resolve(self, host, port):
+        """Return `getaddrinfo` results of (host, port) for a TCP
+        connection, from the cache if possible.
+
+        `socket.gaierror` is only raised if the resolver fails and there
+        are no addresses younger than `stale_ttl`.
+        """
+        infos = self.cached(host, port)
+        if infos is not None:
+            return infos
+        return self._store((host, port), self._getaddrinfo(host, port))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
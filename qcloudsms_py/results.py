@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import array
+import bisect
+import sys
+
+from qcloudsms_py.bulk import RESULT_CLIENT_ERROR
+
+
+__all__ = [
+    "Record",
+    "ResultStore"
+]
+
+
+if sys.version_info >= (3,):
+    _INT64 = "q"
+else:
+    # 64 bits on the platforms "q" is missing from
+    _INT64 = "l"
+
+# Longest mobile encoded as an int, "1" + 17 digits is below 2 ** 63
+_MAX_DIGITS = 17
+
+# A run of an index is merged into the previous one if that one is at
+# most this many times larger
+_MERGE_RATIO = 4
+
+
+def _key(mobile):
+    """Encode `mobile` as a positive int, the leading "1" keeps its
+    leading zeros, or return None if it is not all digits."""
+    if 0 < len(mobile) <= _MAX_DIGITS and mobile.isdigit():
+        try:
+            return int("1" + mobile)
+        except ValueError:
+            pass
+    return None
+
+
+def _nationcode(value):
+    try:
+        return int(str(value).lstrip("+"))
+    except ValueError:
+        return 0
+
+
+def _sorted_run(keys, rows):
+    """Return arrays of `keys` and `rows` ordered by key, equal keys
+    stay in row order."""
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    return (array.array(_INT64, [keys[i] for i in order]),
+            array.array(_INT64, [rows[i] for i in order]))
+
+
+class _Index(object):
+    """Sorted index of int keys to rows, in runs of decreasing size.
+
+    Rows added since the last lookup are sorted into a run of their own,
+    which is merged with the previous runs while they are at most
+    `_MERGE_RATIO` times larger, so interleaving adds and lookups never
+    re-sorts the whole index.  Older runs hold older rows.  `distinct`
+    is the number of different keys.
+    """
+
+    def __init__(self):
+        self._runs = []
+        self.distinct = 0
+
+    def _contains(self, key):
+        for keys, _ in self._runs:
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return True
+        return False
+
+    def add(self, keys, rows):
+        keys, rows = _sorted_run(keys, rows)
+        previous = None
+        for key in keys:
+            if key != previous:
+                previous = key
+                if not self._contains(key):
+                    self.distinct += 1
+        runs = self._runs
+        while runs and len(runs[-1][0]) <= _MERGE_RATIO * len(keys):
+            # timsort merges the two sorted halves in linear time
+            older_keys, older_rows = runs.pop()
+            keys, rows = _sorted_run(older_keys + keys, older_rows + rows)
+        runs.append((keys, rows))
+
+    def find(self, key):
+        """Return the rows of `key`, oldest first."""
+        found = []
+        for keys, rows in self._runs:
+            lo = bisect.bisect_left(keys, key)
+            hi = bisect.bisect_right(keys, key, lo)
+            if lo < hi:
+                found.extend(rows[lo:hi])
+        return found
+
+    @property
+    def nbytes(self):
+        return sum(len(keys) * keys.itemsize + len(rows) * rows.itemsize
+                   for keys, rows in self._runs)
+
+
+class Record(object):
+    """Result of sending to one mobile, a row of a `ResultStore`."""
+
+    __slots__ = ("nationcode", "mobile", "result", "errmsg", "sid", "fee")
+
+    def __init__(self, nationcode, mobile, result, errmsg, sid, fee):
+        self.nationcode = nationcode
+        self.mobile = mobile
+        self.result = result
+        self.errmsg = errmsg
+        self.sid = sid
+        self.fee = fee
+
+    def __repr__(self):
+        return ("Record(nationcode={!r}, mobile={!r}, result={!r}, "
+                "errmsg={!r}, sid={!r}, fee={!r})").format(
+                    self.nationcode, self.mobile, self.result,
+                    self.errmsg, self.sid, self.fee)
+
+
+class ResultStore(object):
+    """Compact store of send results, indexed by mobile and by sid.
+
+    Responses are split into columns as they are added: the mobile
+    encoded as an int, nationcode, `result`, `fee`, an id of the
+    interned `errmsg` and the sid bytes, in arrays, so no per-mobile
+    dicts are kept.  Results of many chunks can be merged into one
+    store, it accepts the same `add` calls as `BulkSendResult`, e.g.:
+
+        store = SmsBulkSender(appid, appkey,
+                              result_class=ResultStore).send(...)
+        store.get("13800000000").sid
+        for record in store.filter(result=1016):
+            ...
+
+    Like `BulkSendResult` it is keyed by mobile: `len`, iteration, `in`,
+    `store[mobile]`, `result`, `sid`, `details`, `succeeded` and `failed`
+    behave the same, entries are built from the columns on access.
+    A mobile added several times, e.g. by a retry, has a row for each
+    time and is keyed by its last one, `record(row)`, `rows`, `filter`
+    and `counts` work on rows.
+
+    Lookups by mobile and sid binary search sorted indexes, rows added
+    since the previous lookup are indexed by the next one.
+    """
+
+    def __init__(self):
+        self._mobiles = array.array(_INT64)
+        self._nationcodes = array.array("H")
+        self._results = array.array("i")
+        self._fees = array.array("h")
+        self._errmsg_ids = array.array("i")
+        self._sid_ends = array.array(_INT64)
+        self._sid_data = bytearray()
+        self._errmsgs = []
+        self._errmsg_index = {}
+        # rows whose mobile is not all digits, and their rows by mobile
+        self._odd = {}
+        self._odd_rows = {}
+        self._indexed = 0
+        self._mobile_index = _Index()
+        # by hash of the sid
+        self._sid_index = _Index()
+        self.errors = []
+
+    def _errmsg_id(self, errmsg):
+        errmsg = str(errmsg)
+        id_ = self._errmsg_index.get(errmsg)
+        if id_ is None:
+            id_ = self._errmsg_index[errmsg] = len(self._errmsgs)
+            self._errmsgs.append(errmsg)
+        return id_
+
+    def _append(self, nationcode, mobile, result, errmsg, sid, fee):
+        mobile = str(mobile)
+        key = _key(mobile)
+        if key is None:
+            self._odd[len(self._mobiles)] = mobile
+            self._odd_rows.setdefault(mobile, []).append(len(self._mobiles))
+            key = 0
+        self._mobiles.append(key)
+        self._nationcodes.append(_nationcode(nationcode))
+        self._results.append(int(result))
+        self._fees.append(int(fee or 0))
+        self._errmsg_ids.append(self._errmsg_id(errmsg))
+        self._sid_data += (sid or "").encode("utf-8")
+        self._sid_ends.append(len(self._sid_data))
+
+    def add(self, phone_numbers, response=None, error=None):
+        """Merge the outcome of one request.
+
+        :param phone_numbers: phone numbers of the request
+        :param response: parsed response, of a multi send or of a
+                         single send to one phone number
+        :param error: exception raised by the request
+        """
+        if error is not None:
+            self.errors.append((phone_numbers, error))
+            errmsg = str(error)
+            for pn in phone_numbers:
+                self._append(0, pn, RESULT_CLIENT_ERROR, errmsg, None, 0)
+            return
+        detail = response.get("detail")
+        if detail is None and len(phone_numbers) == 1:
+            # a single send response
+            self._append(0, phone_numbers[0],
+                         response.get("result", RESULT_CLIENT_ERROR),
+                         response.get("errmsg", ""), response.get("sid"),
+                         response.get("fee"))
+            return
+        detail = detail or []
+        for entry in detail:
+            self._append(entry.get("nationcode", 0), entry.get("mobile"),
+                         entry.get("result", RESULT_CLIENT_ERROR),
+                         entry.get("errmsg", ""), entry.get("sid"),
+                         entry.get("fee"))
+        if len(detail) < len(phone_numbers):
+            returned = set(str(entry.get("mobile")) for entry in detail)
+            for pn in phone_numbers:
+                if str(pn) not in returned:
+                    self._append(0, pn,
+                                 response.get("result", RESULT_CLIENT_ERROR),
+                                 response.get("errmsg", ""), None, 0)
+
+    def __len__(self):
+        """Return the number of different mobiles."""
+        self._index()
+        return self._mobile_index.distinct + len(self._odd_rows)
+
+    def _mobile(self, row):
+        key = self._mobiles[row]
+        if key == 0:
+            return self._odd[row]
+        return str(key)[1:]
+
+    def _sid(self, row):
+        start = self._sid_ends[row - 1] if row else 0
+        return self._sid_data[start:self._sid_ends[row]].decode("utf-8")
+
+    def record(self, row):
+        """Return the `Record` of row `row`."""
+        count = len(self._mobiles)
+        if row < 0:
+            row += count
+        if not 0 <= row < count:
+            raise IndexError("row out of range")
+        return Record(str(self._nationcodes[row] or ""), self._mobile(row),
+                      self._results[row],
+                      self._errmsgs[self._errmsg_ids[row]],
+                      self._sid(row) or None, self._fees[row])
+
+    def _entry(self, row):
+        """Return row `row` as a `detail` entry of `BulkSendResult`."""
+        record = self.record(row)
+        return {"result": record.result, "errmsg": record.errmsg,
+                "mobile": record.mobile, "nationcode": record.nationcode,
+                "sid": record.sid, "fee": record.fee}
+
+    def __getitem__(self, mobile):
+        """Return the entry of `mobile` like `BulkSendResult`, raise
+        KeyError if there is none."""
+        return self._entry(self._last_row(mobile))
+
+    def _last_row(self, mobile):
+        rows = self._rows(mobile)
+        if not rows:
+            raise KeyError(mobile)
+        return rows[-1]
+
+    def _keyed_rows(self, last=True):
+        """Yield `(mobile, row)` of every mobile, in the order mobiles
+        were first added, with its last row or its first row."""
+        for row in range(len(self._mobiles)):
+            mobile = self._mobile(row)
+            rows = self._rows(mobile)
+            if rows[0] == row:
+                yield mobile, rows[-1] if last else row
+
+    def __iter__(self):
+        for mobile, _ in self._keyed_rows(last=False):
+            yield mobile
+
+    def result(self, mobile):
+        """Return `result` code of `mobile`, 0 means success."""
+        return self._results[self._last_row(mobile)]
+
+    def sid(self, mobile):
+        """Return sid of `mobile`, None if sending failed."""
+        return self._sid(self._last_row(mobile)) or None
+
+    @property
+    def details(self):
+        """Return {mobile: entry} like `BulkSendResult.details`, built
+        from the columns, which takes as much memory as the latter."""
+        return dict((mobile, self._entry(row))
+                    for mobile, row in self._keyed_rows())
+
+    def _index(self):
+        count = len(self._mobiles)
+        if self._indexed == count:
+            return
+        rows = [row for row in range(self._indexed, count)
+                if row not in self._odd]
+        self._mobile_index.add(array.array(_INT64, [
+            self._mobiles[row] for row in rows]), rows)
+        rows = range(self._indexed, count)
+        self._sid_index.add(array.array(_INT64, [
+            hash(self._sid(row)) for row in rows]), rows)
+        self._indexed = count
+
+    def _rows(self, mobile):
+        """Return the rows of `mobile`, oldest first."""
+        mobile = str(mobile)
+        key = _key(mobile)
+        if key is None:
+            return list(self._odd_rows.get(mobile, ()))
+        self._index()
+        return self._mobile_index.find(key)
+
+    def get(self, mobile, nationcode=None):
+        """Return the last `Record` of `mobile`, None if there is none.
+
+        :param mobile: phone number
+        :param nationcode: (optional) only match results of this
+                           nationcode, results of failed requests have
+                           no nationcode and always match
+        """
+        nationcode = None if nationcode is None else _nationcode(nationcode)
+        for row in reversed(self._rows(mobile)):
+            if nationcode is None or \
+                    self._nationcodes[row] in (0, nationcode):
+                return self.record(row)
+        return None
+
+    def __contains__(self, mobile):
+        return len(self._rows(mobile)) > 0
+
+    def by_sid(self, sid):
+        """Return the `Record` of `sid`, None if there is none."""
+        if not sid:
+            return None
+        self._index()
+        for row in self._sid_index.find(hash(sid)):
+            if self._sid(row) == sid:
+                return self.record(row)
+        return None
+
+    def rows(self, result=None, failed=None):
+        """Return the rows matching the given conditions.
+
+        :param result: (optional) only rows with this `result` code
+        :param failed: (optional) only rows with a non-zero `result` if
+                       True, with `result` 0 if False
+        """
+        results = self._results
+        if result is not None:
+            return [row for row, value in enumerate(results)
+                    if value == result]
+        if failed is None:
+            return list(range(len(results)))
+        if failed:
+            return [row for row, value in enumerate(results) if value]
+        return [row for row, value in enumerate(results) if not value]
+
+    def filter(self, result=None, failed=None):
+        """Yield the `Record` of the rows matching the conditions, see
+        `rows`."""
+        for row in self.rows(result, failed):
+            yield self.record(row)
+
+    def counts(self):
+        """Return {result code: number of rows}."""
+        counts = {}
+        for value in self._results:
+            counts[value] = counts.get(value, 0) + 1
+        return counts
+
+    @property
+    def succeeded(self):
+        return [mobile for mobile, row in self._keyed_rows()
+                if self._results[row] == 0]
+
+    @property
+    def failed(self):
+        return [mobile for mobile, row in self._keyed_rows()
+                if self._results[row] != 0]
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the columns and indexes."""
+        size = (len(self._sid_data) + self._mobile_index.nbytes +
+                self._sid_index.nbytes)
+        for column in (self._mobiles, self._nationcodes, self._results,
+                       self._fees, self._errmsg_ids, self._sid_ends):
+            size += len(column) * column.itemsize
+        return size
@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import random
+import socket
+import ssl
+import sys
+import threading
+import time
+import uuid
+
+from qcloudsms_py import util
+from qcloudsms_py.httpclient import HTTPClientInterface, unicode_type
+
+if sys.version_info >= (3,):
+    import queue
+    from http import client as httplib
+    from urllib import parse as urlparse
+else:
+    import Queue as queue
+    import httplib
+    import urlparse
+
+
+__all__ = [
+    "RetryPolicy",
+    "RetryingHTTPClient"
+]
+
+
+_clock = getattr(time, "monotonic", time.time)
+
+_NETWORK_ERRORS = (socket.error, socket.timeout, httplib.HTTPException)
+try:
+    # asyncio.TimeoutError before Python 3.11
+    from concurrent.futures import TimeoutError as _FutureTimeoutError
+    _NETWORK_ERRORS += (_FutureTimeoutError,)
+except ImportError:
+    pass
+
+# Endpoints whose requests may be hedged by default, the sends, which
+# carry an `ext` dedupe token
+HEDGE_ENDPOINTS = ("sendsms", "sendmultisms2", "sendvoiceprompt",
+                   "sendcvoice", "sendtvoice", "sendfvoice")
+
+# Status pulls consume the reports they return, a hedged pull loses the
+# reports of the losing response, so they are never hedged
+_UNHEDGEABLE = frozenset(["pullstatus", "pullstatus4mobile"])
+
+
+def _endpoint(req):
+    return urlparse.urlparse(req.url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class RetryPolicy(object):
+    """Which failures are retried, and how.
+
+    Failed attempts are retried with exponential backoff and full
+    jitter, at most `max_attempts` times in total and not after
+    `deadline` seconds from the first attempt.  Every retry is a new
+    request with fresh random, time and signature.
+
+    With `hedge_percentile`, an attempt which hasn't finished after that
+    percentile of recent latencies is hedged by a duplicate request and
+    the first successful response wins.  Only requests to
+    `hedge_endpoints` with an in-memory body are hedged, never status
+    pulls or streamed uploads.  Hedged sends may deliver a message
+    twice; both requests carry the same `ext` dedupe token.
+    """
+
+    RETRY_EXCEPTIONS = _NETWORK_ERRORS
+
+    # socket.error subclasses which retrying won't fix, e.g. a
+    # certificate verification failure
+    NO_RETRY_EXCEPTIONS = (ssl.SSLError,)
+
+    RETRY_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts=3, backoff=0.1, max_backoff=2.0,
+                 deadline=None, retry_exceptions=None,
+                 retry_codes=RETRY_CODES, retry_results=(),
+                 hedge_percentile=None, hedge_min_samples=20,
+                 hedge_window=1000, hedge_endpoints=HEDGE_ENDPOINTS,
+                 dedupe_ext=True):
+        """
+        :param max_attempts: (optional) maximum attempts, including the
+                             first one
+        :param backoff: (optional) base backoff in seconds, doubled after
+                        every attempt
+        :param max_backoff: (optional) maximum backoff in seconds
+        :param deadline: (optional) seconds after the first attempt after
+                         which no retry is started
+        :param retry_exceptions: (optional) tuple of exception types to
+                                 retry, default is network errors except
+                                 SSL errors
+        :param retry_codes: (optional) HTTP status codes to retry
+        :param retry_results: (optional) API `result` codes to retry
+        :param hedge_percentile: (optional) latency percentile in (0, 1)
+                                 after which a hedged request is sent
+        :param hedge_min_samples: (optional) latencies needed before
+                                  hedging starts
+        :param hedge_window: (optional) number of recent latencies kept
+                             per endpoint
+        :param hedge_endpoints: (optional) endpoints, e.g. "sendsms",
+                                whose requests are safe to hedge
+        :param dedupe_ext: (optional) put a dedupe token into an empty
+                           `ext` field, shared by all attempts
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if hedge_percentile is not None and not 0 < hedge_percentile < 1:
+            raise ValueError("hedge_percentile must be in (0, 1)")
+        if _UNHEDGEABLE.intersection(hedge_endpoints):
+            raise ValueError("status pulls can't be hedged")
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.retry_exceptions = (retry_exceptions or
+                                 self.__class__.RETRY_EXCEPTIONS)
+        self.no_retry_exceptions = (
+            () if retry_exceptions else self.__class__.NO_RETRY_EXCEPTIONS)
+        self.retry_codes = frozenset(retry_codes)
+        self.retry_results = frozenset(retry_results)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_window = hedge_window
+        self.hedge_endpoints = frozenset(hedge_endpoints)
+        self.dedupe_ext = dedupe_ext
+
+    def delay(self, attempt):
+        """Return seconds to sleep after failed `attempt` (from 1)."""
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def retryable_error(self, error):
+        return (isinstance(error, self.retry_exceptions) and
+                not isinstance(error, self.no_retry_exceptions))
+
+    def retryable_response(self, res):
+        if res.code in self.retry_codes:
+            return True
+        if self.retry_results and res.ok():
+            try:
+                return res.json().get("result") in self.retry_results
+            except ValueError:
+                return False
+        return False
+
+    def hedgeable(self, req):
+        """Return whether `req` may be sent twice at the same time: its
+        endpoint is in `hedge_endpoints` and its body is in memory, so
+        the two requests don't share a stream."""
+        return (req.rebuild is not None and
+                isinstance(req.body, (bytes, unicode_type, type(None))) and
+                _endpoint(req) in self.hedge_endpoints)
+
+    def prepare(self, req):
+        """Return the request of the first attempt."""
+        if self.dedupe_ext and req.rebuild is not None:
+            token = uuid.uuid4().hex
+            return req.rebuild(ext=lambda ext: ext or token)
+        return req
+
+
+class _LatencyWindow(object):
+    """Recent latencies of one endpoint, thread-safe."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._samples = collections.deque(maxlen=size)
+        self._sorted = None
+        self._added = 0
+
+    def add(self, latency):
+        with self._lock:
+            self._samples.append(latency)
+            self._added += 1
+
+    def percentile(self, p, min_samples):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            # re-sort at most every 10% of the window
+            if (self._sorted is None or
+                    self._added * 10 >= self._samples.maxlen):
+                self._sorted = sorted(self._samples)
+                self._added = 0
+            samples = self._sorted
+        return samples[min(int(p * len(samples)), len(samples) - 1)]
+
+
+class _Retrier(object):
+    """State shared by sync and async retrying clients."""
+
+    def __init__(self, policy):
+        self._policy = policy
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def _window(self, req):
+        key = urlparse.urlparse(req.url).path
+        window = self._windows.get(key)
+        if window is None:
+            with self._lock:
+                window = self._windows.setdefault(
+                    key, _LatencyWindow(self._policy.hedge_window))
+        return window
+
+    def hedge_delay(self, req):
+        policy = self._policy
+        if policy.hedge_percentile is None or not policy.hedgeable(req):
+            return None
+        return self._window(req).percentile(
+            policy.hedge_percentile, policy.hedge_min_samples)
+
+    def record(self, req, latency):
+        if self._policy.hedge_percentile is not None:
+            self._window(req).add(latency)
+
+    def backoff(self, attempt, start):
+        """Return seconds to sleep before the next attempt, None if no
+        more attempts are allowed."""
+        policy = self._policy
+        if attempt >= policy.max_attempts:
+            return None
+        delay = policy.delay(attempt)
+        if (policy.deadline is not None and
+                _clock() + delay - start >= policy.deadline):
+            return None
+        return delay
+
+    def retryable(self, outcome):
+        res, error = outcome
+        if error is not None:
+            return self._policy.retryable_error(error)
+        return self._policy.retryable_response(res)
+
+
+class RetryingHTTPClient(HTTPClientInterface, _Retrier):
+    """`HTTPClientInterface` which retries and hedges requests according
+    to a `RetryPolicy`, e.g.:
+
+        httpclient = RetryingHTTPClient(RetryPolicy(max_attempts=3))
+        sender = SmsSingleSender(appid, appkey, httpclient=httpclient)
+    """
+
+    def __init__(self, policy, httpclient=None):
+        """
+        :param policy: `RetryPolicy` instance
+        :param httpclient: (optional) wrapped `HTTPClientInterface`,
+                           default is the SDK's shared pooled client
+        """
+        _Retrier.__init__(self, policy)
+        self._httpclient = httpclient
+
+    def _fetch(self, req):
+        """Fetch `req`, return `(response, error)`."""
+        start = _clock()
+        try:
+            res = (self._httpclient or util._http_simple_client).fetch(req)
+        except Exception as e:
+            return None, e
+        self.record(req, _clock() - start)
+        return res, None
+
+    def _attempt(self, req):
+        delay = self.hedge_delay(req)
+        if delay is None:
+            return self._fetch(req)
+
+        outcomes = queue.Queue()
+
+        def start(request):
+            thread = threading.Thread(
+                target=lambda: outcomes.put(self._fetch(request)))
+            thread.daemon = True
+            thread.start()
+
+        start(req)
+        try:
+            return outcomes.get(timeout=delay)
+        except queue.Empty:
+            # no response within `delay`, send a hedged request
+            start(req.rebuild())
+        outcome = outcomes.get()
+        if self.retryable(outcome):
+            # the first finished request failed, wait for the other one
+            outcome = outcomes.get()
+        return outcome
+
+    def fetch(self, req):
+        req = self._policy.prepare(req)
+        start = _clock()
+        attempt = 1
+        while True:
+            outcome = self._attempt(req)
+            if not self.retryable(outcome):
+                break
+            delay = self.backoff(attempt, start)
+            if delay is None:
+                break
+            time.sleep(delay)
+            attempt += 1
+            if req.rebuild is not None:
+                req = req.rebuild()
+        res, error = outcome
+        if error is not None:
+            raise error
+        return res
+
+    def close(self):
+        if self._httpclient:
+            self._httpclient.close()
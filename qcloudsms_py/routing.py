@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import random
+import sys
+import threading
+import time
+
+from qcloudsms_py import util
+from qcloudsms_py.httpclient import HTTPClientInterface, HTTPRequest
+from qcloudsms_py.retry import _NETWORK_ERRORS
+
+if sys.version_info >= (3,):
+    from urllib import parse as urlparse
+else:
+    import urlparse
+
+
+__all__ = [
+    "EndpointSelector",
+    "RoutingHTTPClient",
+    "CircuitOpen"
+]
+
+
+_clock = getattr(time, "monotonic", time.time)
+
+# Origin of the URLs SMS senders use by default
+DEFAULT_ORIGIN = "https://yun.tim.qq.com"
+
+# Origin of the URLs voice senders use by default
+VOICE_ORIGIN = "https://cloud.tim.qq.com"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpen(Exception):
+
+    def __init__(self, api, wait):
+        self.api = api
+        self.wait = wait
+        super(CircuitOpen, self).__init__(api, wait)
+
+    def __str__(self):
+        return "all endpoints of {} are open, retry in {:.3f}s".format(
+            self.api, self.wait)
+    __repr__ = __str__
+
+
+class _Endpoint(object):
+    """Latency and circuit state of one origin for one API."""
+
+    __slots__ = ("origin", "ewma", "state", "failures", "opened",
+                 "probing")
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.ewma = None
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = None
+        self.probing = False
+
+
+def _origin(url):
+    result = urlparse.urlsplit(url)
+    return "{}://{}".format(result.scheme, result.netloc)
+
+
+class EndpointSelector(object):
+    """Pick the origin a request is sent to among several per API.
+
+    APIs are named by the last segment of the request path, as in
+    `RateLimiter`, e.g. "sendsms" or "sendmultisms2", and "*" applies
+    to every other API.  For every API each origin has an exponentially
+    weighted moving average of its latencies (`alpha` is the weight of
+    a new sample) and requests go to the healthy origin with the lowest
+    one; origins without samples are tried first and a random healthy
+    origin is picked with probability `explore`, so the averages of
+    slower origins stay current.  A failed request counts as taking at
+    least `failure_latency` seconds, so an origin failing fast doesn't
+    look fast.
+
+    Every origin has a circuit breaker: after `failure_threshold`
+    consecutive failures (network errors or HTTP 5xx) it opens and the
+    origin gets no requests.  After `reset_timeout` seconds it is half
+    open, one probe request is sent to it, which closes the circuit if
+    it succeeds and opens it again if not.  When every circuit of an
+    API is open, requests fail fast with `CircuitOpen`.  The selector
+    is thread-safe and can be shared between clients.
+    """
+
+    def __init__(self, endpoints, alpha=0.2, failure_threshold=5,
+                 reset_timeout=30.0, explore=0.02, failure_latency=5.0):
+        """
+        :param endpoints: dictionary of API name to a list of origins,
+                          e.g. {"*": ["https://yun.tim.qq.com",
+                          "https://backup.example.com"]}; a list applies
+                          to every API; voice APIs are only routed by
+                          "*" if it lists "https://cloud.tim.qq.com"
+        :param alpha: (optional) EWMA weight of a new latency in (0, 1]
+        :param failure_threshold: (optional) consecutive failures which
+                                  open a circuit
+        :param reset_timeout: (optional) seconds before an open circuit
+                              is probed
+        :param explore: (optional) probability of picking a random
+                        healthy origin
+        :param failure_latency: (optional) minimum latency in seconds
+                                recorded for a failed request
+        """
+        if isinstance(endpoints, (list, tuple)):
+            endpoints = {"*": endpoints}
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self._origins = {}
+        for api, origins in endpoints.items():
+            origins = [origin.rstrip("/") for origin in origins]
+            if not origins:
+                raise ValueError("no endpoints for {!r}".format(api))
+            self._origins[api] = origins
+        self._alpha = alpha
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._explore = explore
+        self._failure_latency = failure_latency
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _endpoints_of(self, api):
+        endpoints = self._endpoints.get(api)
+        if endpoints is None:
+            origins = self._origins.get(api, self._origins.get("*"))
+            if origins is None:
+                return None
+            endpoints = self._endpoints[api] = [
+                _Endpoint(origin) for origin in origins]
+        return endpoints
+
+    def routes(self, api, origin):
+        """Return whether requests of `api` to `origin` are routed.
+
+        Requests to one of the origins of `api` are routed, and requests
+        to the default origin of SMS or voice APIs if `api` has origins
+        of its own.  "*" only replaces the default origin of SMS APIs,
+        so voice requests aren't moved to SMS hosts by it.
+        """
+        origins = self._origins.get(api)
+        if origins is not None:
+            return origin in origins or origin in (DEFAULT_ORIGIN,
+                                                   VOICE_ORIGIN)
+        origins = self._origins.get("*")
+        return origins is not None and (
+            origin == DEFAULT_ORIGIN or origin in origins)
+
+    def select(self, api):
+        """Return the endpoint the next request of `api` is sent to,
+        pass it to `record` when the request finished."""
+        with self._lock:
+            now = _clock()
+            healthy = []
+            wait = None
+            for endpoint in self._endpoints_of(api):
+                if endpoint.state == CLOSED:
+                    healthy.append(endpoint)
+                    continue
+                if endpoint.probing:
+                    continue
+                remaining = endpoint.opened + self._reset_timeout - now
+                if remaining <= 0:
+                    # half open, this request is the probe
+                    endpoint.state = HALF_OPEN
+                    endpoint.probing = True
+                    return endpoint
+                if wait is None or remaining < wait:
+                    wait = remaining
+            if not healthy:
+                raise CircuitOpen(api, wait or 0.0)
+            if self._explore and random.random() < self._explore:
+                return random.choice(healthy)
+            return min(healthy, key=lambda endpoint: endpoint.ewma or 0.0)
+
+    def record(self, endpoint, latency, ok):
+        """Record the outcome of a request sent to `endpoint`.
+
+        :param endpoint: endpoint returned by `select`
+        :param latency: seconds the request took
+        :param ok: True if it succeeded, False if it failed, None if
+                   the outcome says nothing about the endpoint
+        """
+        with self._lock:
+            endpoint.probing = False
+            if ok is None:
+                if endpoint.state == HALF_OPEN:
+                    # not a conclusive probe, probe again
+                    endpoint.state = OPEN
+                    endpoint.opened = _clock() - self._reset_timeout
+                return
+            if not ok:
+                latency = max(latency, self._failure_latency)
+            if endpoint.ewma is None:
+                endpoint.ewma = latency
+            else:
+                endpoint.ewma += self._alpha * (latency - endpoint.ewma)
+            if ok:
+                endpoint.failures = 0
+                endpoint.state = CLOSED
+                return
+            endpoint.failures += 1
+            if endpoint.state == HALF_OPEN or \
+                    endpoint.failures >= self._failure_threshold:
+                endpoint.state = OPEN
+                endpoint.opened = _clock()
+
+    def stats(self):
+        """Return {API: [{"origin", "state", "ewma", "failures"}]} of
+        the APIs requested so far."""
+        with self._lock:
+            return dict((api, [{
+                "origin": endpoint.origin,
+                "state": endpoint.state,
+                "ewma": endpoint.ewma,
+                "failures": endpoint.failures
+            } for endpoint in endpoints])
+                for api, endpoints in self._endpoints.items())
+
+    def route(self, req):
+        """Return `(request, endpoint)`: a copy of `req` sent to the
+        selected endpoint, or `req` itself and None if it is not
+        routed, e.g. because of a custom url."""
+        api = req.url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+        origin = _origin(req.url)
+        if not self.routes(api, origin):
+            return req, None
+        endpoint = self.select(api)
+        return self._reroute(req, origin, endpoint), endpoint
+
+    def _reroute(self, req, origin, endpoint):
+        """Return a copy of `req` sent to `endpoint` instead of `origin`,
+        whose rebuilt requests, e.g. retries of a `RetryingHTTPClient`
+        wrapped by the routing client, are sent there too."""
+        routed = HTTPRequest(endpoint.origin + req.url[len(origin):],
+                             req.method, req.headers, req.body)
+        rebuild = req.rebuild
+        if rebuild is not None:
+            routed.rebuild = lambda **overrides: self._reroute(
+                rebuild(**overrides), origin, endpoint)
+        return routed
+
+    @staticmethod
+    def outcome(res=None, error=None):
+        """Return the `ok` argument of `record` for a request outcome."""
+        if error is not None:
+            return False if isinstance(error, _NETWORK_ERRORS) else None
+        return res.code < 500
+
+
+class RoutingHTTPClient(HTTPClientInterface):
+    """`HTTPClientInterface` which sends every request to the fastest
+    healthy endpoint chosen by an `EndpointSelector`, e.g.:
+
+        selector = EndpointSelector({"*": ["https://yun.tim.qq.com",
+                                           "https://backup.example.com"]})
+        httpclient = RoutingHTTPClient(selector)
+        sender = SmsSingleSender(appid, appkey, httpclient=httpclient)
+
+    Requests to the default origin of SMS APIs or to one of the
+    selector's origins are routed, and requests of voice APIs to their
+    default origin if the selector has origins for them, see
+    `EndpointSelector.routes`.  Requests to other URLs, e.g. a custom
+    `url`, are sent as they are.  Retries and hedges of a
+    `RetryingHTTPClient` wrapped by it are sent to the endpoint selected
+    for the request.
+    """
+
+    def __init__(self, selector, httpclient=None):
+        """
+        :param selector: `EndpointSelector` instance, or its `endpoints`
+        :param httpclient: (optional) wrapped `HTTPClientInterface`,
+                           default is the SDK's shared pooled client
+        """
+        if not isinstance(selector, EndpointSelector):
+            selector = EndpointSelector(selector)
+        self._selector = selector
+        self._httpclient = httpclient
+
+    @property
+    def selector(self):
+        return self._selector
+
+    def fetch(self, req):
+        req, endpoint = self._selector.route(req)
+        httpclient = self._httpclient or util._http_simple_client
+        if endpoint is None:
+            return httpclient.fetch(req)
+        start = _clock()
+        try:
+            res = httpclient.fetch(req)
+        except BaseException as e:
+            self._selector.record(endpoint, _clock() - start,
+                                  EndpointSelector.outcome(error=e))
+            raise
+        self._selector.record(endpoint, _clock() - start,
+                              EndpointSelector.outcome(res))
+        return res
+
+    def close(self):
+        if self._httpclient:
+            self._httpclient.close()
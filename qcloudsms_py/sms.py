@@ -3,8 +3,7 @@
 
 from __future__ import absolute_import, division, print_function
 
-import json
-
+from qcloudsms_py import codec
 from qcloudsms_py import util
 from qcloudsms_py.httpclient import HTTPRequest
 
@@ -17,11 +16,109 @@ __all__ = [
 ]
 
 
+def _quote(value):
+    """Serialize `value` as a JSON string, fast path for digits."""
+    value = str(value)
+    if value.isdigit():
+        return '"' + value + '"'
+    return codec.dumps(value)
+
+
+class _PreparedRequest(HTTPRequest):
+    """Request built by `PreparedSmsSender`, its `rebuild` is a method
+    instead of the partial `util.request_builder` sets, which keeps
+    building it cheap."""
+
+    def __init__(self, sender, args, url, body):
+        self.url = url
+        self.method = "POST"
+        self.headers = sender._HEADERS
+        self.body = body
+        self._sender = sender
+        self._args = args
+
+    def rebuild(self, **overrides):
+        """Build a fresh equivalent request, see `util.request_builder`."""
+        nationcode, phone_number, value, ext = self._args
+        override = overrides.get("ext")
+        if override is not None:
+            ext = override(ext) if callable(override) else override
+        return self._sender._send_request(nationcode, phone_number, value,
+                                          ext)
+
+
+class PreparedSmsSender(object):
+    """Single SMS sender with the fixed part of the request prepared.
+
+    Created by `SmsSingleSender.prepare` and
+    `SmsSingleSender.prepare_with_param`.  The constant fields are
+    serialized once, every `send` only serializes the phone number, the
+    message or template parameters, the signature and the ext field.
+    """
+
+    _HEADERS = {"Content-Type": "application/json"}
+
+    def __init__(self, appid, appkey, httpclient, url, field, fields,
+                 signer=None):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: `HTTPClientInterface` instance or None
+        :param url: request url
+        :param field: name of the field passed to every `send`
+        :param fields: dictionary of constant fields
+        :param signer: (optional) `util.Signer` of `appkey` to share
+        """
+        self._appid = appid
+        self._appkey = appkey
+        self._signer = signer if signer is not None else util.Signer(appkey)
+        self._httpclient = httpclient
+        self._url_prefix = "{}?sdkappid={}&random=".format(url, appid)
+        self._field = ', "{}": '.format(field)
+        self._suffix = ", " + codec.dumps(fields)[1:]
+
+    def send(self, nationcode, phone_number, value, ext=""):
+        """Send single SMS message.
+
+        :param nationcode: nation dialing code, e.g. China is 86, USA is 1
+        :param phone_number: phone number
+        :param value: SMS message content for `SmsSingleSender.prepare`,
+                      template parameters for
+                      `SmsSingleSender.prepare_with_param`
+        :param ext: ext field, content will be returned by server as it is
+        """
+        return util.api_request(
+            self._send_request(nationcode, phone_number, value, ext),
+            self._httpclient
+        )
+
+    def _send_request(self, nationcode, phone_number, value, ext=""):
+        rand = util.get_random()
+        now = util.get_current_time()
+        return _PreparedRequest(
+            self, (nationcode, phone_number, value, ext),
+            self._url_prefix + str(rand),
+            "".join((
+                '{"tel": {"nationcode": ', _quote(nationcode),
+                ', "mobile": ', _quote(phone_number),
+                '}', self._field, codec.dumps(value),
+                ', "sig": "', self._signer.sign(
+                    rand, now, [phone_number]),
+                '", "time": ', str(now),
+                ', "ext": ', codec.dumps(str(ext)) if ext else '""',
+                self._suffix
+            ))
+        )
+
+
 class SmsSingleSender(object):
 
+    _prepared_class = PreparedSmsSender
+
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://yun.tim.qq.com/v5/tlssmssvr/sendsms"
         self._httpclient = httpclient
 
@@ -37,29 +134,37 @@ class SmsSingleSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(sms_type, nationcode, phone_number, msg, extend,
+                               ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, sms_type, nationcode, phone_number, msg,
+                      extend="", ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": str(phone_number)
                 },
                 "type": int(sms_type),
                 "msg": str(msg),
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "extend": str(extend),
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
     def send_with_param(self, nationcode, phone_number, template_id,
                         params, sign="", extend="", ext="", url=None):
@@ -74,15 +179,25 @@ class SmsSingleSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_with_param_request(nationcode, phone_number,
+                                          template_id, params, sign, extend,
+                                          ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_with_param_request(self, nationcode, phone_number, template_id,
+                                 params, sign="", extend="", ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": str(phone_number)
@@ -90,15 +205,48 @@ class SmsSingleSender(object):
                 "sign": str(sign),
                 "tpl_id": int(template_id),
                 "params": params,
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "extend": str(extend),
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
+    def prepare(self, sms_type, extend="", url=None):
+        """Prepare sending SMS messages of one type, see `send`.
+
+        Return a `PreparedSmsSender` whose `send(nationcode, phone_number,
+        msg, ext="")` only serializes per-message fields.
+
+        :param sms_type: SMS message type, Enum{0: normal SMS, 1: marketing SMS}
+        :param extend: extend field, default is empty string
+        :param url: custom url
+        """
+        return self._prepared_class(
+            self._appid, self._appkey, self._httpclient,
+            url if url else self._url, "msg",
+            {"type": int(sms_type), "extend": str(extend)}, self._signer
+        )
+
+    def prepare_with_param(self, template_id, sign="", extend="", url=None):
+        """Prepare sending SMS messages of one template, see
+        `send_with_param`.
+
+        Return a `PreparedSmsSender` whose `send(nationcode, phone_number,
+        params, ext="")` only serializes per-message fields.
+
+        :param template_id: template id
+        :param sign: Sms user sign
+        :param extend: extend field, default is empty string
+        :param url: custom url
+        """
+        return self._prepared_class(
+            self._appid, self._appkey, self._httpclient,
+            url if url else self._url, "params",
+            {"sign": str(sign), "tpl_id": int(template_id),
+             "extend": str(extend)}, self._signer
+        )
 
 
 class SmsMultiSender(object):
@@ -106,6 +254,7 @@ class SmsMultiSender(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://yun.tim.qq.com/v5/tlssmssvr/sendmultisms2"
         self._httpclient = httpclient
 
@@ -121,27 +270,35 @@ class SmsMultiSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(sms_type, nationcode, phone_numbers, msg,
+                               extend, ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, sms_type, nationcode, phone_numbers, msg,
+                      extend="", ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": [{"nationcode": nationcode, "mobile": pn}
                         for pn in phone_numbers],
                 "type": int(sms_type),
                 "msg": str(msg),
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, phone_numbers),
+                "sig": self._signer.sign(
+                    rand, now, phone_numbers),
                 "time": now,
                 "extend": str(extend),
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
     def send_with_param(self, nationcode, phone_numbers, template_id,
                         params, sign="", extend="", ext="", url=None):
@@ -158,28 +315,37 @@ class SmsMultiSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_with_param_request(nationcode, phone_numbers,
+                                          template_id, params, sign, extend,
+                                          ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_with_param_request(self, nationcode, phone_numbers, template_id,
+                                 params, sign="", extend="", ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": [{"nationcode": nationcode, "mobile": pn}
                         for pn in phone_numbers],
                 "sign": sign,
                 "tpl_id": int(template_id),
                 "params": params,
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, phone_numbers),
+                "sig": self._signer.sign(
+                    rand, now, phone_numbers),
                 "time": now,
                 "extend": str(extend),
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
 
 class SmsStatusPuller(object):
@@ -187,6 +353,7 @@ class SmsStatusPuller(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://yun.tim.qq.com/v5/tlssmssvr/pullstatus"
         self._httpclient = httpclient
 
@@ -197,23 +364,29 @@ class SmsStatusPuller(object):
         :param max_num: maximum number of message status
         :param url: custom url
         """
+        return util.api_request(
+            self._pull_request(sms_type, max_num, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _pull_request(self, sms_type, max_num, url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now),
+            body=codec.dumpb({
+                "sig": self._signer.sign(
+                    rand, now),
                 "time": now,
                 "type": sms_type,
                 "max": max_num
             })
         )
-        return util.api_request(req, self._httpclient)
 
     def pull_callback(self, max_num, url=None):
         """Pull callback SMS messages status.
@@ -237,6 +410,7 @@ class SmsMobileStatusPuller(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid;
         self._appkey = appkey;
+        self._signer = util.Signer(appkey)
         self._url = "https://yun.tim.qq.com/v5/tlssmssvr/pullstatus4mobile"
         self._httpclient = httpclient
 
@@ -252,17 +426,26 @@ class SmsMobileStatusPuller(object):
         :param max_num: maximum number of message status
         :param url: custom url
         """
+        return util.api_request(
+            self._pull_request(msg_type, nationcode, mobile, begin_time,
+                               end_time, max_num, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _pull_request(self, msg_type, nationcode, mobile,
+                      begin_time, end_time, max_num, url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now),
+            body=codec.dumpb({
+                "sig": self._signer.sign(
+                    rand, now),
                 "type": msg_type,
                 "time": now,
                 "max": max_num,
@@ -272,7 +455,6 @@ class SmsMobileStatusPuller(object):
                 "mobile": str(mobile)
             })
         )
-        return util.api_request(req, self._httpclient)
 
     def pull_callback(self, nationcode, mobile, begin_time,
                       end_time, max_num, url=None):
@@ -5,10 +5,20 @@ from __future__ import absolute_import, division, print_function
 
 import random
 import time
+import functools
 import hashlib
+import inspect
 import json
+import sys
+import threading
 
-from qcloudsms_py.httpclient import HTTPError, HTTPSimpleClient, utf8
+if sys.version_info >= (3,):
+    import queue
+else:
+    import Queue as queue
+
+from qcloudsms_py.httpclient import HTTPError, HTTPPooledClient, utf8
+from qcloudsms_py.resolver import Resolver
 
 
 def get_random():
@@ -36,6 +46,70 @@ def calculate_signature(appkey, rand, time, phone_numbers=None):
     return hashlib.sha256(utf8(raw_text)).hexdigest()
 
 
+def encode_mobiles(phone_numbers):
+    """Encode phone numbers once for `Signer.sign`.
+
+    :param phone_numbers: phone number array
+    """
+    return utf8(",".join(map(str, phone_numbers)))
+
+
+class Signer(object):
+    """Request signer bound to one appkey.
+
+    Produce the same signatures as `calculate_signature`, the hash state
+    of the constant `appkey=...&random=` prefix is computed once and
+    copied for every request.  Phone numbers can be passed pre-encoded
+    by `encode_mobiles`, so multi-sends retrying the same recipients
+    don't join them again.
+    """
+
+    def __init__(self, appkey):
+        """
+        :param appkey: sdk appkey
+        """
+        self._prefix = hashlib.sha256(
+            utf8("appkey={}&random=".format(appkey)))
+
+    def sign(self, rand, time, phone_numbers=None):
+        """Calculate a request signature, see `calculate_signature`.
+
+        :param rand: random number
+        :param time: unix timestamp time
+        :param phone_numbers: phone number array, or bytes returned by
+                              `encode_mobiles`
+        """
+        h = self._prefix.copy()
+        h.update(("%s&time=%s" % (rand, time)).encode("utf-8"))
+        if phone_numbers:
+            if not isinstance(phone_numbers, bytes):
+                phone_numbers = encode_mobiles(phone_numbers)
+            h.update(b"&mobile=")
+            h.update(phone_numbers)
+        return h.hexdigest()
+
+    def sign_many(self, items):
+        """Calculate signatures of many requests in one call.
+
+        :param items: iterable of `(rand, time, phone_numbers)` tuples,
+                      `phone_numbers` can be None for requests without
+                      phone numbers
+        """
+        prefix = self._prefix
+        results = []
+        append = results.append
+        for rand, time, phone_numbers in items:
+            h = prefix.copy()
+            h.update(("%s&time=%s" % (rand, time)).encode("utf-8"))
+            if phone_numbers:
+                if not isinstance(phone_numbers, bytes):
+                    phone_numbers = encode_mobiles(phone_numbers)
+                h.update(b"&mobile=")
+                h.update(phone_numbers)
+            append(h.hexdigest())
+        return results
+
+
 def calculate_auth(appkey, rand, time, file_sha1sum):
     """Calculate a auth signature for uploading voice file.
 
@@ -50,11 +124,124 @@ def calculate_auth(appkey, rand, time, file_sha1sum):
     return hashlib.sha256(utf8(raw_text)).hexdigest()
 
 
-def sha1sum(content):
-    return hashlib.sha1(utf8(content)).hexdigest()
+def sha1sum(content, chunk_size=64 * 1024):
+    """Return the hex SHA-1 of `content`, a string or a file object.
+
+    A file object is hashed from its current position to its end in
+    chunks of `chunk_size` bytes, and then seeked back to that position.
+    """
+    if not hasattr(content, "read"):
+        return hashlib.sha1(utf8(content)).hexdigest()
+    h = hashlib.sha1()
+    offset = content.tell()
+    while True:
+        chunk = content.read(chunk_size)
+        if not chunk:
+            break
+        h.update(chunk)
+    content.seek(offset)
+    return h.hexdigest()
+
+
+def imap_unordered(func, iterable, max_workers=8, max_pending=None):
+    """Call `func` on every item of `iterable` in worker threads.
+
+    Yield `(item, result, error)` tuples in completion order, `error` is
+    the exception raised by `func` or None.  At most `max_pending` items
+    are taken from `iterable` before their results have been consumed,
+    so a lazy `iterable` is never read far ahead of the caller.
+
+    :param func: function called with one item
+    :param iterable: items, can be a generator
+    :param max_workers: number of worker threads
+    :param max_pending: maximum items in flight, default is 2 * max_workers
+    """
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    max_pending = max(max_pending, 1)
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stop = object()
+
+    def worker():
+        while True:
+            item = tasks.get()
+            if item is stop:
+                return
+            try:
+                results.put((item, func(item), None))
+            except Exception as e:
+                results.put((item, None, e))
+
+    threads = []
+    for _ in range(max(max_workers, 1)):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+
+    iterator = iter(iterable)
+    pending = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and pending < max_pending:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                tasks.put(item)
+                pending += 1
+            if not pending:
+                return
+            outcome = results.get()
+            pending -= 1
+            yield outcome
+    finally:
+        for _ in threads:
+            tasks.put(stop)
+
+
+def _rebuild(builder, func, obj, args, kwargs, **overrides):
+    if not overrides:
+        return builder(obj, *args, **kwargs)
+    if sys.version_info >= (3,):
+        bound = inspect.signature(func).bind(obj, *args, **kwargs)
+        bound.apply_defaults()
+        callargs = dict(bound.arguments)
+    else:
+        callargs = inspect.getcallargs(func, obj, *args, **kwargs)
+    del callargs["self"]
+    for name, value in overrides.items():
+        if name not in callargs:
+            continue
+        if callable(value):
+            value = value(callargs[name])
+        callargs[name] = value
+    return builder(obj, **callargs)
+
+
+def request_builder(func):
+    """Decorate a method which builds a `HTTPRequest`.
+
+    The returned request gets a `rebuild(**overrides)` method which
+    calls the builder again with the same arguments, so a retry gets a
+    fresh random, time and signature.  Keyword `overrides` replace
+    arguments of the same name, e.g. `req.rebuild(ext="token")`, a
+    callable override is called with the original value instead.
+    Overrides are ignored if the builder has no such argument.
+    """
+    @functools.wraps(func)
+    def builder(self, *args, **kwargs):
+        req = func(self, *args, **kwargs)
+        req.rebuild = functools.partial(
+            _rebuild, builder, func, self, args, kwargs)
+        return req
+    return builder
 
 
-_http_simple_client = HTTPSimpleClient()
+_http_simple_client = HTTPPooledClient(resolver=Resolver())
 
 
 def api_request(req, httpclient=None):
@@ -3,10 +3,9 @@
 
 from __future__ import absolute_import, division, print_function
 
-import json
-
+from qcloudsms_py import codec
 from qcloudsms_py import util
-from qcloudsms_py.httpclient import HTTPRequest
+from qcloudsms_py.httpclient import FileBody, HTTPRequest
 
 
 __all__ = [
@@ -25,6 +24,7 @@ class PromptVoiceSender(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://cloud.tim.qq.com/v5/tlsvoicesvr/sendvoiceprompt"
         self._httpclient = httpclient
 
@@ -40,15 +40,24 @@ class PromptVoiceSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(nationcode, phone_number, prompttype, msg,
+                               playtimes, ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, nationcode, phone_number, prompttype,
+                      msg, playtimes=2, ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": str(phone_number)
@@ -56,13 +65,12 @@ class PromptVoiceSender(object):
                 "prompttype": prompttype,
                 "promptfile": str(msg),
                 "playtimes": int(playtimes),
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
 
 # For compatibility with old API
@@ -74,6 +82,7 @@ class CodeVoiceSender(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://cloud.tim.qq.com/v5/tlsvoicesvr/sendcvoice"
         self._httpclient = httpclient
 
@@ -88,28 +97,36 @@ class CodeVoiceSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(nationcode, phone_number, msg, playtimes, ext,
+                               url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, nationcode, phone_number, msg,
+                      playtimes=2, ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": str(phone_number)
                 },
                 "msg": msg,
                 "playtimes": int(playtimes),
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
 # For compatibility with old API
 SmsVoiceVerifyCodeSender = CodeVoiceSender
@@ -120,6 +137,7 @@ class TtsVoiceSender(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://cloud.tim.qq.com/v5/tlsvoicesvr/sendtvoice"
         self._httpclient = httpclient
 
@@ -135,29 +153,37 @@ class TtsVoiceSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(template_id, params, phone_number, nationcode,
+                               playtimes, ext, url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, template_id, params, phone_number,
+                      nationcode="86", playtimes=2, ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": phone_number
                 },
                 "tpl_id": int(template_id),
                 "params": params,
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "playtimes": playtimes,
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
 
 class FileVoiceSender(object):
@@ -165,6 +191,7 @@ class FileVoiceSender(object):
     def __init__(self, appid, appkey, httpclient=None):
         self._appid = appid
         self._appkey = appkey
+        self._signer = util.Signer(appkey)
         self._url = "https://cloud.tim.qq.com/v5/tlsvoicesvr/sendfvoice"
         self._httpclient = httpclient
 
@@ -179,28 +206,36 @@ class FileVoiceSender(object):
         :param ext: ext field, content will be returned by server as it is
         :param url: custom url
         """
+        return util.api_request(
+            self._send_request(fid, phone_number, nationcode, playtimes, ext,
+                               url),
+            self._httpclient
+        )
+
+    @util.request_builder
+    def _send_request(self, fid, phone_number, nationcode="86",
+                      playtimes=2, ext="", url=None):
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}".format(
             url if url else self._url, self._appid, rand)
-        req = HTTPRequest(
+        return HTTPRequest(
             url=url,
             method="POST",
             headers={"Content-Type": "application/json"},
-            body=json.dumps({
+            body=codec.dumpb({
                 "tel": {
                     "nationcode": str(nationcode),
                     "mobile": phone_number
                 },
                 "fid": fid,
-                "sig": util.calculate_signature(
-                    self._appkey, rand, now, [phone_number]),
+                "sig": self._signer.sign(
+                    rand, now, [phone_number]),
                 "time": now,
                 "playtimes": playtimes,
                 "ext": str(ext)
             })
         )
-        return util.api_request(req, self._httpclient)
 
 
 class VoiceFileUploader(object):
@@ -210,36 +245,97 @@ class VoiceFileUploader(object):
         "mp3": "audio/mpeg"
     }
 
-    def __init__(self, appid, appkey, httpclient=None):
+    def __init__(self, appid, appkey, httpclient=None, cache=None):
+        """
+        :param appid: sdk appid
+        :param appkey: sdk appkey
+        :param httpclient: (optional) `HTTPClientInterface` instance
+        :param cache: (optional) `qcloudsms_py.fidcache.FidCache`, content
+                      uploaded before is answered from it with a
+                      "cached" response field instead of uploaded again
+        """
         self._appid = appid
         self._appkey = appkey
         self._url = "https://cloud.tim.qq.com/v5/tlsvoicesvr/uploadvoicefile"
         self._httpclient = httpclient
+        self._cache = cache
 
     def upload(self, file_content, content_type="mp3", url=None):
         """Upload voice file.
 
-        :param file_content: voice file content
+        :param file_content: voice file content, or a seekable file object
+                             opened in binary mode, which is streamed
+                             from its current position
         :param content_type: voice file content type
         :param url: custom url
         """
+        body = self._body(file_content)
+        if self._cache is None:
+            return util.api_request(
+                self._upload_request(body, content_type, url),
+                self._httpclient
+            )
+        file_sha1sum = self._sha1sum(body)
+        return self._cache.fetch(
+            self._appid, file_sha1sum,
+            lambda: util.api_request(
+                self._upload_request(body, content_type, url,
+                                     file_sha1sum),
+                self._httpclient
+            )
+        )
+
+    def upload_file(self, path, content_type=None, url=None):
+        """Upload voice file from `path` without reading it into memory.
+
+        :param path: voice file path
+        :param content_type: (optional) voice file content type, default
+                             is the file extension
+        :param url: custom url
+        """
+        with open(path, "rb") as f:
+            return self.upload(f, self._content_type(path, content_type),
+                               url)
+
+    @staticmethod
+    def _body(file_content):
+        if hasattr(file_content, "read"):
+            return FileBody(file_content)
+        return file_content
+
+    @staticmethod
+    def _sha1sum(body):
+        if isinstance(body, FileBody):
+            return util.sha1sum(body.rewind().fileobj)
+        return util.sha1sum(body)
+
+    @staticmethod
+    def _content_type(path, content_type=None):
+        if content_type is None:
+            content_type = path.rsplit(".", 1)[-1].lower()
+        return content_type
+
+    @util.request_builder
+    def _upload_request(self, file_content, content_type="mp3", url=None,
+                        file_sha1sum=None):
         if content_type not in self.__class__.CONTENT_TYPES:
             raise ValueError("invalid content")
         rand = util.get_random()
         now = util.get_current_time()
         url = "{}?sdkappid={}&random={}&time={}".format(
             url if url else self._url, self._appid, rand, now)
-        file_sha1sum = util.sha1sum(file_content)
-        req = HTTPRequest(
+        headers = {"Content-Type": self.__class__.CONTENT_TYPES[content_type]}
+        if isinstance(file_content, FileBody):
+            headers["Content-Length"] = str(len(file_content))
+        if file_sha1sum is None:
+            file_sha1sum = self._sha1sum(file_content)
+        headers["x-content-sha1"] = file_sha1sum
+        headers["Authorization"] = util.calculate_auth(
+            self._appkey, rand, now, file_sha1sum
+        )
+        return HTTPRequest(
             url=url,
             method="POST",
-            headers={
-                "Content-Type": self.__class__.CONTENT_TYPES[content_type],
-                "x-content-sha1": file_sha1sum,
-                "Authorization": util.calculate_auth(
-                    self._appkey, rand, now, file_sha1sum
-                )
-            },
+            headers=headers,
             body=file_content
         )
-        return util.api_request(req, self._httpclient)
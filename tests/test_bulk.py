@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import unittest
+
+from qcloudsms_py.bulk import SmsBulkMobileStatusPuller, TruncatedPull
+from qcloudsms_py.httpclient import HTTPClientInterface, HTTPResponse
+
+
+class StatusClient(HTTPClientInterface):
+    """Answer pullstatus4mobile with one record per second in `times`,
+    at most `max` of them."""
+
+    def __init__(self, times):
+        self.times = times
+
+    def fetch(self, req):
+        body = json.loads(req.body.decode("utf-8"))
+        data = [{"sid": str(t), "user_receive_time": t}
+                for t in self.times
+                if body["begin_time"] <= t <= body["end_time"]]
+        return HTTPResponse(req, 200, json.dumps({
+            "result": 0, "errmsg": "OK", "count": len(data),
+            "data": data[:body["max"]]
+        }).encode("utf-8"))
+
+
+class SmsBulkMobileStatusPullerTest(unittest.TestCase):
+
+    def pull(self, times):
+        puller = SmsBulkMobileStatusPuller(
+            1400000000, "appkey", StatusClient(times), max_workers=2,
+            max_num=10, min_window=60)
+        return list(puller.iter_pull_callback([(86, "13800000000")],
+                                              0, 3600))
+
+    def test_split_windows(self):
+        times = list(range(0, 3600, 100))
+        [(nationcode, mobile, records, error)] = self.pull(times)
+        self.assertIsNone(error)
+        self.assertEqual(sorted(r["user_receive_time"] for r in records),
+                         times)
+
+    def test_truncated_window(self):
+        # 30 records within one minute can't be split below min_window
+        times = list(range(1000, 1030)) + [3000]
+        [(nationcode, mobile, records, error)] = self.pull(times)
+        self.assertIsInstance(error, TruncatedPull)
+        self.assertTrue(error.windows)
+        for begin, end in error.windows:
+            self.assertLessEqual(end - begin, 60)
+        # the pulled records are still returned
+        self.assertIn(3000, [r["user_receive_time"] for r in records])
+        self.assertLess(len(records), len(times))
+
+
+if __name__ == "__main__":
+    unittest.main()
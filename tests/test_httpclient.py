@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import socket
+import threading
+import unittest
+
+from qcloudsms_py.httpclient import HTTPPooledClient, HTTPRequest
+
+
+class KeepAliveServer(object):
+    """Server answering the first request of a connection with
+    keep-alive, and then doing `then` with the next request."""
+
+    def __init__(self, then):
+        self.then = then
+        self.requests = 0
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(5)
+        self.port = self._sock.getsockname()[1]
+        thread = threading.Thread(target=self._serve)
+        thread.daemon = True
+        thread.start()
+
+    def _read_request(self, conn):
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return False
+            data += chunk
+        self.requests += 1
+        return True
+
+    def _respond(self, conn):
+        conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                     b"Connection: keep-alive\r\n\r\n{}")
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except socket.error:
+                return
+            if not self._read_request(conn):
+                conn.close()
+                continue
+            self._respond(conn)
+            if not self._read_request(conn):
+                conn.close()
+                continue
+            if self.then == "close":
+                conn.close()
+            # "hang": never answer, the client times out
+
+    def close(self):
+        self._sock.close()
+
+
+class PooledClientTest(unittest.TestCase):
+
+    def fetch_twice(self, then):
+        server = KeepAliveServer(then)
+        self.addCleanup(server.close)
+        client = HTTPPooledClient(request_timeout=0.5)
+        self.addCleanup(client.close)
+        url = "http://127.0.0.1:{}/v5/tlssmssvr/sendsms".format(server.port)
+        client.fetch(HTTPRequest(url, "POST", {}, "{}"))
+        return server, client.fetch(HTTPRequest(url, "POST", {}, "{}"))
+
+    def test_resends_when_peer_closed_without_response(self):
+        server, res = self.fetch_twice("close")
+        self.assertEqual(res.code, 200)
+        self.assertEqual(server.requests, 3)
+
+    def test_never_resends_after_timeout(self):
+        with self.assertRaises(socket.timeout):
+            self.fetch_twice("hang")
+
+
+if __name__ == "__main__":
+    unittest.main()
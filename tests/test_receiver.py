@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import unittest
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "needs asyncio async/await")
+class StatusReceiverTest(unittest.TestCase):
+
+    def exchange(self, request):
+        import asyncio
+        from qcloudsms_py.receiver import StatusReceiver
+
+        loop = asyncio.new_event_loop()
+        receiver = StatusReceiver(lambda records: None)
+        loop.run_until_complete(receiver.start("127.0.0.1", 0))
+        try:
+            reader, writer = loop.run_until_complete(
+                asyncio.open_connection("127.0.0.1", receiver.port))
+            writer.write(request)
+            response = loop.run_until_complete(
+                asyncio.wait_for(reader.read(), 5))
+            writer.close()
+            return response
+        finally:
+            loop.run_until_complete(receiver.close())
+            loop.close()
+
+    def test_too_long_request_line(self):
+        response = self.exchange(b"POST /" + b"a" * 100000 +
+                                 b" HTTP/1.1\r\n\r\n")
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+
+    def test_too_long_header(self):
+        response = self.exchange(b"POST / HTTP/1.1\r\nX-Long: " +
+                                 b"a" * 100000 + b"\r\n\r\n")
+        self.assertTrue(response.startswith(b"HTTP/1.1 400 "))
+
+    def test_push(self):
+        body = b'[{"mobile": "13800000000", "report_status": "SUCCESS"}]'
+        response = self.exchange(
+            b"POST / HTTP/1.1\r\nConnection: close\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" +
+            body)
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import socket
+import threading
+import unittest
+
+from qcloudsms_py import resolver
+from qcloudsms_py.httpclient import HTTPPooledClient, HTTPRequest
+from qcloudsms_py.resolver import Resolver
+
+
+class CountingResolver(Resolver):
+
+    def __init__(self, *args, **kwargs):
+        super(CountingResolver, self).__init__(*args, **kwargs)
+        self.lookups = []
+        self.error = None
+
+    def _getaddrinfo(self, host, port):
+        self.lookups.append((host, port))
+        if self.error is not None:
+            raise self.error
+        return super(CountingResolver, self)._getaddrinfo(host, port)
+
+
+class ResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.clock = resolver._clock
+        resolver._clock = lambda: self.now
+
+    def tearDown(self):
+        resolver._clock = self.clock
+
+    def refresh(self, r):
+        self.now += r._ttl
+        r.cached("127.0.0.1", 80)
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread():
+                thread.join(1)
+
+    def test_failed_refresh_keeps_refreshing(self):
+        for error in (socket.gaierror("no such host"), UnicodeError()):
+            r = CountingResolver(ttl=10)
+            r.resolve("127.0.0.1", 80)
+            r.error = error
+            self.refresh(r)
+            self.refresh(r)
+            self.assertEqual(len(r.lookups), 3)
+            self.assertIsNotNone(r.cached("127.0.0.1", 80))
+
+    def test_client_resolves_through_resolver(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+
+        def serve():
+            conn, _ = server.accept()
+            conn.recv(65536)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                         b"Connection: close\r\n\r\nok")
+            conn.close()
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        r = CountingResolver()
+        client = HTTPPooledClient(resolver=r)
+        try:
+            res = client.fetch(HTTPRequest(
+                "http://127.0.0.1:{}/".format(port), "GET", {}))
+        finally:
+            client.close()
+            thread.join()
+            server.close()
+        self.assertEqual(res.code, 200)
+        self.assertEqual(r.lookups, [("127.0.0.1", port)])
+
+
+if __name__ == "__main__":
+    unittest.main()
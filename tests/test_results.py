@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from qcloudsms_py.bulk import RESULT_CLIENT_ERROR, BulkSendResult
+from qcloudsms_py.results import ResultStore
+
+
+def entry(mobile, result=0, sid=None):
+    return {"result": result, "errmsg": "OK" if result == 0 else "failed",
+            "mobile": mobile, "nationcode": "86", "sid": sid, "fee": 1}
+
+
+def fill(results):
+    results.add(["13800000000", "13800000001"], {"result": 0, "detail": [
+        entry("13800000000", sid="sid-0"), entry("13800000001", 1016)]})
+    results.add(["13800000002", "+x"], error=IOError("reset"))
+    # a retry of the failed mobile
+    results.add(["13800000001"], {"result": 0, "detail": [
+        entry("13800000001", sid="sid-1")]})
+    results.add(["+x"], {"result": 0, "detail": [entry("+x", sid="sid-x")]})
+    return results
+
+
+class ResultStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.expected = fill(BulkSendResult())
+        self.store = fill(ResultStore())
+
+    def test_keyed_by_mobile_like_bulk_send_result(self):
+        expected, store = self.expected, self.store
+        self.assertEqual(len(store), len(expected))
+        self.assertEqual(sorted(store), sorted(expected))
+        self.assertEqual(sorted(store.succeeded), sorted(expected.succeeded))
+        self.assertEqual(sorted(store.failed), sorted(expected.failed))
+        for mobile in expected:
+            self.assertIn(mobile, store)
+            self.assertEqual(store.result(mobile), expected.result(mobile))
+            self.assertEqual(store.sid(mobile), expected.sid(mobile))
+            self.assertEqual(store[mobile]["result"],
+                             expected[mobile]["result"])
+        self.assertEqual(store.details["13800000001"]["sid"], "sid-1")
+        self.assertEqual(store.result("13800000002"), RESULT_CLIENT_ERROR)
+        self.assertRaises(KeyError, store.__getitem__, "13900000000")
+        self.assertRaises(KeyError, store.result, "13900000000")
+
+    def test_rows(self):
+        store = self.store
+        self.assertEqual(store.record(1).result, 1016)
+        self.assertEqual(store.record(-1).sid, "sid-x")
+        self.assertRaises(IndexError, store.record, 6)
+        self.assertEqual(store.counts(),
+                         {0: 3, 1016: 1, RESULT_CLIENT_ERROR: 2})
+        self.assertEqual(store.by_sid("sid-1").mobile, "13800000001")
+
+
+if __name__ == "__main__":
+    unittest.main()
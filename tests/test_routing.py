@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import unittest
+
+from qcloudsms_py.httpclient import HTTPClientInterface, HTTPResponse
+from qcloudsms_py.routing import RoutingHTTPClient
+from qcloudsms_py.sms import SmsSingleSender
+from qcloudsms_py.voice import TtsVoiceSender
+
+
+class RecordingClient(HTTPClientInterface):
+
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, req):
+        self.urls.append(req.url)
+        return HTTPResponse(request=req, code=200, reason="OK", headers={},
+                            body=json.dumps({"result": 0, "errmsg": "OK"}))
+
+
+class RoutingTest(unittest.TestCase):
+
+    def send(self, endpoints):
+        client = RecordingClient()
+        httpclient = RoutingHTTPClient(endpoints, client)
+        SmsSingleSender(1400000000, "key", httpclient).send(
+            0, 86, "13800000000", "hello")
+        TtsVoiceSender(1400000000, "key", httpclient).send(
+            1, ["1234"], "13800000000")
+        return client.urls
+
+    def test_star_leaves_voice_on_its_origin(self):
+        sms, voice = self.send({"*": ["https://backup.example.com"]})
+        self.assertTrue(sms.startswith(
+            "https://backup.example.com/v5/tlssmssvr/sendsms?"))
+        self.assertTrue(voice.startswith(
+            "https://cloud.tim.qq.com/v5/tlsvoicesvr/sendtvoice?"))
+
+    def test_voice_routed_by_its_own_origins(self):
+        sms, voice = self.send({
+            "*": ["https://yun.tim.qq.com"],
+            "sendtvoice": ["https://voice.example.com"]})
+        self.assertTrue(sms.startswith("https://yun.tim.qq.com/"))
+        self.assertTrue(voice.startswith(
+            "https://voice.example.com/v5/tlsvoicesvr/sendtvoice?"))
+
+
+if __name__ == "__main__":
+    unittest.main()